@@ -0,0 +1,71 @@
+"""
+Асинхронные представления для самых нагруженных маршрутов чтения.
+
+Подключаются только при запуске через ASGI (settings.ASGI_MODE).
+Django 3.2 не имеет асинхронного ORM, поэтому действие вьюсета DRF
+целиком выполняется одним вызовом в пуле потоков, а чтение запроса,
+рендеринг JSON и отправка ответа медленному клиенту не занимают поток.
+Запросы с методами, отличными от GET, передаются обычным
+представлениям DRF.
+"""
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections
+from django.template.response import SimpleTemplateResponse
+from rest_framework.renderers import JSONRenderer
+
+from .views import IngredientsViewSet, RecipesViewSet
+
+
+def call_view(view, request, kwargs):
+    """
+    Выполняет представление DRF в рабочем потоке.
+
+    Запрос проходит обычный dispatch DRF (аутентификация, права,
+    троттлинг, обработка исключений, выбор рендерера, заголовки Allow и
+    Vary). JSON рендерится уже в цикле событий; другие форматы
+    (браузерный API обращается к БД) рендерятся здесь же. В конце
+    освобождает соединение с БД текущего потока.
+    """
+    try:
+        response = view(request, **kwargs)
+        renderer = getattr(response, 'accepted_renderer', None)
+        if renderer is not None and not isinstance(renderer, JSONRenderer):
+            response.render()
+    finally:
+        close_old_connections()
+    return response
+
+
+def async_action(viewset, actions):
+    """Создает асинхронное представление для GET-действия вьюсета."""
+    sync_view = viewset.as_view(actions)
+
+    async def view(request, **kwargs):
+        if request.method != 'GET':
+            return await sync_to_async(sync_view)(request, **kwargs)
+        response = await sync_to_async(
+            call_view, thread_sensitive=False
+        )(sync_view, request, kwargs)
+        if (
+            isinstance(response, SimpleTemplateResponse)
+            and not response.is_rendered
+        ):
+            response.render()
+        return response
+
+    # Как и представления DRF, не требует CSRF-токена
+    view.csrf_exempt = True
+    return view
+
+
+recipe_list = async_action(
+    RecipesViewSet, {'get': 'list', 'post': 'create'}
+)
+recipe_detail = async_action(RecipesViewSet, {
+    'get': 'retrieve',
+    'put': 'update',
+    'patch': 'partial_update',
+    'delete': 'destroy',
+})
+ingredient_list = async_action(IngredientsViewSet, {'get': 'list'})
+ingredient_detail = async_action(IngredientsViewSet, {'get': 'retrieve'})
@@ -0,0 +1,157 @@
+"""Аутентификация по токену с кэшированием пользователя."""
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import cache
+from django.utils import timezone
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.permissions import SAFE_METHODS
+
+from foodgram.constants import (LAST_SEEN_INTERVAL, TOKEN_CACHE_TIMEOUT,
+                                TOKEN_LOCAL_CACHE_SIZE,
+                                TOKEN_LOCAL_CACHE_TIMEOUT)
+from foodgram.db.replicas import pin_user
+from recipes.archive import restore_carts
+from users.models import User
+
+
+class LocalTTLCache:
+    """Потокобезопасный LRU-кэш процесса с ограниченным временем жизни."""
+
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self.items = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            item = self.items.get(key)
+            if item is None:
+                return None
+            expires, value = item
+            if expires < time.monotonic():
+                del self.items[key]
+                return None
+            self.items.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self.lock:
+            self.items[key] = (time.monotonic() + self.timeout, value)
+            self.items.move_to_end(key)
+            while len(self.items) > self.maxsize:
+                self.items.popitem(last=False)
+
+    def delete(self, key):
+        with self.lock:
+            self.items.pop(key, None)
+
+
+local_cache = LocalTTLCache(TOKEN_LOCAL_CACHE_SIZE, TOKEN_LOCAL_CACHE_TIMEOUT)
+
+
+# Пользователи, время активности которых процесс недавно обновлял
+seen_cache = LocalTTLCache(TOKEN_LOCAL_CACHE_SIZE, LAST_SEEN_INTERVAL)
+
+
+def token_cache_key(key):
+    return f'auth-token:{key}'
+
+
+def invalidate_token(key):
+    """Удаляет токен из кэша процесса и общего кэша."""
+    local_cache.delete(key)
+    cache.delete(token_cache_key(key))
+
+
+def invalidate_users_tokens(user_ids):
+    """Удаляет из кэшей все токены пользователей user_ids."""
+    keys = list(
+        Token.objects.filter(user_id__in=user_ids).values_list(
+            'key', flat=True
+        )
+    )
+    for key in keys:
+        local_cache.delete(key)
+    cache.delete_many([token_cache_key(key) for key in keys])
+
+
+def invalidate_user_tokens(user):
+    """Удаляет из кэшей все токены пользователя."""
+    invalidate_users_tokens([user.id])
+
+
+def touch_last_seen(user):
+    """
+    Обновляет время активности пользователя не чаще раза в
+    LAST_SEEN_INTERVAL; по нему архивируются корзины неактивных.
+    """
+    if seen_cache.get(user.id) is not None:
+        return
+    seen_cache.set(user.id, True)
+    if cache.add(f'last-seen:{user.id}', 1, LAST_SEEN_INTERVAL):
+        User.objects.filter(id=user.id).update(last_seen=timezone.now())
+
+
+def restore_archived_cart(user):
+    """
+    Возвращает корзину неактивного пользователя из архива при первом его
+    запросе, до обращений к корзине и выбора реплики.
+    """
+    if not user.cart_archived:
+        return
+    restore_carts([user.id])
+    user.cart_archived = False
+    # На репликах возвращенной корзины может еще не быть
+    pin_user(user.id)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication без запроса Token + User на каждый вызов.
+
+    Токен вместе с пользователем хранится в общем кэше и, на несколько
+    секунд, в LRU-кэше процесса. Общий кэш сбрасывается сигналами при
+    удалении токена, выходе и сохранении пользователя; запись в кэше
+    процесса живет не дольше TOKEN_LOCAL_CACHE_TIMEOUT. Каждый запрос
+    получает собственную копию объектов, поэтому изменения пользователя
+    в одном запросе не видны другим.
+
+    Запросы на запись получают пользователя из БД: сохранение устаревшей
+    копии из кэша откатило бы поля, измененные другим воркером
+    (например, пароль). Заодно с отметкой активности здесь из архива
+    возвращается корзина пользователя.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is None or request.method in SAFE_METHODS:
+            return result
+        user, token = result
+        user = User.objects.filter(id=user.id, is_active=True).first()
+        if user is None:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.')
+            )
+        token.user = user
+        return user, token
+
+    def authenticate_credentials(self, key):
+        data = local_cache.get(key)
+        if data is None:
+            data = cache.get(token_cache_key(key))
+            if data is None:
+                user, token = super().authenticate_credentials(key)
+                data = pickle.dumps(token)
+                cache.set(token_cache_key(key), data, TOKEN_CACHE_TIMEOUT)
+            local_cache.set(key, data)
+        token = pickle.loads(data)
+        touch_last_seen(token.user)
+        restore_archived_cart(token.user)
+        return token.user, token
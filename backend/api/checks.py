@@ -0,0 +1,57 @@
+"""
+Проверки настроек API (manage.py check и запуск сервера).
+
+Версии данных, документы рецептов, результаты объединенных запросов и
+история лимитов хранятся в кэше Django. Кэш в памяти процесса не виден
+другим воркерам gunicorn и воркеру фоновых задач: изменения в одном
+процессе не сбрасывают данные в остальных.
+"""
+from django.conf import settings
+from django.core.checks import Error, Warning, register
+from django.core.cache import caches
+
+# Бэкенды кэша, не общие для процессов
+LOCAL_CACHE_BACKENDS = {
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+}
+# Режимы, которым нужен общий кэш
+SHARED_CACHE_SETTINGS = ('CONDITIONAL_GET', 'RECIPE_DOCUMENTS')
+
+
+def cache_is_shared(alias='default'):
+    """Общий ли для процессов кэш alias."""
+    return settings.CACHES[alias]['BACKEND'] not in LOCAL_CACHE_BACKENDS
+
+
+@register()
+def shared_cache_check(app_configs, **kwargs):
+    if cache_is_shared():
+        return []
+    backend = caches['default'].__class__.__name__
+    return [
+        Error(
+            f'{name}=True требует общего для процессов кэша, а '
+            f'используется {backend}.',
+            hint=(
+                'Задайте CACHE_BACKEND и CACHE_LOCATION (например, '
+                'memcached) или отключите режим.'
+            ),
+            id='api.E001',
+        )
+        for name in SHARED_CACHE_SETTINGS if getattr(settings, name)
+    ]
+
+
+@register(deploy=True)
+def shared_cache_deploy_check(app_configs, **kwargs):
+    if cache_is_shared():
+        return []
+    backend = caches['default'].__class__.__name__
+    return [Warning(
+        f'Кэш {backend} не общий для процессов: лимиты частоты действуют '
+        'в каждом воркере отдельно, а одинаковые запросы объединяются '
+        'только внутри процесса.',
+        hint='Задайте CACHE_BACKEND и CACHE_LOCATION.',
+        id='api.W001',
+    )]
@@ -0,0 +1,117 @@
+"""
+Объединение одинаковых одновременных запросов (single flight).
+
+Одинаковые запросы — с одним ключом — ждут одно вычисление вместо N
+копий. Ключ строится как ETag из conditional.py: адрес, пользователь и
+версии затронутых данных, а также база, с которой читает запрос. Поэтому
+общий результат никогда не переживает изменение данных, а запросы,
+закрепленные за основной базой, не получают данные с реплики.
+
+Внутри процесса ведомые потоки ждут ведущего на событии. Между
+процессами ведущий помечает ключ в кэше и кладет туда результат на
+FLIGHT_RESULT_TIMEOUT секунд, а ведомые опрашивают кэш. Если ведущий
+упал, не сохранив результат, ведомый вычисляет результат сам. С кэшем в
+памяти процесса, который не видит изменений версий в других процессах,
+запросы объединяются только внутри процесса.
+"""
+import threading
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from rest_framework.response import Response
+
+from foodgram.constants import (FLIGHT_LOCK_TIMEOUT, FLIGHT_POLL_INTERVAL,
+                                FLIGHT_RESULT_TIMEOUT)
+from foodgram.db.replicas import read_database
+from .checks import cache_is_shared
+from .conditional import make_etag
+from .throttling import limit_concurrency
+
+
+class Flight:
+    """Вычисление, которого ждут потоки процесса."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def compute_shared(key, compute):
+    """Вычисляет результат один раз на все процессы с общим кэшем."""
+    lock_key, result_key = f'flight:{key}', f'flight-result:{key}'
+    deadline = time.monotonic() + FLIGHT_LOCK_TIMEOUT
+    while True:
+        result = cache.get(result_key)
+        if result is not None:
+            return result
+        if cache.add(lock_key, 1, FLIGHT_LOCK_TIMEOUT):
+            break
+        if time.monotonic() > deadline:
+            return compute()
+        time.sleep(FLIGHT_POLL_INTERVAL)
+    try:
+        result = compute()
+        cache.set(result_key, result, FLIGHT_RESULT_TIMEOUT)
+    finally:
+        cache.delete(lock_key)
+    return result
+
+
+def request_key(request, scopes):
+    """Ключ одинаковых запросов."""
+    return f'{make_etag(request, scopes)[0]}:{read_database.get()}'
+
+
+def single_flight(key, compute):
+    """Результат compute(), общий для одновременных вызовов с ключом key."""
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = Flight()
+    if not leader:
+        flight.done.wait()
+        if flight.error is not None:
+            raise flight.error
+        return flight.result
+    try:
+        flight.result = (
+            compute_shared(key, compute) if cache_is_shared() else compute()
+        )
+    except Exception as error:
+        flight.error = error
+        raise
+    finally:
+        with _flights_lock:
+            del _flights[key]
+        flight.done.set()
+    return flight.result
+
+
+def coalesce(*scopes, limit=None):
+    """
+    Декоратор GET-действий вьюсета: одновременные одинаковые запросы
+    получают данные одного вычисления. scopes — области данных ответа,
+    как у conditional_get. Вычисление выполняется под ограничением
+    параллельности области limit (см. throttling.py).
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            def compute():
+                with limit_concurrency(limit):
+                    response = method(self, request, *args, **kwargs)
+                return response.data, response.status_code
+
+            data, status = single_flight(
+                request_key(request, scopes), compute
+            )
+            return Response(data, status=status)
+        return wrapper
+    return decorator
@@ -0,0 +1,119 @@
+"""
+Слабые ETag по версиям данных и ответы 304 Not Modified.
+
+ETag вычисляется не по телу ответа, а по версиям затронутых данных,
+которые хранятся в кэше и меняются после фиксации транзакций,
+изменяющих эти данные (см. signals.py). Поэтому проверка If-None-Match
+не требует ни запросов к БД, ни сериализации.
+
+Версия содержит время изменения. Ответ, прочитанный с реплики вскоре
+после изменения, отдается без ETag: реплика могла еще не получить
+изменение, и клиент сохранил бы старые данные под новой версией.
+"""
+import hashlib
+import time
+import uuid
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+
+from foodgram.constants import REPLICA_MAX_LAG
+from foodgram.db.replicas import reading_replica
+
+# Области данных: рецепты с авторами и ингредиентами, справочник
+# ингредиентов и связи текущего пользователя (избранное, корзина,
+# подписки), от которых зависят флаги в ответах
+RECIPES = 'recipes'
+INGREDIENTS = 'ingredients'
+VIEWER = 'viewer'
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def version_key(scope):
+    return f'data-version:{scope}'
+
+
+def new_version():
+    return f'{uuid.uuid4().hex}-{time.time():.0f}'
+
+
+def changed_recently(versions):
+    """Менялась ли какая-то из версий за последние REPLICA_MAX_LAG с."""
+    since = time.time() - REPLICA_MAX_LAG
+    return any(
+        float(version.partition('-')[2] or 0) > since for version in versions
+    )
+
+
+def get_versions(scopes):
+    """Текущие версии областей; отсутствующие в кэше создаются."""
+    keys = [version_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    for key in keys:
+        if key not in versions:
+            cache.add(key, new_version(), None)
+            versions[key] = cache.get(key)
+    return [versions[key] for key in keys]
+
+
+def bump_versions(scopes):
+    """Меняет версии областей после фиксации текущей транзакции."""
+    scopes = list(scopes)
+    transaction.on_commit(lambda: cache.set_many(
+        {version_key(scope): new_version() for scope in scopes}, None
+    ))
+
+
+def make_etag(request, scopes):
+    """
+    Слабый ETag ответа и версии, по которым он вычислен.
+
+    Кроме версий данных учитывает адрес, хост (в ответах абсолютные
+    URL) и заголовок Accept. Область VIEWER заменяется связями текущего
+    пользователя.
+    """
+    parts = [
+        request.get_full_path(),
+        request.get_host(),
+        request.META.get('HTTP_ACCEPT', ''),
+    ]
+    if VIEWER in scopes:
+        scopes = [scope for scope in scopes if scope != VIEWER]
+        parts.append(str(request.user.id))
+        if request.user.is_authenticated:
+            scopes.append(user_scope(request.user.id))
+    versions = get_versions(scopes)
+    parts.extend(versions)
+    digest = hashlib.md5('\n'.join(parts).encode()).hexdigest()
+    return f'W/"{digest}"', versions
+
+
+def conditional_get(*scopes):
+    """
+    Декоратор действий вьюсета: ETag по версиям scopes и ответ 304.
+
+    Работает при settings.CONDITIONAL_GET: версии должны храниться в
+    общем для всех воркеров кэше.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            if not settings.CONDITIONAL_GET or request.method != 'GET':
+                return method(self, request, *args, **kwargs)
+            etag, versions = make_etag(request, scopes)
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = method(self, request, *args, **kwargs)
+                if reading_replica() and changed_recently(versions):
+                    return response
+            if response.status_code in (200, 304):
+                response['ETag'] = etag
+            return response
+        return wrapper
+    return decorator
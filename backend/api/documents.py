@@ -0,0 +1,123 @@
+"""
+Заранее собранные документы рецептов для карточки рецепта.
+
+Документ содержит все данные GetRecipeSerializer, не зависящие от
+пользователя: автора, ингредиенты, имена файлов изображений. Он хранится
+в кэше и пересобирается при сохранении рецепта, его ингредиентов или
+профиля автора. При ответе в документ подставляются флаги текущего
+пользователя и абсолютные URL файлов.
+"""
+from django.core.cache import cache
+
+from foodgram.constants import RECIPE_DOCUMENT_TIMEOUT
+from foodgram.db.commit import on_commit_once
+from foodgram.db.replicas import primary
+from recipes.models import Recipe
+from .fast_serializers import (RECIPE_FIELDS, media_url_builder,
+                               serialize_ingredients)
+from .viewer import get_viewer_state
+
+
+def document_key(recipe_id):
+    return f'recipe-document:{recipe_id}'
+
+
+def build_documents(recipe_ids):
+    """Собирает документы рецептов: два запроса на любой набор."""
+    recipes = list(
+        Recipe.objects.filter(id__in=recipe_ids).values(*RECIPE_FIELDS)
+    )
+    ingredients = serialize_ingredients([recipe['id'] for recipe in recipes])
+    return {
+        recipe['id']: {
+            'id': recipe['id'],
+            'author': {
+                'email': recipe['author__email'],
+                'id': recipe['author_id'],
+                'username': recipe['author__username'],
+                'first_name': recipe['author__first_name'],
+                'last_name': recipe['author__last_name'],
+                'avatar': recipe['author__avatar'],
+            },
+            'ingredients': ingredients[recipe['id']],
+            'name': recipe['name'],
+            'image': recipe['image'],
+            'text': recipe['text'],
+            'cooking_time': recipe['cooking_time'],
+        }
+        for recipe in recipes
+    }
+
+
+def refresh_documents(recipe_ids):
+    """Пересобирает документы; документы удаленных рецептов удаляются."""
+    recipe_ids = set(recipe_ids)
+    documents = build_documents(recipe_ids)
+    cache.set_many(
+        {
+            document_key(recipe_id): document
+            for recipe_id, document in documents.items()
+        },
+        RECIPE_DOCUMENT_TIMEOUT
+    )
+    cache.delete_many([
+        document_key(recipe_id)
+        for recipe_id in recipe_ids - documents.keys()
+    ])
+
+
+def schedule_refresh(recipe_ids):
+    """
+    Пересобирает документы после фиксации текущей транзакции.
+
+    Несколько изменений в одной транзакции (рецепт, его ингредиенты,
+    автор) приводят к одной пересборке каждого документа. Документы из
+    откаченной транзакции пересобираются со следующей фиксацией по
+    неизмененным данным.
+    """
+    on_commit_once(refresh_documents, recipe_ids)
+
+
+def get_document(recipe_id):
+    """
+    Документ из кэша; при промахе собирается и кэшируется.
+
+    Собирается по основной базе: документ с отстающей реплики остался
+    бы в кэше до следующего изменения рецепта.
+    """
+    key = document_key(recipe_id)
+    document = cache.get(key)
+    if document is None:
+        with primary():
+            document = build_documents([recipe_id]).get(recipe_id)
+        if document is not None:
+            cache.set(key, document, RECIPE_DOCUMENT_TIMEOUT)
+    return document
+
+
+def render_document(document, request):
+    """Ответ карточки рецепта, как у GetRecipeSerializer."""
+    state = get_viewer_state(request)
+    media_url = media_url_builder(request)
+    author = document['author']
+    return {
+        'id': document['id'],
+        'author': {
+            'email': author['email'],
+            'id': author['id'],
+            'username': author['username'],
+            'first_name': author['first_name'],
+            'last_name': author['last_name'],
+            'is_subscribed': author['id'] in state.subscribed_author_ids,
+            'avatar': media_url(author['avatar']),
+        },
+        'ingredients': document['ingredients'],
+        'is_favorited': document['id'] in state.favorite_recipe_ids,
+        'is_in_shopping_cart': (
+            document['id'] in state.shopping_cart_recipe_ids
+        ),
+        'name': document['name'],
+        'image': media_url(document['image']),
+        'text': document['text'],
+        'cooking_time': document['cooking_time'],
+    }
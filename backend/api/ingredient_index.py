@@ -0,0 +1,234 @@
+"""
+Компактный индекс справочника ингредиентов в общем файле.
+
+Справочник хранится в одном файле, который каждый воркер отображает в
+память только для чтения (mmap), поэтому страницы файла в памяти общие
+для всех процессов контейнера. Файл состоит из массивов 32-битных чисел
+и двух буферов UTF-8:
+
+- идентификаторы ингредиентов в порядке выдачи API (по названию);
+- смещения названий в общем буфере названий;
+- номера единиц измерения в таблице уникальных единиц (единицы хранятся
+  один раз, «г» не повторяется тысячи раз);
+- перестановка по названию в нижнем регистре для поиска по префиксу и
+  перестановка по идентификатору для поиска по id — оба поиска
+  двоичные.
+
+Файл пересобирается после фиксации транзакций, изменяющих ингредиенты,
+и подменяется атомарно; воркеры замечают новый файл по inode и времени
+изменения не позже чем через INGREDIENT_INDEX_CHECK_INTERVAL секунд.
+"""
+import mmap
+import os
+import struct
+import threading
+import time
+import uuid
+from array import array
+
+from django.conf import settings
+
+from foodgram.constants import INGREDIENT_INDEX_CHECK_INTERVAL
+from foodgram.db.commit import on_commit_once
+from foodgram.db.replicas import primary
+from recipes.models import Ingredient
+
+MAGIC = b'FGI1'
+# Сигнатура, число ингредиентов, число единиц, длины буферов названий
+# и единиц в байтах
+HEADER = struct.Struct('<4sIIII')
+
+
+def write_index(path, rows):
+    """Записывает индекс строк (id, название, единица) в файл path."""
+    units = {}
+    ids = array('I')
+    unit_numbers = array('I')
+    name_offsets = array('I', [0])
+    names = bytearray()
+    for ingredient_id, name, unit in rows:
+        ids.append(ingredient_id)
+        unit_numbers.append(units.setdefault(unit, len(units)))
+        names += name.encode()
+        name_offsets.append(len(names))
+    unit_offsets = array('I', [0])
+    unit_names = bytearray()
+    for unit in units:
+        unit_names += unit.encode()
+        unit_offsets.append(len(unit_names))
+    by_key = array('I', sorted(
+        range(len(rows)), key=lambda position: rows[position][1].lower()
+    ))
+    by_id = array('I', sorted(range(len(rows)), key=ids.__getitem__))
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temporary = f'{path}.{uuid.uuid4().hex}.tmp'
+    with open(temporary, 'wb') as file:
+        file.write(HEADER.pack(
+            MAGIC, len(rows), len(units), len(names), len(unit_names)
+        ))
+        for part in (ids, name_offsets, unit_numbers, by_key, by_id,
+                     unit_offsets):
+            part.tofile(file)
+        file.write(names)
+        file.write(unit_names)
+    os.replace(temporary, path)
+
+
+def build_index(path=None):
+    """Собирает индекс по основной базе одним запросом."""
+    with primary():
+        rows = list(
+            Ingredient.objects.order_by('name', 'id').values_list(
+                'id', 'name', 'measurement_unit'
+            )
+        )
+    write_index(path or settings.INGREDIENT_INDEX_PATH, rows)
+
+
+class IngredientIndex:
+    """Справочник ингредиентов, отображенный из файла индекса."""
+
+    def __init__(self, path):
+        with open(path, 'rb') as file:
+            stat = os.fstat(file.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns)
+            self.buffer = mmap.mmap(
+                file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        view = memoryview(self.buffer)
+        magic, count, units, names_size, units_size = HEADER.unpack_from(
+            view
+        )
+        if magic != MAGIC:
+            raise ValueError(f'{path} не является индексом ингредиентов')
+        self.count = count
+        offset = HEADER.size
+
+        def take(length, format='I'):
+            nonlocal offset
+            size = length * struct.calcsize(format)
+            offset += size
+            return view[offset - size:offset].cast(format)
+
+        self.ids = take(count)
+        self.name_offsets = take(count + 1)
+        self.unit_numbers = take(count)
+        self.by_key = take(count)
+        self.by_id = take(count)
+        unit_offsets = take(units + 1)
+        self.names = take(names_size, 'B')
+        unit_names = bytes(take(units_size, 'B'))
+        # Единиц немного, их строки создаются один раз
+        self.units = [
+            unit_names[unit_offsets[number]:unit_offsets[number + 1]].decode()
+            for number in range(units)
+        ]
+
+    def __len__(self):
+        return self.count
+
+    def name(self, position):
+        return str(
+            self.names[
+                self.name_offsets[position]:self.name_offsets[position + 1]
+            ],
+            'utf-8'
+        )
+
+    def row(self, position):
+        """Ингредиент в формате IngredientSerializer."""
+        return {
+            'id': self.ids[position],
+            'name': self.name(position),
+            'measurement_unit': self.units[self.unit_numbers[position]],
+        }
+
+    def get(self, ingredient_id):
+        """Ингредиент по id или None."""
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.ids[self.by_id[middle]] < ingredient_id:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self.ids[self.by_id[low]] == ingredient_id:
+            return self.row(self.by_id[low])
+        return None
+
+    def search(self, prefix=''):
+        """
+        Ингредиенты, название которых начинается с prefix без учета
+        регистра, в порядке выдачи API.
+        """
+        if not prefix:
+            return [self.row(position) for position in range(self.count)]
+        prefix = prefix.lower()
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self.name(self.by_key[middle]).lower() < prefix:
+                low = middle + 1
+            else:
+                high = middle
+        positions = []
+        for position in self.by_key[low:]:
+            if not self.name(position).lower().startswith(prefix):
+                break
+            positions.append(position)
+        return [self.row(position) for position in sorted(positions)]
+
+    def search_terms(self, terms):
+        """
+        Поиск как у SearchFilter с полем '^name': название начинается с
+        каждого из terms. Все terms — префиксы одного названия, только
+        если они префиксы самого длинного из них.
+        """
+        if not terms:
+            return self.search()
+        longest = max(terms, key=len).lower()
+        if not all(longest.startswith(term.lower()) for term in terms):
+            return []
+        return self.search(longest)
+
+
+_index = None
+_checked_at = 0
+_lock = threading.Lock()
+
+
+def get_index():
+    """
+    Индекс текущего процесса; открывает заново подмененный файл и
+    собирает отсутствующий.
+    """
+    global _index, _checked_at
+    if _index is not None and (
+        time.monotonic() - _checked_at < INGREDIENT_INDEX_CHECK_INTERVAL
+    ):
+        return _index
+    with _lock:
+        path = settings.INGREDIENT_INDEX_PATH
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            build_index(path)
+            stat = os.stat(path)
+        if _index is None or _index.identity != (
+            stat.st_ino, stat.st_mtime_ns
+        ):
+            # Прежний индекс не закрывается явно: его еще могут читать
+            # другие потоки, память освободится вместе с последней ссылкой
+            _index = IngredientIndex(path)
+        _checked_at = time.monotonic()
+    return _index
+
+
+def rebuild_index(_values):
+    """Пересборка индекса, отложенная on_commit_once."""
+    build_index()
+
+
+def schedule_rebuild():
+    """Пересобирает индекс один раз после фиксации текущей транзакции."""
+    on_commit_once(rebuild_index)
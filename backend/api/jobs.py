@@ -0,0 +1,166 @@
+"""
+Фоновые задачи API и ответы 202 Accepted.
+
+Клиент, приславший заголовок Prefer: respond-async, получает вместо
+результата ответ 202 со ссылкой на состояние задачи /api/jobs/<id>/;
+без заголовка запрос обрабатывается как раньше.
+"""
+import base64
+import json
+import os
+import uuid
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.http import HttpRequest
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from jobs.registry import enqueue, job_handler
+from recipes.models import Recipe
+from users.models import User
+from .serializers import AddRecipeSerializer, JobSerializer
+from .shopping_list import shopping_list_lines
+
+# Каталог файлов списков покупок внутри MEDIA_ROOT
+SHOPPING_LISTS_DIR = 'shopping_lists'
+
+
+def prefers_async(request):
+    """Просит ли клиент выполнить запрос в фоне."""
+    return 'respond-async' in request.headers.get('Prefer', '')
+
+
+def accepted_response(request, job):
+    """Ответ 202 со ссылкой на состояние задачи."""
+    url = request.build_absolute_uri(
+        reverse('api:jobs-detail', args=[job.id])
+    )
+    return Response(
+        JobSerializer(job).data,
+        status=status.HTTP_202_ACCEPTED,
+        headers={'Location': url, 'Preference-Applied': 'respond-async'}
+    )
+
+
+def run_async(request, name, **kwargs):
+    """Ставит задачу пользователя запроса в очередь и отвечает 202."""
+    return accepted_response(
+        request, enqueue(name, user=request.user, **kwargs)
+    )
+
+
+def is_base64_image(image_data):
+    return (
+        isinstance(image_data, str)
+        and image_data.startswith('data:image')
+        and ';base64,' in image_data
+    )
+
+
+def decode_image(image_data, name):
+    """Файл изображения из data URI."""
+    format, imgstr = image_data.split(';base64,')
+    ext = format.split('/')[-1]
+    return ContentFile(
+        base64.b64decode(imgstr, validate=True), name=f'{name}.{ext}'
+    )
+
+
+def save_avatar(user, image_data):
+    """Декодирует изображение из data URI и сохраняет его аватаром."""
+    data = decode_image(image_data, 'avatar')
+    if user.avatar:
+        user.avatar.delete(save=False)
+    user.avatar = data
+    user.save(update_fields=['avatar'])
+
+
+def store_file(model, field_name, file):
+    """
+    Сохраняет файл в хранилище поля модели и возвращает путь: в задачу
+    передается путь, а не содержимое файла.
+    """
+    field = model._meta.get_field(field_name)
+    return field.storage.save(field.generate_filename(None, file.name), file)
+
+
+def store_avatar(image_data):
+    """Сохраняет изображение из data URI в каталог аватаров."""
+    return store_file(User, 'avatar', decode_image(image_data, 'avatar'))
+
+
+# Ошибка в файле не исчезнет при повторе
+@job_handler('api.set_avatar', max_attempts=1, priority=10)
+def set_avatar(job, path):
+    """Делает сохраненный файл path аватаром пользователя."""
+    user = User.objects.get(id=job.user_id)
+    if user.avatar:
+        user.avatar.delete(save=False)
+    user.avatar.name = path
+    user.save(update_fields=['avatar'])
+    return {'avatar': user.avatar.url}
+
+
+def save_recipe_in_background(request, serializer, partial=False):
+    """
+    Ставит в очередь сохранение рецепта по проверенному serializer.
+
+    Изображение уже декодировано проверкой и сохраняется в хранилище
+    сразу, задача получает его путь вместо base64.
+    """
+    image = serializer.validated_data.get('image')
+    return run_async(
+        request,
+        'api.save_recipe',
+        data={
+            name: value for name, value in request.data.items()
+            if name != 'image'
+        },
+        image=image and store_file(Recipe, 'image', image),
+        recipe_id=serializer.instance and serializer.instance.id,
+        partial=partial
+    )
+
+
+# Ошибки проверки данных не исчезнут при повторе
+@job_handler('api.save_recipe', max_attempts=1, priority=10)
+def save_recipe(job, data, image=None, recipe_id=None, partial=False):
+    """
+    Создает или изменяет рецепт с изображением по сохраненному пути.
+
+    Данные и права на изменение рецепта проверены при постановке
+    задачи; проверка повторяется, так как с тех пор могли удалить,
+    например, ингредиент.
+    """
+    request = Request(HttpRequest())
+    request.user = User.objects.get(id=job.user_id)
+    serializer = AddRecipeSerializer(
+        Recipe.objects.get(id=recipe_id) if recipe_id else None,
+        data=data,
+        partial=partial,
+        context={'request': request}
+    )
+    serializer.fields['image'].required = False
+    if not serializer.is_valid():
+        raise ValueError(json.dumps(serializer.errors, ensure_ascii=False))
+    recipe = serializer.save(**({'image': image} if image else {}))
+    return {
+        'id': recipe.id,
+        'url': reverse('api:recipes-detail', args=[recipe.id])
+    }
+
+
+@job_handler('api.shopping_list')
+def build_shopping_list(job):
+    """Записывает список покупок в файл и возвращает его URL и путь."""
+    name = f'{job.user_id}-{uuid.uuid4().hex}.txt'
+    directory = os.path.join(settings.MEDIA_ROOT, SHOPPING_LISTS_DIR)
+    os.makedirs(directory, exist_ok=True)
+    user = User.objects.get(id=job.user_id)
+    with open(os.path.join(directory, name), 'w', encoding='utf-8') as file:
+        file.writelines(shopping_list_lines(user))
+    path = f'{SHOPPING_LISTS_DIR}/{name}'
+    return {'url': f'{settings.MEDIA_URL}{path}', 'file': path}
@@ -0,0 +1,44 @@
+"""
+Ограничения параметров размера ответа.
+
+Значение больше максимума урезается до него: клиент получает меньше
+данных, но запрос выполняется. Нечисловое, неположительное или больше
+порога settings.API_LIMIT_REJECT_ABOVE значение отклоняется ответом 400
+до обращения к БД. Максимумы задаются в settings и переопределяются для
+отдельных действий вьюсета (max_page_sizes = {действие: максимум}).
+"""
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+
+
+def parse_limit(value, maximum, name):
+    """Ограничение из параметра запроса или None, если он не задан."""
+    if value in (None, ''):
+        return None
+    try:
+        limit = int(value)
+    except ValueError:
+        limit = 0
+    if limit < 1 or limit > settings.API_LIMIT_REJECT_ABOVE:
+        raise ValidationError({name: [
+            'Ожидается целое число от 1 до '
+            f'{settings.API_LIMIT_REJECT_ABOVE}.'
+        ]})
+    return min(limit, maximum)
+
+
+def max_page_size(view):
+    """Максимальный размер страницы для действия вьюсета."""
+    return getattr(view, 'max_page_sizes', {}).get(
+        getattr(view, 'action', None), settings.API_MAX_PAGE_SIZE
+    )
+
+
+def get_recipes_limit(request):
+    """Число рецептов в превью автора: не больше API_MAX_RECIPES_LIMIT."""
+    limit = parse_limit(
+        request.query_params.get('recipes_limit'),
+        settings.API_MAX_RECIPES_LIMIT,
+        'recipes_limit'
+    )
+    return settings.API_MAX_RECIPES_LIMIT if limit is None else limit
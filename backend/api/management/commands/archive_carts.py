@@ -0,0 +1,35 @@
+"""Перенос корзин давно не активных пользователей в архив."""
+from django.core.management.base import BaseCommand
+
+from foodgram.constants import IMPORT_BATCH_SIZE, SHOPPING_CART_ARCHIVE_DAYS
+from recipes.archive import archive_carts, stale_user_ids
+
+
+class Command(BaseCommand):
+    help = (
+        'Переносит в архив корзины пользователей, не активных дольше '
+        'заданного срока; корзина вернется при первом запросе с токеном'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days', type=int, default=SHOPPING_CART_ARCHIVE_DAYS,
+            help='Сколько дней пользователь не был активен'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать пользователей'
+        )
+
+    def handle(self, *args, **options):
+        user_ids = stale_user_ids(options['days'])
+        if options['dry_run']:
+            self.stdout.write(f'Корзин к переносу: {len(user_ids)}')
+            return
+        rows = 0
+        for start in range(0, len(user_ids), IMPORT_BATCH_SIZE):
+            batch = user_ids[start:start + IMPORT_BATCH_SIZE]
+            rows += archive_carts(batch)
+        self.stdout.write(
+            f'Перенесено корзин: {len(user_ids)}, строк: {rows}'
+        )
@@ -0,0 +1,68 @@
+"""Замер сжатия и условных запросов на списке рецептов."""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.test import Client, override_settings
+
+from foodgram.compression import brotli, compress
+
+
+class Command(BaseCommand):
+    help = (
+        'Показывает размер и время сжатия списка рецептов в gzip и '
+        'brotli и время ответа 304 по ETag'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit', type=int, nargs='+', default=[6, 50, 200],
+            help='Размеры страниц списка рецептов'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help='Количество повторов при замере'
+        )
+        parser.add_argument(
+            '--host', default=None,
+            help='Заголовок Host запросов (по умолчанию из ALLOWED_HOSTS)'
+        )
+
+    def timed(self, func, repeat):
+        """Результат функции и среднее время вызова в мс."""
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        return result, (time.perf_counter() - start) / repeat * 1000
+
+    def handle(self, *args, **options):
+        allowed = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else ''
+        host = options['host'] or (
+            'localhost' if allowed in ('', '*') else allowed.lstrip('.')
+        )
+        client = Client(HTTP_HOST=host)
+        repeat = options['repeat']
+        encodings = ['gzip'] + (['br'] if brotli is not None else [])
+        for limit in options['limit']:
+            url = f'/api/recipes/?limit={limit}'
+            with override_settings(CONDITIONAL_GET=True):
+                response, full = self.timed(lambda: client.get(url), repeat)
+                etag = response['ETag']
+                cached, not_modified = self.timed(
+                    lambda: client.get(url, HTTP_IF_NONE_MATCH=etag), repeat
+                )
+            content = response.content
+            self.stdout.write(
+                f'limit={limit}: {len(content)} байт, '
+                f'ответ {full:.3f} мс, 304 ({cached.status_code}) '
+                f'{not_modified:.3f} мс'
+            )
+            for encoding in encodings:
+                compressed, elapsed = self.timed(
+                    lambda: compress(content, encoding), repeat
+                )
+                self.stdout.write(
+                    f'  {encoding}: {len(compressed)} байт '
+                    f'({len(compressed) / len(content):.0%}), '
+                    f'{elapsed:.3f} мс'
+                )
@@ -0,0 +1,56 @@
+"""Замер накладных расходов на установку соединения с БД."""
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает время обработки запроса с новым соединением '
+        'и с текущими настройками постоянных соединений/пула'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests', type=int, default=500,
+            help='Количество имитируемых запросов'
+        )
+
+    def measure(self, requests, max_age, pool_size):
+        """Среднее время запроса в мс при заданных настройках."""
+        connection.close()
+        connection.settings_dict['CONN_MAX_AGE'] = max_age
+        connection.settings_dict['POOL_MAX_SIZE'] = pool_size
+        start = time.perf_counter()
+        for _ in range(requests):
+            # Сигналы запроса закрывают или сохраняют соединение так же,
+            # как это делает обработчик HTTP-запросов Django
+            request_started.send(sender=self.__class__)
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            request_finished.send(sender=self.__class__)
+        return (time.perf_counter() - start) / requests * 1000
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+        max_age = connection.settings_dict['CONN_MAX_AGE']
+        pool_size = connection.settings_dict.get('POOL_MAX_SIZE', 0)
+        try:
+            baseline = self.measure(requests, 0, 0)
+            current = self.measure(requests, max_age, pool_size)
+        finally:
+            connection.close()
+            connection.settings_dict['CONN_MAX_AGE'] = max_age
+            connection.settings_dict['POOL_MAX_SIZE'] = pool_size
+        self.stdout.write(
+            f'Новое соединение на каждый запрос: {baseline:.3f} мс/запрос'
+        )
+        self.stdout.write(
+            f'CONN_MAX_AGE={max_age}, POOL_MAX_SIZE={pool_size}: '
+            f'{current:.3f} мс/запрос'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Экономия: {baseline - current:.3f} мс на запрос'
+        ))
@@ -0,0 +1,103 @@
+"""Сравнение индекса ингредиентов с моделями ORM по памяти и скорости."""
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from django.core.management.base import BaseCommand
+
+from api.ingredient_index import IngredientIndex, build_index
+from api.serializers import IngredientSerializer
+from recipes.models import Ingredient
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает память на справочник ингредиентов в виде моделей, '
+        'словарей и файла индекса, а также время поиска по префиксу'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lookups', type=int, default=500,
+            help='Количество поисков по префиксу'
+        )
+
+    def allocated(self, func):
+        """Результат функции и память в куче, занятая им, в КБ."""
+        tracemalloc.start()
+        try:
+            result = func()
+            size = tracemalloc.get_traced_memory()[0]
+        finally:
+            tracemalloc.stop()
+        return result, size / 1024
+
+    def timed(self, func, arguments):
+        """Среднее время вызова функции в мс."""
+        start = time.perf_counter()
+        for argument in arguments:
+            func(argument)
+        return (time.perf_counter() - start) / len(arguments) * 1000
+
+    def handle(self, *args, **options):
+        models, models_size = self.allocated(
+            lambda: list(Ingredient.objects.all())
+        )
+        _, values_size = self.allocated(
+            lambda: list(
+                Ingredient.objects.values('id', 'name', 'measurement_unit')
+            )
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'ingredients.idx')
+            build_index(path)
+            file_size = os.path.getsize(path) / 1024
+            index, index_size = self.allocated(
+                lambda: IngredientIndex(path)
+            )
+            prefixes = [
+                ingredient.name[:random.randint(1, 3)]
+                for ingredient in random.choices(
+                    models or [Ingredient(name='')], k=options['lookups']
+                )
+            ]
+            index_time = self.timed(index.search, prefixes)
+            orm_time = self.timed(
+                lambda prefix: IngredientSerializer(
+                    Ingredient.objects.filter(name__istartswith=prefix),
+                    many=True
+                ).data,
+                prefixes
+            )
+            mismatches = sum(
+                [row['id'] for row in index.search(prefix)]
+                != list(
+                    Ingredient.objects.filter(
+                        name__istartswith=prefix
+                    ).order_by('name', 'id').values_list('id', flat=True)
+                )
+                for prefix in set(prefixes)
+            )
+            del index
+        self.stdout.write(f'Ингредиентов: {len(models)}')
+        self.stdout.write(
+            f'Модели ORM: {models_size:.0f} КБ в каждом воркере'
+        )
+        self.stdout.write(
+            f'Словари values(): {values_size:.0f} КБ в каждом воркере'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Индекс: файл {file_size:.0f} КБ, общий для воркеров, '
+            f'и {index_size:.1f} КБ в каждом воркере'
+        ))
+        self.stdout.write(
+            f'Поиск по префиксу: индекс {index_time:.3f} мс, '
+            f'ORM и сериализатор {orm_time:.3f} мс'
+        )
+        if mismatches:
+            self.stdout.write(self.style.WARNING(
+                f'Результаты индекса и БД различаются для {mismatches} '
+                'префиксов (сравнение регистра в СУБД)'
+            ))
@@ -0,0 +1,135 @@
+"""Замер выборок по пользователю и VACUUM с секционированием и без."""
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from foodgram.db.partitioning import rebuild_table
+
+# Временные таблицы замера, устроенные как таблицы связей пользователей
+PLAIN_TABLE = 'bench_relations_plain'
+PARTITIONED_TABLE = 'bench_relations_partitioned'
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает выборку связей пользователя и стоимость VACUUM после '
+        'архивирования в обычной и секционированной по user_id таблице; '
+        'только PostgreSQL, временные таблицы удаляются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=20000,
+            help='Количество пользователей'
+        )
+        parser.add_argument(
+            '--per-user', type=int, default=25,
+            help='Строк на пользователя'
+        )
+        parser.add_argument(
+            '--partitions', type=int, default=16,
+            help='Число хеш-секций'
+        )
+        parser.add_argument(
+            '--lookups', type=int, default=2000,
+            help='Количество выборок по пользователю'
+        )
+        parser.add_argument(
+            '--archive-every', type=int, default=5,
+            help='Удалить строки каждого N-го пользователя перед VACUUM'
+        )
+
+    def timed(self, cursor, sql, params=None):
+        """Время выполнения запроса в мс."""
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        return (time.perf_counter() - start) * 1000
+
+    def create(self, cursor, table, users, per_user):
+        """Таблица как у Django: id, уникальность и индекс user_id."""
+        cursor.execute(
+            f'CREATE TABLE {table} (id bigserial PRIMARY KEY, '
+            'user_id integer NOT NULL, recipe_id integer NOT NULL, '
+            f'CONSTRAINT {table}_unique UNIQUE (recipe_id, user_id))'
+        )
+        cursor.execute(f'CREATE INDEX {table}_user_id ON {table} (user_id)')
+        cursor.execute(
+            f'INSERT INTO {table} (user_id, recipe_id) '
+            'SELECT u, r FROM generate_series(1, %s) u, '
+            'generate_series(1, %s) r',
+            [users, per_user]
+        )
+
+    def size(self, cursor, table):
+        """Размер таблицы вместе с секциями и индексами в МБ."""
+        cursor.execute(
+            'SELECT sum(pg_total_relation_size(oid)) FROM pg_class '
+            'WHERE oid = %s::regclass OR oid IN ('
+            'SELECT inhrelid FROM pg_inherits '
+            'WHERE inhparent = %s::regclass)',
+            [table, table]
+        )
+        return cursor.fetchone()[0] / 1024 / 1024
+
+    def measure(self, cursor, table, options):
+        user_ids = [
+            random.randint(1, options['users'])
+            for _ in range(options['lookups'])
+        ]
+        start = time.perf_counter()
+        for user_id in user_ids:
+            cursor.execute(
+                f'SELECT recipe_id FROM {table} WHERE user_id = %s',
+                [user_id]
+            )
+            cursor.fetchall()
+        lookup = (time.perf_counter() - start) / len(user_ids) * 1000
+        cursor.execute(
+            f'DELETE FROM {table} WHERE user_id %% %s = 0',
+            [options['archive_every']]
+        )
+        vacuum = self.timed(cursor, f'VACUUM {table}')
+        return lookup, vacuum, self.size(cursor, table)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Замер доступен только в PostgreSQL')
+        if connection.in_atomic_block:
+            raise CommandError('VACUUM нельзя выполнить внутри транзакции')
+        with connection.cursor() as cursor:
+            try:
+                for title, table, partitions in (
+                    ('Обычная таблица', PLAIN_TABLE, 0),
+                    (
+                        'Секционированная таблица', PARTITIONED_TABLE,
+                        options['partitions']
+                    ),
+                ):
+                    self.create(
+                        cursor, table, options['users'], options['per_user']
+                    )
+                    if partitions:
+                        with transaction.atomic():
+                            rebuild_table(connection, table, partitions)
+                    cursor.execute(f'ANALYZE {table}')
+                    lookup, vacuum, size = self.measure(
+                        cursor, table, options
+                    )
+                    self.stdout.write(
+                        f'{title}: выборка {lookup:.3f} мс, '
+                        f'VACUUM {vacuum:.1f} мс, размер {size:.1f} МБ'
+                    )
+                partition = f'{PARTITIONED_TABLE}_p0'
+                cursor.execute(
+                    f'DELETE FROM {partition} WHERE user_id %% %s = 1',
+                    [options['archive_every']]
+                )
+                self.stdout.write(self.style.SUCCESS(
+                    'VACUUM одной секции: '
+                    f'{self.timed(cursor, f"VACUUM {partition}"):.1f} мс'
+                ))
+            finally:
+                for table in (PLAIN_TABLE, PARTITIONED_TABLE):
+                    cursor.execute(f'DROP TABLE IF EXISTS {table}')
@@ -0,0 +1,150 @@
+"""Проверка и замер быстрой сериализации и документов рецептов."""
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+
+from api.documents import build_documents, get_document, render_document
+from api.fast_serializers import RECIPE_FIELDS, serialize_recipes
+from api.renderers import FastJSONRenderer
+from api.serializers import GetRecipeSerializer
+from api.views import RecipesViewSet
+from foodgram.constants import DEFAULT_PAGES_LIMIT
+from recipes.models import Recipe
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает побайтно ответы GetRecipeSerializer, быстрой '
+        'сериализации и документов рецептов и замеряет их скорость'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=5,
+            help='Сколько пользователей проверить, кроме анонимного'
+        )
+        parser.add_argument(
+            '--limit', type=int, default=DEFAULT_PAGES_LIMIT,
+            help='Размер страницы рецептов'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=200,
+            help='Количество повторов при замере'
+        )
+        parser.add_argument(
+            '--host', default=None,
+            help='Заголовок Host запросов (по умолчанию из ALLOWED_HOSTS)'
+        )
+
+    def make_request(self, user):
+        request = RequestFactory().get(
+            '/api/recipes/', HTTP_HOST=self.host
+        )
+        request.user = user
+        return request
+
+    def render_default(self, recipes, user):
+        request = self.make_request(user)
+        queryset = RecipesViewSet(request=request).get_queryset()
+        return JSONRenderer().render(GetRecipeSerializer(
+            queryset.filter(id__in=recipes),
+            many=True,
+            context={'request': request}
+        ).data)
+
+    def render_fast(self, recipes, user):
+        return FastJSONRenderer().render(serialize_recipes(
+            Recipe.objects.filter(id__in=recipes).values(*RECIPE_FIELDS),
+            self.make_request(user)
+        ))
+
+    def render_detail(self, recipe, user):
+        request = self.make_request(user)
+        queryset = RecipesViewSet(request=request).get_queryset()
+        return JSONRenderer().render(GetRecipeSerializer(
+            queryset.get(id=recipe), context={'request': request}
+        ).data)
+
+    def render_document(self, recipe, user):
+        return FastJSONRenderer().render(render_document(
+            build_documents([recipe])[recipe], self.make_request(user)
+        ))
+
+    def render_cached(self, recipe, user):
+        return FastJSONRenderer().render(render_document(
+            get_document(recipe), self.make_request(user)
+        ))
+
+    def check_parity(self, viewers, limit):
+        ids = list(Recipe.objects.values_list('id', flat=True))
+        pages = [ids[i:i + limit] for i in range(0, len(ids), limit)]
+        for user in viewers:
+            for page in pages:
+                default = self.render_default(page, user)
+                fast = self.render_fast(page, user)
+                if default != fast:
+                    raise CommandError(
+                        f'Ответы различаются для {user} и рецептов {page}:'
+                        f'\n{default.decode()}\n{fast.decode()}'
+                    )
+            for recipe in ids:
+                default = self.render_detail(recipe, user)
+                document = self.render_document(recipe, user)
+                if default != document:
+                    raise CommandError(
+                        f'Документ рецепта {recipe} отличается для {user}:'
+                        f'\n{default.decode()}\n{document.decode()}'
+                    )
+        return len(ids)
+
+    def measure(self, render, page, user, repeat):
+        """Среднее время одного ответа в мс."""
+        start = time.perf_counter()
+        for _ in range(repeat):
+            render(page, user)
+        return (time.perf_counter() - start) / repeat * 1000
+
+    def handle(self, *args, **options):
+        allowed = settings.ALLOWED_HOSTS[0] if settings.ALLOWED_HOSTS else ''
+        self.host = options['host'] or (
+            'localhost' if allowed in ('', '*') else allowed.lstrip('.')
+        )
+        viewers = [AnonymousUser(), *User.objects.all()[:options['users']]]
+        checked = self.check_parity(viewers, options['limit'])
+        self.stdout.write(
+            f'Ответы совпадают: {checked} рецептов, '
+            f'{len(viewers)} пользователей'
+        )
+        page = list(
+            Recipe.objects.values_list('id', flat=True)[:options['limit']]
+        )
+        if not page:
+            return
+        user = viewers[-1]
+        default = self.measure(
+            self.render_default, page, user, options['repeat']
+        )
+        fast = self.measure(self.render_fast, page, user, options['repeat'])
+        self.stdout.write(f'GetRecipeSerializer: {default:.3f} мс/страница')
+        self.stdout.write(f'Быстрая сериализация: {fast:.3f} мс/страница')
+        self.stdout.write(self.style.SUCCESS(
+            f'Ускорение: {default / fast:.1f}x'
+        ))
+        detail = self.measure(
+            self.render_detail, page[0], user, options['repeat']
+        )
+        cached = self.measure(
+            self.render_cached, page[0], user, options['repeat']
+        )
+        self.stdout.write(
+            f'Карточка через GetRecipeSerializer: {detail:.3f} мс'
+        )
+        self.stdout.write(f'Карточка из документа: {cached:.3f} мс')
+        self.stdout.write(self.style.SUCCESS(
+            f'Ускорение: {detail / cached:.1f}x'
+        ))
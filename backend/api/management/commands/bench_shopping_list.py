@@ -0,0 +1,121 @@
+"""Замер сборки списка покупок на большой корзине."""
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart)
+from recipes.shopping_list import change_carts
+from recipes.units import sum_by_units
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает суммирование корзины в Python, в БД по строкам '
+        'корзины и по сводному списку покупок; данные откатываются'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--recipes', type=int, default=500,
+            help='Количество рецептов в корзине'
+        )
+        parser.add_argument(
+            '--ingredients', type=int, default=10,
+            help='Ингредиентов в каждом рецепте'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20,
+            help='Количество повторов при замере'
+        )
+
+    def timed(self, func, repeat):
+        """Результат функции и среднее время вызова в мс."""
+        start = time.perf_counter()
+        for _ in range(repeat):
+            result = func()
+        return result, (time.perf_counter() - start) / repeat * 1000
+
+    def fill_cart(self, recipes, per_recipe):
+        ingredients = list(Ingredient.objects.values_list('id', flat=True))
+        if len(ingredients) < per_recipe:
+            raise CommandError(
+                'В справочнике меньше ингредиентов, чем нужно на рецепт'
+            )
+        user = User.objects.create_user(
+            username='shopping-list-bench',
+            email='shopping-list-bench@example.com',
+            first_name='Bench',
+            last_name='Bench'
+        )
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=user, name=f'bench-{number}', text='bench',
+                cooking_time=1, image='recipes_images/bench.png'
+            )
+            for number in range(recipes)
+        )
+        # Не все БД возвращают первичные ключи из bulk_create
+        created = list(Recipe.objects.filter(author=user).only('id'))
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe, ingredient_id=ingredient_id,
+                amount=random.randint(1, 500)
+            )
+            for recipe in created
+            for ingredient_id in random.sample(ingredients, per_recipe)
+        )
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=user, recipe=recipe) for recipe in created
+        )
+        change_carts((user.id, recipe.id) for recipe in created)
+        return user
+
+    def python_totals(self, user):
+        """Суммирование по названию в Python, как до сводной таблицы."""
+        totals = {}
+        for name, unit, amount in RecipeIngredient.objects.filter(
+            recipe__shoppingcarts__user=user
+        ).values_list(
+            'ingredient__name', 'ingredient__measurement_unit', 'amount'
+        ).order_by('ingredient__name'):
+            total = totals.get(name, (0, unit))[0]
+            totals[name] = (total + amount, unit)
+        return totals
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        with transaction.atomic():
+            user = self.fill_cart(options['recipes'], options['ingredients'])
+            legacy, python_time = self.timed(
+                lambda: self.python_totals(user), repeat
+            )
+            rows, rows_time = self.timed(
+                lambda: sum_by_units(RecipeIngredient.objects.filter(
+                    recipe__shoppingcarts__user=user
+                )),
+                repeat
+            )
+            items, items_time = self.timed(
+                lambda: sum_by_units(user.shopping_list_items.all()),
+                repeat
+            )
+            transaction.set_rollback(True)
+        if rows != items:
+            raise CommandError('Суммы по корзине и по списку различаются')
+        self.stdout.write(
+            f'Корзина: {options["recipes"]} рецептов, '
+            f'{options["recipes"] * options["ingredients"]} строк, '
+            f'{len(items)} строк списка'
+        )
+        self.stdout.write(
+            f'Python по строкам корзины: {python_time:.3f} мс '
+            f'({len(legacy)} строк)'
+        )
+        self.stdout.write(f'БД по строкам корзины: {rows_time:.3f} мс')
+        self.stdout.write(self.style.SUCCESS(
+            f'БД по сводному списку: {items_time:.3f} мс'
+        ))
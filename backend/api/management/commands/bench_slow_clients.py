@@ -0,0 +1,51 @@
+"""Сравнение WSGI- и ASGI-развертывания под медленными клиентами."""
+import asyncio
+
+from django.core.management.base import BaseCommand
+
+from foodgram.loadtest import fetch, run_load, summarize
+
+
+class Command(BaseCommand):
+    help = (
+        'Нагружает запущенный сервер медленными клиентами и выводит '
+        'пропускную способность и задержки. Запустите дважды: против '
+        'gunicorn с foodgram.wsgi и с foodgram.asgi (SERVER_MODE=asgi).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', default='http://127.0.0.1:8000/api/recipes/',
+            help='Адрес, к которому отправляются запросы'
+        )
+        parser.add_argument(
+            '--clients', type=int, default=200,
+            help='Количество одновременных клиентов'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=1000,
+            help='Общее количество запросов'
+        )
+        parser.add_argument(
+            '--trickle', type=float, default=0.01,
+            help='Пауза между порциями данных клиента, секунд'
+        )
+
+    def handle(self, *args, **options):
+        url, trickle = options['url'], options['trickle']
+        results, elapsed = asyncio.run(run_load(
+            (
+                lambda: fetch(url, trickle=trickle)
+                for _ in range(options['requests'])
+            ),
+            options['clients'],
+        ))
+        summary = summarize(results, elapsed)
+        self.stdout.write(
+            f'{url}: {summary["requests"]} запросов, '
+            f'{options["clients"]} клиентов, ошибок {summary["errors"]}'
+        )
+        self.stdout.write(
+            f'{summary["rps"]:.1f} запр/с, p50 {summary["p50"]:.1f} мс, '
+            f'p95 {summary["p95"]:.1f} мс, p99 {summary["p99"]:.1f} мс'
+        )
@@ -0,0 +1,46 @@
+"""Потоковая выгрузка ингредиентов и рецептов."""
+import sys
+
+from django.core.management.base import BaseCommand
+
+from recipes.exports import FORMATS, write_export
+from recipes.resources import RESOURCES
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает таблицу в CSV или JSON Lines потоком, не загружая ее '
+        'в память целиком'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=RESOURCES)
+        parser.add_argument(
+            '--format', choices=FORMATS, default='csv', dest='export_format'
+        )
+        parser.add_argument(
+            '--output', default=None,
+            help='Файл для выгрузки (по умолчанию стандартный вывод)'
+        )
+
+    def handle(self, *args, **options):
+        resource = RESOURCES[options['resource']]()
+        queryset = resource.get_queryset()
+
+        def progress(done, total):
+            if options['verbosity'] > 1:
+                self.stderr.write(f'Выгружено {done} из {total}')
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                count = write_export(
+                    file, resource, queryset, options['export_format'],
+                    progress
+                )
+        else:
+            count = write_export(
+                sys.stdout, resource, queryset, options['export_format'],
+                progress
+            )
+        if options['verbosity'] and options['output']:
+            self.stdout.write(f'Выгружено строк: {count}')
@@ -0,0 +1,38 @@
+"""Выгрузка коротких ссылок в map-файл nginx."""
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.shortlinks import encode, recipe_path
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Записывает соответствие коротких ссылок страницам рецептов в '
+        'формате map nginx, чтобы перенаправления не доходили до Django'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=settings.SHORT_LINKS_MAP_PATH,
+            help='Путь к map-файлу'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        # Пишем во временный файл и подменяем атомарно, чтобы nginx
+        # при перезагрузке не прочитал файл наполовину
+        temporary = f'{path}.tmp'
+        count = 0
+        with open(temporary, 'w') as file:
+            for pk in Recipe.objects.order_by('id').values_list(
+                'id', flat=True
+            ).iterator():
+                file.write(f'/s/{encode(pk)}/ {recipe_path(pk)};\n')
+                count += 1
+        os.replace(temporary, path)
+        if options['verbosity']:
+            self.stdout.write(f'Записано коротких ссылок: {count} в {path}')
@@ -0,0 +1,85 @@
+"""Пакетная загрузка ингредиентов и рецептов из CSV или JSON Lines."""
+import csv
+import json
+from itertools import islice
+
+import tablib
+from django.core.management.base import BaseCommand, CommandError
+
+from foodgram.constants import IMPORT_BATCH_SIZE
+from recipes.resources import RESOURCES
+
+
+def read_rows(file, path):
+    """Заголовки и итератор строк файла CSV или JSON Lines."""
+    if path.endswith('.jsonl'):
+        lines = (json.loads(line) for line in file if line.strip())
+        first = next(lines, None)
+        if first is None:
+            return [], iter(())
+        headers = list(first)
+
+        def rows():
+            yield [first.get(header) for header in headers]
+            for item in lines:
+                yield [item.get(header) for header in headers]
+        return headers, rows()
+    reader = csv.reader(file)
+    return next(reader, []), reader
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает выгрузку export_data порциями: память не зависит от '
+        'размера файла, строки пишутся пакетами'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('resource', choices=RESOURCES)
+        parser.add_argument('path', help='Файл .csv или .jsonl')
+        parser.add_argument(
+            '--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+            help='Количество строк в одной порции'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Проверить файл без записи в БД'
+        )
+
+    def handle(self, *args, **options):
+        resource = RESOURCES[options['resource']]()
+        totals = {}
+        with open(options['path'], encoding='utf-8', newline='') as file:
+            headers, rows = read_rows(file, options['path'])
+            while True:
+                batch = list(islice(rows, options['batch_size']))
+                if not batch:
+                    break
+                result = resource.import_data(
+                    tablib.Dataset(*batch, headers=headers),
+                    dry_run=options['dry_run'],
+                    use_transactions=True
+                )
+                if result.has_errors() or result.has_validation_errors():
+                    raise CommandError(self.describe_errors(result))
+                for kind, count in result.totals.items():
+                    totals[kind] = totals.get(kind, 0) + count
+                if options['verbosity'] > 1:
+                    self.stdout.write(f'Обработано порций: {totals}')
+        if options['verbosity']:
+            self.stdout.write(', '.join(
+                f'{kind}: {count}' for kind, count in totals.items() if count
+            ) or 'Нет строк для загрузки')
+
+    def describe_errors(self, result):
+        messages = [str(error.error) for error in result.base_errors[:5]]
+        messages += [
+            str(error.error)
+            for _, errors in result.row_errors()[:5]
+            for error in errors
+        ]
+        messages += [
+            f'Строка {row.number}: {row.error_dict}'
+            for row in result.invalid_rows[:5]
+        ]
+        return 'Ошибки загрузки:\n' + '\n'.join(messages)
@@ -0,0 +1,55 @@
+"""Загрузка справочника ингредиентов из файла."""
+import csv
+import json
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from recipes.models import Ingredient
+
+
+def read_ingredients(path):
+    """Читает пары (название, единица измерения) из JSON или CSV."""
+    with open(path, encoding='utf-8') as file:
+        if path.endswith('.csv'):
+            return [tuple(row[:2]) for row in csv.reader(file) if row]
+        return [
+            (item['name'], item['measurement_unit'])
+            for item in json.load(file)
+        ]
+
+
+class Command(BaseCommand):
+    help = 'Добавляет в базу ингредиенты из файла, которых в ней еще нет'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=settings.INGREDIENTS_DATA_PATH,
+            help='Путь к ingredients.json или ingredients.csv'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        if not os.path.exists(path):
+            self.stderr.write(f'Файл {path} не найден')
+            return
+        existing = set(
+            Ingredient.objects.values_list('name', 'measurement_unit')
+        )
+        new = {
+            item for item in read_ingredients(path) if item not in existing
+        }
+        Ingredient.objects.bulk_create(
+            (
+                Ingredient(name=name, measurement_unit=unit)
+                for name, unit in new
+            ),
+            batch_size=1000,
+            ignore_conflicts=True
+        )
+        if options['verbosity']:
+            self.stdout.write(
+                f'Добавлено ингредиентов: {len(new)}, '
+                f'уже было: {len(existing)}'
+            )
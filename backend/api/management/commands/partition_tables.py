@@ -0,0 +1,46 @@
+"""Секционирование корзин, избранного и подписок в PostgreSQL."""
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from foodgram.db.partitioning import (is_partitioned, merge_tables,
+                                      partition_tables)
+from recipes.models import FavoriteRecipes, ShoppingCart
+from users.models import Subscribers
+
+TABLES = [
+    model._meta.db_table
+    for model in (ShoppingCart, FavoriteRecipes, Subscribers)
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Секционирует таблицы связей пользователей по user_id или '
+        'возвращает их к обычным; выполнять при остановленном приложении'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--partitions', type=int, default=settings.DB_PARTITIONS or 16,
+            help='Число хеш-секций'
+        )
+        parser.add_argument(
+            '--undo', action='store_true',
+            help='Вернуть обычные таблицы'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Секционирование доступно только в PostgreSQL')
+        with transaction.atomic():
+            if options['undo']:
+                merge_tables(connection, TABLES)
+            else:
+                partition_tables(connection, TABLES, options['partitions'])
+        for table in TABLES:
+            state = (
+                'секционирована' if is_partitioned(connection, table)
+                else 'обычная'
+            )
+            self.stdout.write(f'{table}: {state}')
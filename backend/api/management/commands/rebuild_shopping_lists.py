@@ -0,0 +1,31 @@
+"""Пересборка сводных списков покупок из корзин."""
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from foodgram.constants import IMPORT_BATCH_SIZE
+from recipes.shopping_list import rebuild
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        'Собирает сводные списки покупок заново из корзин пользователей; '
+        'нужна после изменения данных в обход приложения'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'users', nargs='*', type=int,
+            help='Идентификаторы пользователей (по умолчанию все)'
+        )
+
+    def handle(self, *args, **options):
+        user_ids = options['users'] or list(
+            User.objects.filter(
+                Q(shoppingcarts__isnull=False)
+                | Q(shopping_list_items__isnull=False)
+            ).distinct().values_list('id', flat=True)
+        )
+        for start in range(0, len(user_ids), IMPORT_BATCH_SIZE):
+            rebuild(user_ids[start:start + IMPORT_BATCH_SIZE])
+        self.stdout.write(f'Собрано списков: {len(user_ids)}')
@@ -0,0 +1,115 @@
+"""Нагрузочный сценарий по записанному трафику."""
+import asyncio
+from itertools import cycle, islice
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from foodgram.loadtest import fetch, run_load, summarize, summarize_routes
+from foodgram.traffic import read_traffic
+
+
+class Command(BaseCommand):
+    help = (
+        'Воспроизводит трафик, записанный traffic_recorder_middleware, '
+        'против запущенного сервера с заданной параллельностью и выводит '
+        'пропускную способность, задержки и долю ошибок по маршрутам'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--file', default=settings.TRAFFIC_LOG_PATH,
+            help='Файл записанного трафика (JSONL)'
+        )
+        parser.add_argument(
+            '--url', default='http://127.0.0.1:8000',
+            help='Адрес сервера без пути'
+        )
+        parser.add_argument(
+            '--concurrency', type=int, nargs='+', default=[10],
+            help='Число одновременных клиентов; несколько значений — '
+                 'несколько прогонов'
+        )
+        parser.add_argument(
+            '--requests', type=int,
+            help='Количество запросов; запись повторяется по кругу, '
+                 'по умолчанию воспроизводится один раз'
+        )
+        parser.add_argument(
+            '--token', action='append', default=[],
+            help='Токен тестового пользователя; записанные пользователи '
+                 'распределяются по токенам. Без токенов запросы '
+                 'пользователей пропускаются.'
+        )
+
+    def scenario(self, lines, tokens):
+        """Запросы сценария: (маршрут, адрес, заголовки)."""
+        assigned = {}
+        requests = []
+        skipped = 0
+        for line in lines:
+            headers = {}
+            user = line.get('user')
+            if user is not None:
+                if not tokens:
+                    skipped += 1
+                    continue
+                if user not in assigned:
+                    assigned[user] = tokens[len(assigned) % len(tokens)]
+                headers['Authorization'] = f'Token {assigned[user]}'
+            method = line.get('method', 'GET')
+            route = line.get('route') or line['path'].split('?')[0]
+            requests.append((
+                f'{method} {route}', method,
+                self.base_url + line['path'], headers
+            ))
+        return requests, skipped, len(assigned)
+
+    def report(self, title, summary):
+        self.stdout.write(
+            f'{title}: {summary["requests"]} запросов, '
+            f'{summary["rps"]:.1f} запр/с, p50 {summary["p50"]:.1f} мс, '
+            f'p95 {summary["p95"]:.1f} мс, p99 {summary["p99"]:.1f} мс, '
+            f'ошибок {summary["error_rate"]:.1f}%, '
+            f'429: {summary["throttled"]}'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            lines = read_traffic(options['file'])
+        except FileNotFoundError:
+            raise CommandError(
+                f'Файл {options["file"]} не найден: запишите трафик с '
+                'TRAFFIC_RECORD=True'
+            )
+        self.base_url = options['url'].rstrip('/')
+        requests, skipped, users = self.scenario(lines, options['token'])
+        if not requests:
+            raise CommandError('В записи нет запросов для воспроизведения')
+        if options['requests']:
+            requests = list(islice(cycle(requests), options['requests']))
+        self.stdout.write(
+            f'Запросов в сценарии: {len(requests)}, пользователей: {users}, '
+            f'пропущено без токена: {skipped}'
+        )
+        for concurrency in options['concurrency']:
+            results, elapsed = asyncio.run(run_load(
+                (
+                    lambda method=method, url=url, headers=headers: fetch(
+                        url, method=method, headers=headers
+                    )
+                    for _, method, url, headers in requests
+                ),
+                concurrency,
+            ))
+            self.stdout.write(self.style.SUCCESS(
+                f'Параллельность {concurrency}'
+            ))
+            self.report('Всего', summarize(results, elapsed))
+            routes = summarize_routes(
+                [route for route, *_ in requests], results, elapsed
+            )
+            for route, summary in sorted(
+                routes.items(), key=lambda item: -item[1]['requests']
+            ):
+                self.report(route, summary)
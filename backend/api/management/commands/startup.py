@@ -0,0 +1,117 @@
+"""Подготовка контейнера к запуску сервера."""
+import hashlib
+import os
+import time
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles import finders
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+
+# Раньше миграции генерировались makemigrations при каждом запуске
+# контейнера: в таких базах эти изменения схемы уже применены
+LEGACY_MIGRATIONS = (
+    ('recipes', '0003_sync_model_options', '0003_auto_'),
+    ('users', '0002_sync_model_options', '0002_auto_'),
+)
+
+STATIC_FINGERPRINT_FILE = '.collectstatic-fingerprint'
+
+
+def static_fingerprint():
+    """Отпечаток исходной статики по путям, размерам и времени изменения."""
+    digest = hashlib.sha1()
+    files = sorted(
+        (path, storage.path(path))
+        for finder in finders.get_finders()
+        for path, storage in finder.list(['CVS', '.*', '*~'])
+    )
+    for path, full_path in files:
+        stat = os.stat(full_path)
+        digest.update(f'{path}:{stat.st_size}:{stat.st_mtime_ns}'.encode())
+    return digest.hexdigest()
+
+
+class Command(BaseCommand):
+    help = (
+        'Ждет БД, применяет миграции, собирает статику и загружает '
+        'начальные данные. Неизменные шаги пропускаются, время каждого '
+        'шага выводится в лог.'
+    )
+    phases = ('database', 'migrate', 'collectstatic', 'superuser',
+              'ingredients', 'short_links')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--phases', nargs='+', choices=self.phases, default=self.phases,
+            help='Выполнить только указанные шаги'
+        )
+
+    def database(self):
+        call_command('wait_for_db', create=True, verbosity=0)
+        return 'готова'
+
+    def migrate(self):
+        recorder = MigrationExecutor(connection).recorder
+        applied = recorder.applied_migrations()
+        for app, name, legacy_prefix in LEGACY_MIGRATIONS:
+            if (app, name) not in applied and any(
+                applied_app == app and applied_name.startswith(legacy_prefix)
+                for applied_app, applied_name in applied
+            ):
+                recorder.record_applied(app, name)
+        executor = MigrationExecutor(connection)
+        if not executor.migration_plan(executor.loader.graph.leaf_nodes()):
+            return 'пропущено, новых миграций нет'
+        call_command('migrate', interactive=False, verbosity=0)
+        return 'миграции применены'
+
+    def collectstatic(self):
+        fingerprint = static_fingerprint()
+        stamp = os.path.join(settings.STATIC_ROOT, STATIC_FINGERPRINT_FILE)
+        if os.path.exists(stamp):
+            with open(stamp) as file:
+                if file.read() == fingerprint:
+                    return 'пропущено, статика не изменилась'
+        call_command('collectstatic', interactive=False, verbosity=0)
+        with open(stamp, 'w') as file:
+            file.write(fingerprint)
+        return 'статика собрана'
+
+    def superuser(self):
+        user_model = get_user_model()
+        email = os.getenv('DJANGO_SUPERUSER_EMAIL', 'admin@foodgram.ru')
+        if user_model.objects.filter(email=email).exists():
+            return 'пропущено, суперпользователь уже есть'
+        user_model.objects.create_superuser(
+            email=email,
+            username=os.getenv('DJANGO_SUPERUSER_USERNAME', 'admin'),
+            password=os.getenv('DJANGO_SUPERUSER_PASSWORD', 'Test@12345'),
+            first_name='Администратор',
+            last_name='Foodgram'
+        )
+        return 'суперпользователь создан'
+
+    def ingredients(self):
+        call_command('load_ingredients', verbosity=0)
+        return 'справочник актуален'
+
+    def short_links(self):
+        call_command('export_short_links', verbosity=0)
+        return 'map-файл коротких ссылок обновлен'
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        for phase in options['phases']:
+            phase_started = time.perf_counter()
+            result = getattr(self, phase)()
+            self.stdout.write(
+                f'{phase}: {result} '
+                f'({time.perf_counter() - phase_started:.2f} с)'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Подготовка завершена за {time.perf_counter() - started:.2f} с'
+        ))
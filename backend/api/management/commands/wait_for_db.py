@@ -0,0 +1,77 @@
+"""Ожидание готовности базы данных."""
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Ждет, пока база данных начнет принимать соединения. '
+        'С --create создает базу данных PostgreSQL, если ее нет.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--timeout', type=float, default=60,
+            help='Максимальное время ожидания, секунд'
+        )
+        parser.add_argument(
+            '--create', action='store_true',
+            help='Создать базу данных, если она не существует'
+        )
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+
+    def create_database(self, connection):
+        """
+        Создает базу данных через служебную базу postgres отдельным
+        соединением с параметрами соединения Django.
+        """
+        if connection.vendor != 'postgresql':
+            return
+        import psycopg2
+
+        name = connection.settings_dict['NAME']
+        params = {**connection.get_connection_params(), 'database': 'postgres'}
+        # Ошибки psycopg2 превращаются в OperationalError Django, после
+        # которой цикл ожидания повторяет попытку
+        with connection.wrap_database_errors:
+            server = psycopg2.connect(**params)
+            try:
+                server.autocommit = True
+                with server.cursor() as cursor:
+                    cursor.execute(
+                        'SELECT 1 FROM pg_database WHERE datname = %s', [name]
+                    )
+                    if cursor.fetchone() is None:
+                        quoted = connection.ops.quote_name(name)
+                        cursor.execute(f'CREATE DATABASE {quoted}')
+                        self.stdout.write(f'Создана база данных {name}')
+            finally:
+                server.close()
+
+    def check_connection(self, connection):
+        """Открывает соединение и выполняет простой запрос."""
+        connection.ensure_connection()
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        deadline = time.monotonic() + options['timeout']
+        # Короткая первая пауза и экспоненциальный рост вместо
+        # постоянного опроса каждые 0.1 с
+        delay = 0.05
+        while True:
+            try:
+                if options['create']:
+                    self.create_database(connection)
+                self.check_connection(connection)
+                break
+            except OperationalError as error:
+                if time.monotonic() + delay > deadline:
+                    raise CommandError(f'База данных недоступна: {error}')
+                time.sleep(delay)
+                delay = min(delay * 2, 1)
+        if options['verbosity']:
+            self.stdout.write('База данных готова')
@@ -0,0 +1,17 @@
+from foodgram.db.replicas import use_replica
+
+
+class ReplicaReadMixin:
+    """
+    Выполняет GET-действия из replica_actions на реплике БД.
+
+    Реплика выбирается после аутентификации, чтобы учесть закрепление
+    пользователя за основной базой после его изменений.
+    """
+
+    replica_actions = ()
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method == 'GET' and self.action in self.replica_actions:
+            use_replica(request)
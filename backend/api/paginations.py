@@ -2,9 +2,23 @@
 from rest_framework.pagination import PageNumberPagination
 
 from foodgram.constants import DEFAULT_PAGES_LIMIT
+from .limits import max_page_size, parse_limit
 
 
 class Pagination(PageNumberPagination):
     """Кастомный класс пагинации для API проекта."""
     page_size_query_param = 'limit'
     page_size = DEFAULT_PAGES_LIMIT
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.max_page_size = max_page_size(view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_page_size(self, request):
+        """Размер страницы из limit: урезается до максимума действия."""
+        page_size = parse_limit(
+            request.query_params.get(self.page_size_query_param),
+            self.max_page_size,
+            self.page_size_query_param
+        )
+        return self.page_size if page_size is None else page_size
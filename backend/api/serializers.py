@@ -1,9 +1,16 @@
+from django.db import transaction
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
-from recipes.models import (FavoriteRecipes, Ingredient, Recipe,
-                            RecipeIngredient, ShoppingCart)
-from users.models import Subscribers, User
+from foodgram.constants import BATCH_MAX_SIZE
+from jobs.models import Job
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            ShoppingListItem)
+from recipes.shopping_list import propagate_recipe_changes
+from users.models import User
+from .documents import schedule_refresh
+from .limits import get_recipes_limit
+from .viewer import get_viewer_state
 
 
 class UsersSerializer(serializers.ModelSerializer):
@@ -28,11 +35,8 @@ class UsersSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request')
-        return (user and user.user.is_authenticated
-                and Subscribers.objects.filter(
-                    author=obj,
-                    user=user.user).exists())
+        return get_viewer_state(
+            self.context.get('request')).is_subscribed(obj)
 
 
 class HelperRecipeSerializer(serializers.ModelSerializer):
@@ -46,6 +50,15 @@ class HelperRecipeSerializer(serializers.ModelSerializer):
         fields = ('id', 'name', 'image', 'cooking_time')
 
 
+class BatchIdsSerializer(serializers.Serializer):
+    """Список идентификаторов для пакетных операций."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=BATCH_MAX_SIZE
+    )
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -77,31 +90,25 @@ class AuthorWithRecipesSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if user.is_anonymous:
-            return False
-        return Subscribers.objects.filter(
-            author=obj,
-            user=user
-        ).exists()
+        return get_viewer_state(
+            self.context.get('request')).is_subscribed(obj)
 
     def get_recipes(self, obj):
-        request = self.context.get('request')
-        limit = request.GET.get('recipes_limit')
-        recipes = obj.recipes.all()
-        if limit:
-            try:
-                recipes = recipes[:int(limit)]
-            except ValueError:
-                pass
+        # Превью, загруженное вьюсетом заранее, уже ограничено
+        recipes = getattr(obj, 'preview_recipes', None)
+        if recipes is None:
+            recipes = obj.recipes.all()[
+                :get_recipes_limit(self.context.get('request'))
+            ]
         return GetRecipeSerializer(
             recipes,
             many=True,
-            context={'request': request}
+            context=self.context
         ).data
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        count = getattr(obj, 'recipes_total', None)
+        return obj.recipes.count() if count is None else count
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -156,28 +163,48 @@ class GetRecipeSerializer(serializers.ModelSerializer):
         read_only_fields = fields
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context.get('request')
-        return bool(user and user.user.is_authenticated
-                    and ShoppingCart.objects.filter(
-                        recipe=obj, user=user.user).exists())
+        return get_viewer_state(
+            self.context.get('request')).is_in_shopping_cart(obj)
 
     def get_is_favorited(self, obj):
-        user = self.context.get('request')
-        return bool(user and user.user.is_authenticated
-                    and FavoriteRecipes.objects.filter(
-                        recipe=obj, user=user.user).exists())
+        return get_viewer_state(
+            self.context.get('request')).is_favorited(obj)
+
+
+class AddRecipeIngredientListSerializer(serializers.ListSerializer):
+    """
+    Список ингредиентов рецепта.
+
+    Все идентификаторы разрешаются одним in_bulk() вместо отдельного
+    запроса на каждый ингредиент, неизвестные id сообщаются разом.
+    """
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        ingredients = Ingredient.objects.in_bulk(
+            {item['ingredient'] for item in items}
+        )
+        missing = sorted(
+            {item['ingredient'] for item in items} - ingredients.keys()
+        )
+        if missing:
+            raise serializers.ValidationError(
+                'Ингредиенты не найдены: '
+                f'{", ".join(str(pk) for pk in missing)}'
+            )
+        for item in items:
+            item['ingredient'] = ingredients[item['ingredient']]
+        return items
 
 
 class AddRecipeIngredientSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-        source='ingredient'
-    )
+    id = serializers.IntegerField(min_value=1, source='ingredient')
     amount = serializers.IntegerField(min_value=1)
 
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'amount')
+        list_serializer_class = AddRecipeIngredientListSerializer
 
 
 class AddRecipeSerializer(serializers.ModelSerializer):
@@ -213,6 +240,54 @@ class AddRecipeSerializer(serializers.ModelSerializer):
             ) for ingredient in ingredients
         )
 
+    def update_ingredients(self, ingredients, recipe):
+        """
+        Приводит ингредиенты рецепта к новому списку по разнице.
+
+        Удаленные строки удаляются одним запросом, измененные количества
+        обновляются одним bulk_update, новые добавляются одним
+        bulk_create. Неизмененный состав не порождает записей.
+        """
+        current = {
+            item.ingredient_id: item
+            for item in recipe.recipeingredients.all()
+        }
+        amounts = {
+            ingredient['ingredient'].id: ingredient['amount']
+            for ingredient in ingredients
+        }
+
+        removed = current.keys() - amounts.keys()
+        if removed:
+            RecipeIngredient.objects.filter(
+                recipe=recipe, ingredient_id__in=removed
+            ).delete()
+
+        # Изменения количеств для списков покупок; удаленные строки
+        # учитываются сигналом post_delete
+        deltas = {}
+        changed = []
+        for ingredient_id, item in current.items():
+            amount = amounts.get(ingredient_id)
+            if amount is not None and item.amount != amount:
+                deltas[ingredient_id] = amount - item.amount
+                item.amount = amount
+                changed.append(item)
+        if changed:
+            RecipeIngredient.objects.bulk_update(changed, ('amount',))
+
+        added = [
+            ingredient for ingredient in ingredients
+            if ingredient['ingredient'].id not in current
+        ]
+        if added:
+            self.add_ingredients(added, recipe)
+            deltas.update(
+                (ingredient['ingredient'].id, ingredient['amount'])
+                for ingredient in added
+            )
+        propagate_recipe_changes(recipe.id, deltas)
+
     def validate(self, data):
         ingredients = data.get('ingredients')
         if not ingredients:
@@ -233,18 +308,50 @@ class AddRecipeSerializer(serializers.ModelSerializer):
             })
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         recipe = super().create(validated_data)
         self.add_ingredients(ingredients, recipe)
+        schedule_refresh([recipe.id])
         return recipe
 
+    @transaction.atomic
     def update(self, recipe, validated_data):
         ingredients = validated_data.pop('ingredients')
-        recipe.ingredients.clear()
         recipe = super().update(recipe, validated_data)
-        self.add_ingredients(ingredients, recipe)
+        self.update_ingredients(ingredients, recipe)
+        # Пакетные операции с ингредиентами не отправляют сигналы,
+        # поэтому документ рецепта обновляется явно
+        schedule_refresh([recipe.id])
         return recipe
 
     def to_representation(self, recipe):
         return GetRecipeSerializer(recipe, context=self.context).data
+
+
+class ShoppingListItemSerializer(serializers.ModelSerializer):
+    """Строка сводного списка покупок."""
+
+    id = serializers.IntegerField(source='ingredient_id')
+    name = serializers.CharField(source='ingredient.name')
+    measurement_unit = serializers.CharField(
+        source='ingredient.measurement_unit'
+    )
+
+    class Meta:
+        model = ShoppingListItem
+        fields = ('id', 'name', 'measurement_unit', 'amount')
+        read_only_fields = fields
+
+
+class JobSerializer(serializers.ModelSerializer):
+    """Состояние фоновой задачи."""
+
+    class Meta:
+        model = Job
+        fields = (
+            'id', 'name', 'state', 'attempts', 'done', 'total', 'result',
+            'error', 'created_at', 'finished_at'
+        )
+        read_only_fields = fields
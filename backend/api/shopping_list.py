@@ -0,0 +1,37 @@
+"""Текстовый список покупок пользователя."""
+from datetime import datetime
+
+from recipes.models import ShoppingCart
+from recipes.units import format_amount, sum_by_units
+
+
+def shopping_list_lines(user):
+    """Строки текстового списка покупок пользователя."""
+    # Получаем все рецепты из корзины пользователя
+    shopping_cart_items = ShoppingCart.objects.filter(
+        user=user
+    ).select_related('recipe__author')
+    recipes = [item.recipe for item in shopping_cart_items]
+
+    # Формируем заголовок текстового файла
+    yield "Foodgram - список покупок\n"
+    yield f"Пользователь: {user.username}\n"
+    yield f"Дата: {datetime.now().strftime('%d.%m.%Y %H:%M')}\n\n"
+
+    if not recipes:
+        yield "Ваш список покупок пуст."
+        return
+
+    # Добавляем информацию о рецептах и авторах
+    yield "Рецепты в вашем списке:\n"
+    for i, recipe in enumerate(recipes, 1):
+        yield (f"{i}. {recipe.name} - "
+               f"автор: {recipe.author.username}\n")
+
+    yield "\nИнгредиенты для приготовления:\n"
+
+    # Суммы ингредиентов заранее собраны в сводном списке покупок,
+    # здесь они только сводятся к общим единицам измерения
+    items = sum_by_units(user.shopping_list_items.all())
+    for i, (name, amount, unit) in enumerate(items, 1):
+        yield f"{i}. {name} - {format_amount(amount)} {unit}\n"
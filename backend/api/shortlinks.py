@@ -0,0 +1,119 @@
+"""
+Короткие ссылки на рецепты: /s/<код>/.
+
+Код — запись идентификатора рецепта в base62, первый символ которого
+всегда буква. Поэтому код однозначно восстанавливается без таблицы
+ссылок, а старые ссылки вида /s/<id>/ из одних цифр по-прежнему
+поддерживаются. Ссылки обрабатываются short_link_middleware до сессий,
+CSRF и аутентификации и отдаются с долгим кэшированием. Перед этим
+проверяется, что рецепт существует: перенаправление по коду
+несуществующего рецепта браузеры и прокси запомнили бы навсегда.
+Такие ссылки доходят до ShortLinkRedirectView и получают 404.
+"""
+import asyncio
+import re
+import string
+
+from asgiref.sync import sync_to_async
+from django.http import HttpResponsePermanentRedirect
+from django.utils.cache import patch_cache_control
+from django.utils.decorators import sync_and_async_middleware
+
+from foodgram.constants import SHORT_LINK_MAX_AGE
+from recipes.models import Recipe
+
+# Буквы идут первыми: символ с индексом меньше 52 — всегда буква
+ALPHABET = string.ascii_letters + string.digits
+BASE = len(ALPHABET)
+LETTERS = len(string.ascii_letters)
+INDEX = {symbol: index for index, symbol in enumerate(ALPHABET)}
+
+PATH_RE = re.compile(r'^/s/(?P<code>[0-9A-Za-z]+)/?$')
+
+
+def encode(pk):
+    """Код короткой ссылки для идентификатора рецепта."""
+    symbols = []
+    while True:
+        pk, index = divmod(pk, BASE)
+        symbols.append(ALPHABET[index])
+        if not pk:
+            break
+    if INDEX[symbols[-1]] >= LETTERS:
+        symbols.append(ALPHABET[0])
+    return ''.join(reversed(symbols))
+
+
+def decode(code):
+    """
+    Идентификатор рецепта по коду или None для неверного кода.
+
+    Строка из цифр считается старой ссылкой с идентификатором. Код с
+    лишними ведущими символами не принимается, поэтому у рецепта ровно
+    одна короткая ссылка.
+    """
+    if code.isdigit():
+        return int(code)
+    if not code or INDEX.get(code[0], BASE) >= LETTERS:
+        return None
+    pk = 0
+    for symbol in code:
+        if symbol not in INDEX:
+            return None
+        pk = pk * BASE + INDEX[symbol]
+    return pk if encode(pk) == code else None
+
+
+def recipe_path(pk):
+    return f'/recipes/{pk}/'
+
+
+def resolve(code):
+    """Путь страницы рецепта для кода или None, если рецепта нет."""
+    pk = decode(code)
+    if pk is None or not Recipe.objects.filter(id=pk).exists():
+        return None
+    return recipe_path(pk)
+
+
+def redirect_response(path):
+    """Постоянное перенаправление, которое можно кэшировать."""
+    response = HttpResponsePermanentRedirect(path)
+    patch_cache_control(response, public=True, max_age=SHORT_LINK_MAX_AGE)
+    return response
+
+
+def short_link_code(request):
+    """Код короткой ссылки из пути запроса или None."""
+    if request.method not in ('GET', 'HEAD'):
+        return None
+    match = PATH_RE.match(request.path_info)
+    return None if match is None else match['code']
+
+
+def short_link_response(code):
+    path = resolve(code)
+    return None if path is None else redirect_response(path)
+
+
+@sync_and_async_middleware
+def short_link_middleware(get_response):
+    """Отвечает на короткие ссылки, не передавая запрос дальше."""
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            code = short_link_code(request)
+            response = None
+            if code is not None:
+                # Проверка рецепта обращается к БД
+                response = await sync_to_async(short_link_response)(code)
+            if response is None:
+                response = await get_response(request)
+            return response
+    else:
+        def middleware(request):
+            code = short_link_code(request)
+            response = None if code is None else short_link_response(code)
+            if response is None:
+                response = get_response(request)
+            return response
+    return middleware
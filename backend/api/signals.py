@@ -0,0 +1,159 @@
+"""
+Сброс кэшей при изменении токенов, пользователей и рецептов,
+поддержка сводных списков покупок.
+"""
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib.auth.signals import user_logged_out
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from recipes.models import (FavoriteRecipes, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart)
+from recipes.shopping_list import (change_carts, propagate_recipe_changes,
+                                   rebuild, schedule_rebuild_for_recipes)
+from recipes.signals import bulk_changed, carts_archive_changed
+from users.models import Subscribers, User
+from .authentication import (invalidate_token, invalidate_user_tokens,
+                             invalidate_users_tokens)
+from .conditional import INGREDIENTS, RECIPES, bump_versions, user_scope
+from .documents import schedule_refresh
+from .ingredient_index import schedule_rebuild
+
+# Поля пользователя, входящие в документ рецепта
+AUTHOR_DOCUMENT_FIELDS = frozenset(
+    ('email', 'username', 'first_name', 'last_name', 'avatar')
+)
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    invalidate_token(instance.key)
+
+
+@receiver(post_save, sender=User)
+@receiver(user_logged_out)
+def user_changed(sender, user=None, instance=None, **kwargs):
+    user = user or instance
+    if user is not None:
+        invalidate_user_tokens(user)
+
+
+@receiver(carts_archive_changed)
+def carts_archive_changed_handler(sender, user_ids, **kwargs):
+    # Пользователи сохранены update(): в кэше токенов прежний флаг
+    # cart_archived, а ответы с корзиной устарели
+    invalidate_users_tokens(user_ids)
+    bump_versions(user_scope(user_id) for user_id in user_ids)
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    schedule_refresh([instance.id])
+    bump_versions([RECIPES])
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    schedule_refresh([instance.recipe_id])
+    bump_versions([RECIPES])
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, instance, created=False, **kwargs):
+    bump_versions([INGREDIENTS, RECIPES])
+    if settings.INGREDIENT_INDEX:
+        schedule_rebuild()
+    if not created:
+        schedule_refresh(
+            instance.recipeingredients.values_list('recipe_id', flat=True)
+        )
+
+
+@receiver(post_save, sender=User)
+def author_changed(sender, instance, created, update_fields=None, **kwargs):
+    if created or (
+        update_fields and not AUTHOR_DOCUMENT_FIELDS & set(update_fields)
+    ):
+        return
+    schedule_refresh(instance.recipes.values_list('id', flat=True))
+    bump_versions([RECIPES])
+
+
+@receiver(post_save, sender=FavoriteRecipes)
+@receiver(post_delete, sender=FavoriteRecipes)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_save, sender=Subscribers)
+@receiver(post_delete, sender=Subscribers)
+def viewer_relation_changed(sender, instance, **kwargs):
+    bump_versions([user_scope(instance.user_id)])
+
+
+@receiver(bulk_changed, sender=Recipe)
+@receiver(bulk_changed, sender=RecipeIngredient)
+@receiver(bulk_changed, sender=Ingredient)
+def recipes_bulk_changed(sender, ids=(), **kwargs):
+    # Для рецептов и их ингредиентов ids — идентификаторы рецептов
+    if ids and sender is not Ingredient:
+        schedule_refresh(ids)
+    bump_versions(
+        [RECIPES, INGREDIENTS] if sender is Ingredient else [RECIPES]
+    )
+    if sender is Ingredient and settings.INGREDIENT_INDEX:
+        schedule_rebuild()
+
+
+@receiver(post_save, sender=ShoppingCart)
+def shopping_cart_saved(sender, instance, created, **kwargs):
+    if created:
+        change_carts([(instance.user_id, instance.recipe_id)])
+    else:
+        # Прежний рецепт измененной записи неизвестен
+        rebuild([instance.user_id])
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def shopping_cart_deleted(sender, instance, **kwargs):
+    change_carts([(instance.user_id, instance.recipe_id)], sign=-1)
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def recipe_ingredient_saving(sender, instance, **kwargs):
+    # Прежние значения нужны, чтобы перенести в списки покупок разницу
+    instance.previous_values = None if instance.pk is None else (
+        RecipeIngredient.objects.filter(pk=instance.pk).values_list(
+            'recipe_id', 'ingredient_id', 'amount'
+        ).first()
+    )
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def recipe_ingredient_saved(sender, instance, **kwargs):
+    changes = defaultdict(lambda: defaultdict(int))
+    previous = getattr(instance, 'previous_values', None)
+    if previous is not None:
+        recipe_id, ingredient_id, amount = previous
+        changes[recipe_id][ingredient_id] -= amount
+    changes[instance.recipe_id][instance.ingredient_id] += instance.amount
+    for recipe_id, deltas in changes.items():
+        propagate_recipe_changes(recipe_id, deltas)
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_deleted(sender, instance, **kwargs):
+    propagate_recipe_changes(
+        instance.recipe_id, {instance.ingredient_id: -instance.amount}
+    )
+
+
+@receiver(bulk_changed, sender=RecipeIngredient)
+def recipe_ingredients_imported(sender, ids=(), **kwargs):
+    # Прежние количества при импорте неизвестны
+    if ids:
+        schedule_rebuild_for_recipes(ids)
@@ -0,0 +1,673 @@
+import os
+import tempfile
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+from django.contrib.auth.signals import user_logged_out
+from django.core.cache import cache
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         TransactionTestCase, override_settings)
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.test import APIClient
+
+from recipes.archive import archive_carts
+from recipes.models import (ArchivedShoppingCart, FavoriteRecipes,
+                            Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingListItem)
+from users.models import Subscribers, User
+
+from . import async_views, coalescing, ingredient_index
+from .authentication import (CachedTokenAuthentication, local_cache,
+                             token_cache_key)
+from .checks import shared_cache_check, shared_cache_deploy_check
+from .conditional import get_versions, user_scope
+from .shortlinks import decode, encode, short_link_middleware
+from .views import CustomUserViewSet, IngredientsViewSet, RecipesViewSet
+
+
+class AsyncViewsTest(TransactionTestCase):
+    """Асинхронные представления отвечают так же, как синхронные."""
+
+    # Действие вьюсета выполняется в другом потоке со своим соединением,
+    # поэтому данные должны быть зафиксированы
+
+    def setUp(self):
+        author = User.objects.create_user(
+            email='author@example.com', username='author', password='x',
+            first_name='Автор', last_name='Авторов'
+        )
+        self.ingredient = Ingredient.objects.create(
+            name='соль', measurement_unit='г'
+        )
+        self.recipe = Recipe.objects.create(
+            author=author, name='Суп', text='Варить', cooking_time=30,
+            image='recipes_images/soup.png'
+        )
+        RecipeIngredient.objects.create(
+            recipe=self.recipe, ingredient=self.ingredient, amount=5
+        )
+        self.factory = RequestFactory()
+
+    def assertSameResponse(self, async_view, sync_view, path, **kwargs):
+        expected = sync_view(self.factory.get(path), **kwargs)
+        expected.render()
+        response = async_to_sync(async_view)(self.factory.get(path), **kwargs)
+        self.assertEqual(response.status_code, expected.status_code)
+        self.assertEqual(dict(response.items()), dict(expected.items()))
+        self.assertEqual(response.content, expected.content)
+        return response
+
+    def test_recipes(self):
+        list_view = RecipesViewSet.as_view({'get': 'list', 'post': 'create'})
+        detail_view = RecipesViewSet.as_view({
+            'get': 'retrieve', 'put': 'update', 'patch': 'partial_update',
+            'delete': 'destroy',
+        })
+        response = self.assertSameResponse(
+            async_views.recipe_list, list_view, '/api/recipes/'
+        )
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(response['Vary'], 'Accept')
+        self.assertEqual(response['Allow'], 'GET, POST, HEAD, OPTIONS')
+        self.assertSameResponse(
+            async_views.recipe_list, list_view, '/api/recipes/?limit=abc'
+        )
+        self.assertSameResponse(
+            async_views.recipe_detail, detail_view,
+            f'/api/recipes/{self.recipe.id}/', pk=self.recipe.id
+        )
+        response = self.assertSameResponse(
+            async_views.recipe_detail, detail_view, '/api/recipes/0/', pk=0
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_ingredients(self):
+        self.assertSameResponse(
+            async_views.ingredient_list,
+            IngredientsViewSet.as_view({'get': 'list'}),
+            '/api/ingredients/?name=со'
+        )
+        self.assertSameResponse(
+            async_views.ingredient_detail,
+            IngredientsViewSet.as_view({'get': 'retrieve'}),
+            f'/api/ingredients/{self.ingredient.id}/',
+            pk=self.ingredient.id
+        )
+
+
+class ArchiveCartsTest(TransactionTestCase):
+    """Корзина уходит в архив и возвращается при следующем запросе."""
+
+    # Кэши сбрасываются после фиксации транзакций
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            email='user@example.com', username='user', password='x',
+            first_name='Имя', last_name='Фамилия'
+        )
+        salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+        self.recipe = Recipe.objects.create(
+            author=self.user, name='Суп', text='Варить', cooking_time=30
+        )
+        RecipeIngredient.objects.create(
+            recipe=self.recipe, ingredient=salt, amount=5
+        )
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user)}'
+        )
+
+    def cart_ids(self):
+        response = self.client.get('/api/recipes/?is_in_shopping_cart=1')
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_round_trip(self):
+        # Пользователь токена попадает в кэш с корзиной не в архиве
+        self.assertEqual(self.cart_ids(), [self.recipe.id])
+        versions = get_versions([user_scope(self.user.id)])
+        self.assertEqual(archive_carts([self.user.id]), 1)
+        self.assertFalse(ShoppingCart.objects.exists())
+        self.assertFalse(ShoppingListItem.objects.exists())
+        self.assertNotEqual(
+            get_versions([user_scope(self.user.id)]), versions
+        )
+        # Кэш токена сброшен: запрос видит флаг и возвращает корзину
+        self.assertEqual(self.cart_ids(), [self.recipe.id])
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.cart_archived)
+        self.assertFalse(ArchivedShoppingCart.objects.exists())
+        self.assertEqual(
+            list(ShoppingListItem.objects.values_list('user_id', 'amount')),
+            [(self.user.id, 5)]
+        )
+
+
+class ShortLinksTest(TestCase):
+    """Коды коротких ссылок и перенаправления по ним."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            email='author@example.com', username='author', password='x',
+            first_name='Автор', last_name='Авторов'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=author, name='Суп', text='Варить', cooking_time=30
+        )
+
+    def test_round_trip(self):
+        for pk in (0, 1, 51, 52, 61, 62, 3843, 3844, 10 ** 12):
+            code = encode(pk)
+            self.assertTrue(code[0].isalpha(), code)
+            self.assertEqual(decode(code), pk)
+
+    def test_legacy_numeric(self):
+        self.assertEqual(decode('123'), 123)
+        self.assertEqual(decode('0'), 0)
+
+    def test_invalid_codes(self):
+        # Не с буквы, с лишним ведущим символом, не из алфавита
+        for code in ('', '1a', 'a' + encode(5), 'b-c', 'абв'):
+            self.assertIsNone(decode(code), code)
+
+    def test_redirect(self):
+        for code in (encode(self.recipe.id), str(self.recipe.id)):
+            response = self.client.get(f'/s/{code}/')
+            self.assertEqual(response.status_code, 301)
+            self.assertEqual(
+                response['Location'], f'/recipes/{self.recipe.id}/'
+            )
+            self.assertIn('max-age=31536000', response['Cache-Control'])
+            self.assertIn('public', response['Cache-Control'])
+
+    def test_missing_recipe(self):
+        for code in (encode(self.recipe.id + 1), str(self.recipe.id + 1)):
+            response = self.client.get(f'/s/{code}/')
+            self.assertEqual(response.status_code, 404)
+            self.assertNotIn('public', response.get('Cache-Control', ''))
+
+    def test_async_middleware(self):
+        async def get_response(request):
+            return None
+
+        middleware = short_link_middleware(get_response)
+        factory = RequestFactory()
+        response = async_to_sync(middleware)(
+            factory.get(f'/s/{encode(self.recipe.id)}/')
+        )
+        self.assertEqual(response.status_code, 301)
+        self.assertIsNone(async_to_sync(middleware)(
+            factory.get(f'/s/{encode(self.recipe.id + 1)}/')
+        ))
+
+
+MEMCACHED = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+        'LOCATION': '127.0.0.1:11211',
+    }
+}
+
+
+class SharedCacheCheckTest(SimpleTestCase):
+    """Режимы, хранящие состояние в кэше, требуют общего кэша."""
+
+    def error_ids(self):
+        return [
+            error.id
+            for check in (shared_cache_check, shared_cache_deploy_check)
+            for error in check(None)
+        ]
+
+    @override_settings(CONDITIONAL_GET=True, RECIPE_DOCUMENTS=True)
+    def test_local_cache(self):
+        self.assertEqual(
+            self.error_ids(), ['api.E001', 'api.E001', 'api.W001']
+        )
+        with override_settings(CONDITIONAL_GET=False):
+            self.assertEqual(self.error_ids(), ['api.E001', 'api.W001'])
+
+    @override_settings(
+        CONDITIONAL_GET=True, RECIPE_DOCUMENTS=True, CACHES=MEMCACHED
+    )
+    def test_shared_cache(self):
+        self.assertEqual(self.error_ids(), [])
+
+    def test_coalescing_in_process_with_local_cache(self):
+        compute = mock.Mock(return_value=1)
+        with mock.patch.object(coalescing, 'compute_shared') as shared:
+            self.assertEqual(coalescing.single_flight('key', compute), 1)
+            shared.assert_not_called()
+            with override_settings(CACHES=MEMCACHED):
+                coalescing.single_flight('key', compute)
+            shared.assert_called_once_with('key', compute)
+
+
+class RelationTogglesTest(TestCase):
+    """Избранное, корзина и подписки включаются одним INSERT."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author = [
+            User.objects.create_user(
+                email=f'{name}@example.com', username=name, password='x',
+                first_name='Имя', last_name='Фамилия'
+            )
+            for name in ('user', 'author')
+        ]
+        salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+        cls.recipe = Recipe.objects.create(
+            author=cls.author, name='Суп', text='Варить', cooking_time=30
+        )
+        RecipeIngredient.objects.create(
+            recipe=cls.recipe, ingredient=salt, amount=5
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_add_twice(self):
+        for action, model in (
+            ('favorite', FavoriteRecipes), ('shopping_cart', ShoppingCart)
+        ):
+            url = f'/api/recipes/{self.recipe.id}/{action}/'
+            response = self.client.post(url)
+            self.assertEqual(response.status_code, 201)
+            self.assertEqual(response.json()['name'], 'Суп')
+            # Повтор ловится уникальным индексом в точке сохранения:
+            # транзакция запроса остается рабочей
+            response = self.client.post(url)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('Суп', response.json()['errors'])
+            self.assertEqual(model.objects.filter(user=self.user).count(), 1)
+        # Повтор не прибавляет ингредиенты второй раз
+        self.assertEqual(
+            list(ShoppingListItem.objects.values_list('user_id', 'amount')),
+            [(self.user.id, 5)]
+        )
+
+    def test_missing_recipe(self):
+        for action in ('favorite', 'shopping_cart'):
+            response = self.client.post(
+                f'/api/recipes/{self.recipe.id + 1}/{action}/'
+            )
+            self.assertEqual(response.status_code, 404)
+
+    def test_delete(self):
+        ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        url = f'/api/recipes/{self.recipe.id}/shopping_cart/'
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertFalse(ShoppingListItem.objects.exists())
+        self.assertEqual(self.client.delete(url).status_code, 404)
+        self.assertEqual(
+            self.client.delete(
+                f'/api/recipes/{self.recipe.id}/favorite/'
+            ).status_code,
+            404
+        )
+
+    def test_subscribe(self):
+        url = f'/api/users/{self.author.id}/subscribe/'
+        self.assertEqual(self.client.post(url).status_code, 201)
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('author', response.json()['errors'])
+        self.assertEqual(
+            self.client.post(
+                f'/api/users/{self.user.id}/subscribe/'
+            ).status_code,
+            400
+        )
+        self.assertEqual(
+            self.client.post(
+                f'/api/users/{self.author.id + 10}/subscribe/'
+            ).status_code,
+            404
+        )
+        self.assertEqual(self.client.delete(url).status_code, 204)
+        self.assertEqual(self.client.delete(url).status_code, 404)
+        self.assertFalse(Subscribers.objects.exists())
+
+
+class BatchRelationsTest(TestCase):
+    """Пакетное добавление в корзину, избранное и подписки."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user, cls.author = [
+            User.objects.create_user(
+                email=f'{name}@example.com', username=name, password='x',
+                first_name='Имя', last_name='Фамилия'
+            )
+            for name in ('user', 'author')
+        ]
+        salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+        cls.recipes = []
+        for amount in (5, 10):
+            recipe = Recipe.objects.create(
+                author=cls.author, name='Суп', text='Варить', cooking_time=30
+            )
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=salt, amount=amount
+            )
+            cls.recipes.append(recipe)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, url, ids):
+        response = self.client.post(url, {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return {
+            result['id']: result['status']
+            for result in response.json()['results']
+        }
+
+    def shopping_list(self):
+        return list(ShoppingListItem.objects.values_list('user_id', 'amount'))
+
+    def test_statuses(self):
+        first, second = [recipe.id for recipe in self.recipes]
+        FavoriteRecipes.objects.create(user=self.user, recipe_id=first)
+        self.assertEqual(
+            self.post('/api/recipes/favorite/batch/', [first, second, 999]),
+            {first: 'exists', second: 'created', 999: 'not_found'}
+        )
+        self.assertEqual(
+            self.post(
+                '/api/users/subscribe/batch/', [self.author.id, self.user.id]
+            ),
+            {self.author.id: 'created', self.user.id: 'self'}
+        )
+        self.assertTrue(Subscribers.objects.filter(
+            user=self.user, author=self.author
+        ).exists())
+
+    def test_empty_list(self):
+        for url in (
+            '/api/recipes/shopping_cart/batch/',
+            '/api/recipes/favorite/batch/',
+            '/api/users/subscribe/batch/',
+        ):
+            response = self.client.post(url, {'ids': []}, format='json')
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('ids', response.json())
+
+    def test_duplicate_ids(self):
+        first, second = [recipe.id for recipe in self.recipes]
+        response = self.client.post(
+            '/api/recipes/shopping_cart/batch/',
+            {'ids': [second, first, second, first]}, format='json'
+        )
+        self.assertEqual(
+            response.json()['results'],
+            [
+                {'id': second, 'status': 'created'},
+                {'id': first, 'status': 'created'},
+            ]
+        )
+        self.assertEqual(self.shopping_list(), [(self.user.id, 15)])
+
+    def test_concurrent_insert(self):
+        first, second = [recipe.id for recipe in self.recipes]
+        # Параллельный запрос добавил первый рецепт после того, как
+        # текущий прочитал существующие связи
+        ShoppingCart.objects.create(user=self.user, recipe_id=first)
+        queries = []
+        manager_filter = ShoppingCart.objects.filter
+
+        def stale_filter(*args, **kwargs):
+            queries.append(kwargs)
+            queryset = manager_filter(*args, **kwargs)
+            return queryset.none() if len(queries) == 1 else queryset
+
+        with mock.patch.object(ShoppingCart.objects, 'filter', stale_filter):
+            statuses = self.post(
+                '/api/recipes/shopping_cart/batch/', [first, second]
+            )
+        self.assertEqual(statuses, {first: 'exists', second: 'created'})
+        self.assertEqual(ShoppingCart.objects.count(), 2)
+        # Рецепт из параллельного запроса учтен один раз
+        self.assertEqual(self.shopping_list(), [(self.user.id, 15)])
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    """Кэш токенов сбрасывается при изменениях и не мешает записи."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.com', username='user', password='x',
+            first_name='Имя', last_name='Фамилия'
+        )
+
+    def setUp(self):
+        cache.clear()
+        local_cache.items.clear()
+        self.token = Token.objects.create(user=self.user)
+        self.authentication = CachedTokenAuthentication()
+        self.factory = RequestFactory()
+
+    def authenticate(self, method='get'):
+        request = getattr(self.factory, method)(
+            '/api/users/me/', HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+        user, _ = self.authentication.authenticate(request)
+        return user
+
+    def assertCached(self, cached=True):
+        key = self.token.key
+        for value in (
+            local_cache.get(key), cache.get(token_cache_key(key))
+        ):
+            self.assertEqual(value is not None, cached)
+
+    def test_cached(self):
+        self.assertEqual(self.authenticate(), self.user)
+        self.assertCached()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(), self.user)
+        # Без записи в кэше процесса пользователь берется из общего кэша
+        local_cache.items.clear()
+        with self.assertNumQueries(0):
+            self.authenticate()
+
+    def test_token_delete(self):
+        self.authenticate()
+        self.token.delete()
+        self.assertCached(False)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_user_change(self):
+        self.authenticate()
+        self.user.first_name = 'Другое'
+        self.user.save()
+        self.assertCached(False)
+        self.assertEqual(self.authenticate().first_name, 'Другое')
+
+    def test_logout(self):
+        self.authenticate()
+        user_logged_out.send(User, request=None, user=self.user)
+        self.assertCached(False)
+
+    def test_write_request_reloads_user(self):
+        self.authenticate()
+        # Изменение из другого процесса, кэш здесь не сброшен
+        User.objects.filter(id=self.user.id).update(first_name='Другое')
+        self.assertEqual(self.authenticate().first_name, 'Имя')
+        self.assertEqual(self.authenticate('post').first_name, 'Другое')
+        User.objects.filter(id=self.user.id).update(is_active=False)
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate('patch')
+
+
+class IngredientIndexTest(TestCase):
+    """Индекс ингредиентов отвечает так же, как запросы к БД."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit=unit)
+            for name, unit in (
+                ('соль', 'г'), ('соль морская', 'г'), ('сода', 'г'),
+                ('вода', 'мл'), ('Tofu', 'г'), ('tomato', 'шт'),
+                ('соль', 'щепотка'),
+            )
+        ]
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_override = override_settings(
+            INGREDIENT_INDEX_PATH=os.path.join(
+                directory.name, 'ingredients.idx'
+            )
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        # Индекс процесса открывается заново, подмена файла видна сразу
+        for name, value in (
+            ('_index', None), ('INGREDIENT_INDEX_CHECK_INTERVAL', 0)
+        ):
+            patcher = mock.patch.object(ingredient_index, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def get_both(self, url):
+        responses = []
+        for enabled in (False, True):
+            with override_settings(INGREDIENT_INDEX=enabled):
+                response = self.client.get(url)
+            responses.append((response.status_code, response.json()))
+        return responses
+
+    def test_search_parity(self):
+        for name in (
+            '', 'со', 'соль', 'соль мор', 'мор соль', 'со,соль', ' вода ',
+            'to', 'TO', 'нет',
+        ):
+            with self.subTest(name=name):
+                orm, index = self.get_both(
+                    f'/api/ingredients/?name={name}'
+                )
+                self.assertEqual(orm, index)
+        self.assertEqual(
+            len(self.get_both('/api/ingredients/?name=соль')[1][1]), 3
+        )
+
+    def test_detail_parity(self):
+        for pk in [ingredient.id for ingredient in self.ingredients] + [
+            self.ingredients[-1].id + 1
+        ]:
+            with self.subTest(pk=pk):
+                orm, index = self.get_both(f'/api/ingredients/{pk}/')
+                self.assertEqual(orm, index)
+        self.assertEqual(
+            self.client.get('/api/ingredients/x/').status_code, 404
+        )
+
+    @override_settings(INGREDIENT_INDEX=True)
+    def test_rebuild_on_change(self):
+        index = ingredient_index.get_index()
+        with self.captureOnCommitCallbacks(execute=True):
+            ingredient = Ingredient.objects.create(
+                name='сахар', measurement_unit='г'
+            )
+        # Новый файл подменил прежний: процесс открывает его по inode
+        new_index = ingredient_index.get_index()
+        self.assertIsNot(new_index, index)
+        self.assertNotEqual(new_index.identity, index.identity)
+        self.assertEqual(new_index.get(ingredient.id)['name'], 'сахар')
+        self.assertIsNone(index.get(ingredient.id))
+        self.assertIs(ingredient_index.get_index(), new_index)
+
+
+@override_settings(
+    API_MAX_PAGE_SIZE=7, API_MAX_RECIPES_LIMIT=2, API_LIMIT_REJECT_ABOVE=10
+)
+class LimitsTest(TestCase):
+    """Большие limit и recipes_limit урезаются, недопустимые — 400."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.com', username='user', password='x',
+            first_name='Имя', last_name='Фамилия'
+        )
+        cls.authors = []
+        for number in range(3):
+            author = User.objects.create_user(
+                email=f'author{number}@example.com',
+                username=f'author{number}', password='x',
+                first_name='Имя', last_name='Фамилия'
+            )
+            Subscribers.objects.create(user=cls.user, author=author)
+            cls.authors.append(author)
+        Recipe.objects.bulk_create(
+            Recipe(
+                author=cls.authors[0], name=f'Рецепт {number}', text='Текст',
+                cooking_time=10
+            )
+            for number in range(8)
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertRejected(self, url, name):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn(name, response.json())
+
+    def test_page_size(self):
+        for limit, expected in (('', 6), (2, 2), (8, 7), (10, 7)):
+            with self.subTest(limit=limit):
+                response = self.client.get(f'/api/recipes/?limit={limit}')
+                self.assertEqual(len(response.json()['results']), expected)
+        for limit in (0, -1, 11, 'abc', '1.5'):
+            with self.subTest(limit=limit):
+                self.assertRejected(f'/api/recipes/?limit={limit}', 'limit')
+
+    def test_subscriptions_page_size(self):
+        with mock.patch.object(
+            CustomUserViewSet, 'max_page_sizes', {'subscriptions': 2}
+        ):
+            response = self.client.get('/api/users/subscriptions/?limit=5')
+        self.assertEqual(len(response.json()['results']), 2)
+
+    def recipes_counts(self, query=''):
+        response = self.client.get(f'/api/users/subscriptions/{query}')
+        return {
+            author['id']: len(author['recipes'])
+            for author in response.json()['results']
+        }
+
+    def test_recipes_limit(self):
+        author = self.authors[0].id
+        self.assertEqual(self.recipes_counts()[author], 2)
+        self.assertEqual(self.recipes_counts('?recipes_limit=1')[author], 1)
+        self.assertEqual(self.recipes_counts('?recipes_limit=10')[author], 2)
+        for limit in (0, 11, 'x'):
+            with self.subTest(limit=limit):
+                self.assertRejected(
+                    f'/api/users/subscriptions/?recipes_limit={limit}',
+                    'recipes_limit'
+                )
+
+    def test_subscribe_checks_limit_first(self):
+        author = User.objects.create_user(
+            email='new@example.com', username='new', password='x',
+            first_name='Имя', last_name='Фамилия'
+        )
+        response = self.client.post(
+            f'/api/users/{author.id}/subscribe/?recipes_limit=0'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Subscribers.objects.filter(author=author).exists())
@@ -0,0 +1,57 @@
+"""
+Ограничение частоты и параллельности дорогих запросов.
+
+Частота ограничивается по областям действий вьюсетов
+(throttle_scopes = {действие: область}) с лимитами из
+REST_FRAMEWORK['DEFAULT_THROTTLE_RATES']; история запросов хранится в
+кэше, поэтому при общем кэше лимит действует на все воркеры.
+
+Параллельность ограничивается в каждом процессе: сверх
+CONCURRENCY_LIMITS[область] одновременных вычислений запрос сразу
+получает 429 и не занимает соединение с БД в очереди.
+"""
+import threading
+from contextlib import contextmanager
+
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import ScopedRateThrottle, SimpleRateThrottle
+
+from foodgram.constants import CONCURRENCY_LIMITS, CONCURRENCY_RETRY_AFTER
+
+
+class ActionScopedRateThrottle(ScopedRateThrottle):
+    """ScopedRateThrottle с областью по действию вьюсета."""
+
+    def allow_request(self, request, view):
+        self.scope = getattr(view, 'throttle_scopes', {}).get(
+            getattr(view, 'action', None)
+        )
+        if not self.scope:
+            return True
+        self.rate = self.get_rate()
+        self.num_requests, self.duration = self.parse_rate(self.rate)
+        return SimpleRateThrottle.allow_request(self, request, view)
+
+
+_semaphores = {
+    scope: threading.BoundedSemaphore(limit)
+    for scope, limit in CONCURRENCY_LIMITS.items()
+}
+
+
+@contextmanager
+def limit_concurrency(scope):
+    """Занимает место области scope или сразу отвечает 429."""
+    semaphore = _semaphores.get(scope)
+    if semaphore is None:
+        yield
+        return
+    if not semaphore.acquire(blocking=False):
+        raise Throttled(
+            wait=CONCURRENCY_RETRY_AFTER,
+            detail='Слишком много одновременных запросов, повторите позже.'
+        )
+    try:
+        yield
+    finally:
+        semaphore.release()
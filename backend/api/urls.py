@@ -1,9 +1,11 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
 from .views import (
     CustomUserViewSet,
     IngredientsViewSet,
+    JobsViewSet,
     RecipesViewSet,
 )
 
@@ -13,8 +15,20 @@ router = DefaultRouter()
 router.register('users', CustomUserViewSet, basename='users')
 router.register('ingredients', IngredientsViewSet, basename='ingredients')
 router.register('recipes', RecipesViewSet, basename='recipes')
+router.register('jobs', JobsViewSet, basename='jobs')
 
 urlpatterns = [
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
 ]
+
+if settings.ASGI_MODE:
+    from . import async_views
+
+    # Асинхронные маршруты чтения имеют приоритет над маршрутами роутера
+    urlpatterns = [
+        path('recipes/', async_views.recipe_list),
+        path('recipes/<int:pk>/', async_views.recipe_detail),
+        path('ingredients/', async_views.ingredient_list),
+        path('ingredients/<int:pk>/', async_views.ingredient_detail),
+    ] + urlpatterns
@@ -0,0 +1,68 @@
+"""Состояние текущего пользователя в рамках одного запроса."""
+from functools import cached_property
+
+from django.contrib.auth.models import AnonymousUser
+
+from recipes.models import FavoriteRecipes, ShoppingCart
+from users.models import Subscribers
+
+
+class ViewerState:
+    """
+    Множества идентификаторов, связанных с текущим пользователем.
+
+    Каждое множество загружается одним запросом при первом обращении
+    и затем отвечает на проверки принадлежности без обращения к БД.
+    Сериализаторы получают его через get_viewer_state(), поэтому список
+    рецептов или подписок с любой вложенностью стоит не больше трех
+    запросов на флаги is_subscribed, is_favorited и is_in_shopping_cart.
+    """
+
+    def __init__(self, user):
+        self.user = user
+
+    def load_ids(self, queryset, field):
+        if not self.user.is_authenticated:
+            return frozenset()
+        return frozenset(
+            queryset.filter(user=self.user).values_list(field, flat=True)
+        )
+
+    @cached_property
+    def subscribed_author_ids(self):
+        return self.load_ids(Subscribers.objects, 'author_id')
+
+    @cached_property
+    def favorite_recipe_ids(self):
+        return self.load_ids(FavoriteRecipes.objects, 'recipe_id')
+
+    @cached_property
+    def shopping_cart_recipe_ids(self):
+        return self.load_ids(ShoppingCart.objects, 'recipe_id')
+
+    def is_subscribed(self, author):
+        return author.id in self.subscribed_author_ids
+
+    def is_favorited(self, recipe):
+        return recipe.id in self.favorite_recipe_ids
+
+    def is_in_shopping_cart(self, recipe):
+        return recipe.id in self.shopping_cart_recipe_ids
+
+
+def get_viewer_state(request):
+    """
+    Возвращает состояние пользователя, общее для всех сериализаторов.
+
+    Хранится на объекте HttpRequest, поэтому доступно и вложенным
+    сериализаторам, и при нескольких обертках Request. Без запроса
+    возвращается состояние анонимного пользователя.
+    """
+    if request is None:
+        return ViewerState(AnonymousUser())
+    http_request = getattr(request, '_request', request)
+    state = getattr(http_request, 'viewer_state', None)
+    if state is None:
+        state = ViewerState(request.user)
+        http_request.viewer_state = state
+    return state
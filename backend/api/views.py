@@ -1,44 +1,164 @@
-import base64
-from datetime import datetime
-
-from django.core.files.base import ContentFile
-from django.db.models import F
-from django.http import FileResponse
-from django.shortcuts import redirect, get_object_or_404
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, OuterRef, Prefetch, Subquery
+from django.http import FileResponse, Http404
+from django.shortcuts import get_object_or_404
 from django.urls import reverse
 from django.views import View
 from djoser.views import UserViewSet
-from rest_framework import status, viewsets
+from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
+from rest_framework.generics import get_object_or_404 as get_or_404
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 
+from foodgram.constants import SUBSCRIPTIONS_MAX_PAGE_SIZE
+from jobs.models import Job
 from recipes.models import (
-    FavoriteRecipes, Ingredient, Recipe, ShoppingCart
+    FavoriteRecipes, Ingredient, Recipe, RecipeIngredient, ShoppingCart
 )
+from recipes.shopping_list import change_carts
 from users.models import Subscribers, User
+from .coalescing import coalesce, request_key, single_flight
+from .conditional import (INGREDIENTS, RECIPES, VIEWER, bump_versions,
+                          conditional_get, user_scope)
+from .documents import get_document, render_document
+from .fast_serializers import RECIPE_FIELDS, serialize_recipes
 from .filters import IngredientsFilter, RecipesFilter
+from .ingredient_index import get_index
+from .jobs import (is_base64_image, prefers_async, run_async, save_avatar,
+                   save_recipe_in_background, store_avatar)
+from .limits import get_recipes_limit
+from .mixins import ReplicaReadMixin
 from .paginations import Pagination
 from .permissions import IsAuthorOrReadOnly
 from .serializers import (
-    AddRecipeSerializer, AuthorWithRecipesSerializer,
-    GetRecipeSerializer, IngredientSerializer
+    AddRecipeSerializer, AuthorWithRecipesSerializer, BatchIdsSerializer,
+    GetRecipeSerializer, HelperRecipeSerializer, IngredientSerializer,
+    JobSerializer, ShoppingListItemSerializer
 )
+from .shopping_list import shopping_list_lines
+from .shortlinks import encode, redirect_response, resolve
+from .throttling import limit_concurrency
+
+# Результаты обработки элементов пакетного запроса
+BATCH_CREATED = 'created'
+BATCH_EXISTS = 'exists'
+BATCH_NOT_FOUND = 'not_found'
+BATCH_SELF = 'self'
+
+
+def add_relations_in_bulk(model, user, field, ids, targets,
+                          forbidden_id=None):
+    """
+    Пакетно создает связи пользователя с объектами (рецептами, авторами).
+
+    Существующие объекты и уже созданные связи определяются двумя
+    запросами с id__in, новые связи добавляются одним bulk_create.
+    Возвращает статус для каждого переданного идентификатора.
+
+    Если параллельный запрос успел создать часть связей между чтением и
+    вставкой, вставка откатывается до точки сохранения, такие связи
+    получают статус exists, а остальные вставляются заново. Поэтому
+    список покупок не учитывает рецепт дважды.
+    """
+    ids = list(dict.fromkeys(ids))
+    found = set(
+        targets.filter(id__in=ids).values_list('id', flat=True)
+    )
+    existing = set(
+        model.objects.filter(
+            user=user, **{f'{field}_id__in': found}
+        ).values_list(f'{field}_id', flat=True)
+    )
+    created = [pk for pk in ids if pk in found and pk not in existing]
+    while created:
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create(
+                    model(user=user, **{f'{field}_id': pk}) for pk in created
+                )
+            break
+        except IntegrityError:
+            # Часть связей успел создать параллельный запрос
+            raced = set(
+                model.objects.filter(
+                    user=user, **{f'{field}_id__in': created}
+                ).values_list(f'{field}_id', flat=True)
+            )
+            if not raced:
+                raise
+            existing |= raced
+            created = [pk for pk in created if pk not in raced]
+    if created:
+        # bulk_create не отправляет сигналы, версию связей и список
+        # покупок обновляем явно
+        bump_versions([user_scope(user.id)])
+        if model is ShoppingCart:
+            change_carts((user.id, pk) for pk in created)
+    results = []
+    for pk in ids:
+        if pk == forbidden_id:
+            result = BATCH_SELF
+        elif pk not in found:
+            result = BATCH_NOT_FOUND
+        elif pk in existing:
+            result = BATCH_EXISTS
+        else:
+            result = BATCH_CREATED
+        results.append({'id': pk, 'status': result})
+    return Response({'results': results}, status=status.HTTP_200_OK)
+
+
+def with_recipe_previews(authors, limit):
+    """
+    Загружает для авторов число рецептов и не больше limit рецептов
+    превью тремя запросами на страницу, а не запросами на каждого автора.
+    """
+    previews = Recipe.objects.filter(
+        id__in=Subquery(
+            Recipe.objects.filter(author=OuterRef('author')).values('id')[
+                :limit
+            ]
+        )
+    ).select_related('author').prefetch_related(
+        Prefetch(
+            'recipeingredients',
+            queryset=RecipeIngredient.objects.select_related(
+                'ingredient'
+            ).order_by('id')
+        )
+    )
+    return authors.annotate(
+        recipes_total=Count('recipes', distinct=True)
+    ).prefetch_related(
+        Prefetch('recipes', queryset=previews, to_attr='preview_recipes')
+    )
 
 
 class ShortLinkRedirectView(View):
-    """Представление для перенаправления коротких ссылок на рецепты."""
+    """
+    Представление для перенаправления коротких ссылок на рецепты.
+
+    Обычно ссылки обрабатывает short_link_middleware раньше; маршрут
+    нужен для reverse() и на случай отключения промежуточного слоя.
+    """
 
-    def get(self, request, pk):
+    def get(self, request, code):
         """Обработка GET-запроса для перенаправления на страницу рецепта."""
-        # Перенаправляем на страницу рецепта в UI
-        return redirect(f'/recipes/{pk}/')
+        path = resolve(code)
+        if path is None:
+            raise Http404
+        return redirect_response(path)
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(ReplicaReadMixin, UserViewSet):
     """Представление для управления пользователями."""
 
     pagination_class = Pagination
+    replica_actions = ('list', 'retrieve', 'subscriptions')
+    throttle_scopes = {'subscriptions': 'subscriptions'}
+    max_page_sizes = {'subscriptions': SUBSCRIPTIONS_MAX_PAGE_SIZE}
 
     def get_permissions(self):
         """Определяет права доступа для разных действий."""
@@ -62,9 +182,9 @@ class CustomUserViewSet(UserViewSet):
                     status=status.HTTP_400_BAD_REQUEST
                 )
 
-            user.avatar.delete()
+            user.avatar.delete(save=False)
             user.avatar = None
-            user.save()
+            user.save(update_fields=['avatar'])
 
             return Response(status=status.HTTP_204_NO_CONTENT)
 
@@ -74,33 +194,30 @@ class CustomUserViewSet(UserViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        try:
-            image_data = request.data['avatar']
-            if (isinstance(image_data, str)
-                    and image_data.startswith('data:image')):
-                format, imgstr = image_data.split(';base64,')
-                ext = format.split('/')[-1]
-                data = ContentFile(
-                    base64.b64decode(imgstr),
-                    name=f'avatar.{ext}'
-                )
-
-                user = request.user
-                if user.avatar:
-                    user.avatar.delete()
-                user.avatar = data
-                user.save()
-
-                avatar_url = request.build_absolute_uri(user.avatar.url)
-                return Response(
-                    {'avatar': avatar_url},
-                    status=status.HTTP_200_OK
-                )
-            else:
+        image_data = request.data['avatar']
+        if not is_base64_image(image_data):
+            return Response(
+                {'error': 'Неверный формат данных изображения'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if prefers_async(request):
+            try:
+                path = store_avatar(image_data)
+            except ValueError as e:
                 return Response(
-                    {'error': 'Неверный формат данных изображения'},
+                    {'error': f'Ошибка при обработке изображения: {str(e)}'},
                     status=status.HTTP_400_BAD_REQUEST
                 )
+            return run_async(request, 'api.set_avatar', path=path)
+
+        try:
+            user = request.user
+            save_avatar(user, image_data)
+            avatar_url = request.build_absolute_uri(user.avatar.url)
+            return Response(
+                {'avatar': avatar_url},
+                status=status.HTTP_200_OK
+            )
         except Exception as e:
             return Response(
                 {'error': f'Ошибка при обработке изображения: {str(e)}'},
@@ -112,10 +229,19 @@ class CustomUserViewSet(UserViewSet):
         detail=False,
         permission_classes=[IsAuthenticated],
     )
+    @conditional_get(RECIPES, VIEWER)
+    @coalesce(RECIPES, VIEWER, limit='subscriptions')
     def subscriptions(self, request):
         """Получает список подписок пользователя."""
-        # Получаем авторов, на которых подписан текущий пользователь
-        authors = User.objects.filter(authors__user=request.user).distinct()
+        # Получаем авторов, на которых подписан текущий пользователь.
+        # Meta.ordering не действует на запрос с Count, порядок страниц
+        # задается явно
+        authors = with_recipe_previews(
+            User.objects.filter(
+                authors__user=request.user
+            ).distinct().order_by('username', 'id'),
+            get_recipes_limit(request)
+        )
         pages = self.paginate_queryset(authors)
         serializer = AuthorWithRecipesSerializer(
             pages,
@@ -131,42 +257,62 @@ class CustomUserViewSet(UserViewSet):
     )
     def subscribe(self, request, id=None):
         """Подписка/отписка от автора."""
-        author = get_object_or_404(User, id=id)
-
-        if request.method == 'POST':
-            if author == request.user:
-                return Response(
-                    {'errors': 'Нельзя подписаться на самого себя!'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            subscription, created = Subscribers.objects.get_or_create(
-                author=author,
+        if request.method == 'DELETE':
+            # Один DELETE: отсутствие автора и отсутствие подписки
+            # одинаково дают 404
+            deleted, _ = Subscribers.objects.filter(
+                author_id=id,
                 user=request.user
-            )
+            ).delete()
+            if not deleted:
+                raise Http404
+            return Response(status=status.HTTP_204_NO_CONTENT)
 
-            if not created:
-                return Response(
-                    {'errors': f'Вы уже подписаны на {author.username}!'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+        # Превью проверяется до подписки, чтобы ошибка не оставила ее
+        get_recipes_limit(request)
+        author = get_object_or_404(User, id=id)
+        if author == request.user:
+            return Response(
+                {'errors': 'Нельзя подписаться на самого себя!'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
 
-            serializer = AuthorWithRecipesSerializer(
-                author,
-                context={'request': request}
+        # Уникальный индекс гарантирует отсутствие дублей даже при
+        # параллельных запросах, отдельная проверка exists() не нужна
+        try:
+            with transaction.atomic():
+                Subscribers.objects.create(author=author, user=request.user)
+        except IntegrityError:
+            return Response(
+                {'errors': f'Вы уже подписаны на {author.username}!'},
+                status=status.HTTP_400_BAD_REQUEST
             )
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        subscription = get_object_or_404(
-            Subscribers,
-            author=author,
-            user=request.user
+        serializer = AuthorWithRecipesSerializer(
+            author,
+            context={'request': request}
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    @action(
+        methods=['POST'],
+        detail=False,
+        permission_classes=[IsAuthenticated],
+        url_path='subscribe/batch'
+    )
+    def subscribe_batch(self, request):
+        """Пакетная подписка на авторов из списка ids."""
+        serializer = BatchIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return add_relations_in_bulk(
+            Subscribers, request.user, 'author',
+            serializer.validated_data['ids'],
+            User.objects.exclude(id=request.user.id),
+            forbidden_id=request.user.id
         )
-        subscription.delete()
-        return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientsViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """Представление для работы с ингредиентами."""
 
     queryset = Ingredient.objects.all()
@@ -175,9 +321,44 @@ class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = (AllowAny,)
     filter_backends = (IngredientsFilter,)
     search_fields = ('^name',)
-
-
-class RecipesViewSet(viewsets.ModelViewSet):
+    replica_actions = ('list', 'retrieve')
+    throttle_scopes = {'list': 'ingredients'}
+
+    @conditional_get(INGREDIENTS)
+    @coalesce(INGREDIENTS, limit='ingredients')
+    def list(self, request, *args, **kwargs):
+        """Список ингредиентов; при INGREDIENT_INDEX — из файла индекса."""
+        if not settings.INGREDIENT_INDEX:
+            return super().list(request, *args, **kwargs)
+        return Response(get_index().search_terms(
+            IngredientsFilter().get_search_terms(request)
+        ))
+
+    @conditional_get(INGREDIENTS)
+    def retrieve(self, request, *args, **kwargs):
+        """Ингредиент; при INGREDIENT_INDEX — из файла индекса."""
+        if not settings.INGREDIENT_INDEX:
+            return super().retrieve(request, *args, **kwargs)
+        pk = str(kwargs['pk'])
+        ingredient = get_index().get(int(pk)) if pk.isdigit() else None
+        if ingredient is None:
+            raise Http404
+        return Response(ingredient)
+
+
+class JobsViewSet(mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Состояние фоновых задач текущего пользователя."""
+
+    serializer_class = JobSerializer
+    permission_classes = (IsAuthenticated,)
+
+    def get_queryset(self):
+        if self.request.user.is_staff:
+            return Job.objects.all()
+        return Job.objects.filter(user=self.request.user)
+
+
+class RecipesViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """Представление для работы с рецептами."""
 
     queryset = Recipe.objects.all()
@@ -185,6 +366,8 @@ class RecipesViewSet(viewsets.ModelViewSet):
     pagination_class = Pagination
     permission_classes = (IsAuthorOrReadOnly,)
     filterset_class = RecipesFilter
+    replica_actions = ('list', 'retrieve')
+    throttle_scopes = {'download_shopping_cart': 'download_shopping_cart'}
 
     def get_serializer_class(self):
         """Определяет класс сериализатора в зависимости от типа запроса."""
@@ -192,6 +375,76 @@ class RecipesViewSet(viewsets.ModelViewSet):
             return GetRecipeSerializer
         return AddRecipeSerializer
 
+    def get_queryset(self):
+        """Для чтения загружает авторов и ингредиенты вместе с рецептами."""
+        queryset = super().get_queryset()
+        if self.request.method != 'GET':
+            return queryset
+        return queryset.select_related('author').prefetch_related(
+            Prefetch(
+                'recipeingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient'
+                ).order_by('id')
+            )
+        )
+
+    def create(self, request, *args, **kwargs):
+        """Создает рецепт; с Prefer: respond-async — в фоне."""
+        if prefers_async(request):
+            serializer = self.get_serializer(data=request.data)
+            serializer.is_valid(raise_exception=True)
+            return save_recipe_in_background(request, serializer)
+        return super().create(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        """Изменяет рецепт; с Prefer: respond-async — в фоне."""
+        if prefers_async(request):
+            partial = kwargs.get('partial', False)
+            serializer = self.get_serializer(
+                self.get_object(), data=request.data, partial=partial
+            )
+            serializer.is_valid(raise_exception=True)
+            return save_recipe_in_background(request, serializer, partial)
+        return super().update(request, *args, **kwargs)
+
+    @conditional_get(RECIPES, VIEWER)
+    def list(self, request, *args, **kwargs):
+        """Список рецептов; при FAST_SERIALIZERS без механизма полей DRF."""
+        if not settings.FAST_SERIALIZERS:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(
+            Recipe.objects.values(*RECIPE_FIELDS)
+        )
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(serialize_recipes(queryset, request))
+        return self.get_paginated_response(serialize_recipes(page, request))
+
+    @conditional_get(RECIPES, VIEWER)
+    def retrieve(self, request, *args, **kwargs):
+        """
+        Один рецепт.
+
+        При RECIPE_DOCUMENTS ответ собирается из документа в кэше без
+        сериализации, при FAST_SERIALIZERS — без механизма полей DRF.
+        Фильтры списка к документам не применяются, поэтому запросы с
+        параметрами обрабатываются обычным путем.
+        """
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        if settings.RECIPE_DOCUMENTS and not request.query_params:
+            document = get_document(int(pk)) if pk.isdigit() else None
+            if document is None:
+                raise Http404
+            return Response(render_document(document, request))
+        if not settings.FAST_SERIALIZERS:
+            return super().retrieve(request, *args, **kwargs)
+        recipe = get_or_404(
+            self.filter_queryset(Recipe.objects.values(*RECIPE_FIELDS)),
+            pk=pk
+        )
+        return Response(serialize_recipes([recipe], request)[0])
+
     @action(
         methods=['GET'],
         detail=True,
@@ -200,8 +453,11 @@ class RecipesViewSet(viewsets.ModelViewSet):
     )
     def get_short_link(self, request, pk=None):
         """Генерирует короткую ссылку на рецепт."""
-        recipe = get_object_or_404(Recipe, id=pk)
-        short_link_path = reverse('short-link', kwargs={'pk': recipe.id})
+        if not Recipe.objects.filter(id=pk).exists():
+            raise Http404
+        short_link_path = reverse(
+            'short-link', kwargs={'code': encode(int(pk))}
+        )
         short_link = request.build_absolute_uri(short_link_path)
         return Response({'short-link': short_link})
 
@@ -211,67 +467,80 @@ class RecipesViewSet(viewsets.ModelViewSet):
         permission_classes=[IsAuthenticated, ]
     )
     def download_shopping_cart(self, request):
-        """Скачивает список покупок в формате TXT."""
-        # Получаем все рецепты из корзины пользователя
-        shopping_cart_items = ShoppingCart.objects.filter(user=request.user)
-        recipes = [item.recipe for item in shopping_cart_items]
-
-        # Формируем заголовок текстового файла
-        content = "Foodgram - список покупок\n"
-        content += f"Пользователь: {request.user.username}\n"
-        content += f"Дата: {datetime.now().strftime('%d.%m.%Y %H:%M')}\n\n"
-
-        if not recipes:
-            content += "Ваш список покупок пуст."
-            return FileResponse(
-                content,
-                as_attachment=True,
-                filename='shopping_list.txt',
-                content_type='text/plain; charset=utf-8'
-            )
-
-        # Добавляем информацию о рецептах и авторах
-        content += "Рецепты в вашем списке:\n"
-        for i, recipe in enumerate(recipes, 1):
-            content += (f"{i}. {recipe.name} - "
-                        f"автор: {recipe.author.username}\n")
-
-        content += "\nИнгредиенты для приготовления:\n"
-
-        # Получаем данные ингредиентов из корзины
-        shoppingcart = ShoppingCart.objects.filter(
-            user=request.user
-        ).values('recipe__ingredients__name').annotate(
-            amount=F('recipe__recipeingredients__amount'),
-            measure=F('recipe__ingredients__measurement_unit')
-        ).order_by('recipe__ingredients__name')
-
-        # Агрегируем ингредиенты
-        ingredients = {}
-        for ingredient in shoppingcart:
-            name = ingredient['recipe__ingredients__name']
-            amount = ingredient['amount']
-            measure = ingredient['measure']
-            if name not in ingredients:
-                ingredients[name] = (amount, measure)
-            else:
-                ingredients[name] = (
-                    ingredients[name][0] + amount,
-                    measure
-                )
-
-        # Добавляем ингредиенты в файл
-        for i, (ingredient, data) in enumerate(ingredients.items(), 1):
-            amount, measure = data
-            content += f"{i}. {ingredient} - {amount} {measure}\n"
+        """
+        Скачивает список покупок в формате TXT.
+
+        Строки собираются заранее: запросы к БД не должны выполняться
+        при отдаче ответа, которая в режиме ASGI идет вне рабочего
+        потока. Отдается и сжимается файл потоком по строкам. С
+        заголовком Prefer: respond-async файл собирается в фоне.
+        Одновременные одинаковые запросы получают строки одной сборки.
+        """
+        if prefers_async(request):
+            return run_async(request, 'api.shopping_list')
+
+        def build_lines():
+            with limit_concurrency('download_shopping_cart'):
+                return list(shopping_list_lines(request.user))
 
         return FileResponse(
-            content,
+            single_flight(
+                request_key(request, (RECIPES, INGREDIENTS, VIEWER)),
+                build_lines
+            ),
             as_attachment=True,
             filename='shopping_list.txt',
             content_type='text/plain; charset=utf-8'
         )
 
+    @action(
+        methods=['GET'],
+        detail=False,
+        permission_classes=[IsAuthenticated, ]
+    )
+    @conditional_get(RECIPES, INGREDIENTS, VIEWER)
+    def shopping_list(self, request):
+        """Сводный список покупок: ингредиенты с суммарным количеством."""
+        items = request.user.shopping_list_items.select_related(
+            'ingredient'
+        )
+        return Response(ShoppingListItemSerializer(items, many=True).data)
+
+    def add_recipe_relation(self, model, request, pk, error):
+        """
+        Добавляет рецепт в список пользователя (избранное, покупки).
+
+        Рецепт читается одним запросом только с полями для ответа,
+        запись создается одним INSERT: повтор ловится по уникальному
+        индексу, поэтому двойной клик не приводит к ошибке 500.
+        """
+        recipe = get_object_or_404(
+            Recipe.objects.only('id', 'name', 'image', 'cooking_time'),
+            id=pk
+        )
+        try:
+            with transaction.atomic():
+                model.objects.create(user=request.user, recipe=recipe)
+        except IntegrityError:
+            return Response(
+                {'errors': error.format(name=recipe.name)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        serializer = HelperRecipeSerializer(
+            recipe, context={'request': request}
+        )
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def delete_recipe_relation(self, model, request, pk):
+        """Удаляет рецепт из списка пользователя одним DELETE."""
+        deleted, _ = model.objects.filter(
+            user=request.user,
+            recipe_id=pk
+        ).delete()
+        if not deleted:
+            raise Http404
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
     @action(
         methods=['POST', 'DELETE'],
         detail=True,
@@ -279,34 +548,12 @@ class RecipesViewSet(viewsets.ModelViewSet):
     )
     def shopping_cart(self, request, pk=None):
         """Добавляет или удаляет рецепт из списка покупок."""
-        recipe = get_object_or_404(Recipe, id=pk)
-
         if request.method == 'POST':
-            shoppingcart_status = ShoppingCart.objects.filter(
-                user=request.user,
-                recipe=recipe
-            ).exists()
-
-            if shoppingcart_status:
-                return Response(
-                    {'errors': f'Рецепт "{recipe.name}" уже есть в списке!'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            ShoppingCart.objects.create(user=request.user, recipe=recipe)
-            serializer = GetRecipeSerializer(
-                recipe, context={'request': request}
-            )
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
-
-        if request.method == 'DELETE':
-            shoppingcart = get_object_or_404(
-                ShoppingCart,
-                user=request.user,
-                recipe=recipe
+            return self.add_recipe_relation(
+                ShoppingCart, request, pk,
+                'Рецепт "{name}" уже есть в списке!'
             )
-            shoppingcart.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
+        return self.delete_recipe_relation(ShoppingCart, request, pk)
 
     @action(
         methods=['POST', 'DELETE'],
@@ -315,31 +562,39 @@ class RecipesViewSet(viewsets.ModelViewSet):
     )
     def favorite(self, request, pk=None):
         """Добавляет или удаляет рецепт из избранного."""
-        recipe = get_object_or_404(Recipe, id=pk)
-
         if request.method == 'POST':
-            favorite_status = FavoriteRecipes.objects.filter(
-                user=request.user,
-                recipe=recipe
-            ).exists()
-
-            if favorite_status:
-                return Response(
-                    {'errors': f'Рецепт "{recipe.name}" уже в избранном!'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-
-            FavoriteRecipes.objects.create(user=request.user, recipe=recipe)
-            serializer = GetRecipeSerializer(
-                recipe, context={'request': request}
+            return self.add_recipe_relation(
+                FavoriteRecipes, request, pk,
+                'Рецепт "{name}" уже в избранном!'
             )
-            return Response(serializer.data, status=status.HTTP_201_CREATED)
+        return self.delete_recipe_relation(FavoriteRecipes, request, pk)
+
+    def add_recipes_in_bulk(self, model, request):
+        """Пакетно добавляет рецепты из списка ids в список пользователя."""
+        serializer = BatchIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return add_relations_in_bulk(
+            model, request.user, 'recipe',
+            serializer.validated_data['ids'],
+            Recipe.objects.all()
+        )
 
-        if request.method == 'DELETE':
-            favorite = get_object_or_404(
-                FavoriteRecipes,
-                user=request.user,
-                recipe=recipe
-            )
-            favorite.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
+    @action(
+        methods=['POST'],
+        detail=False,
+        permission_classes=[IsAuthenticated, ],
+        url_path='shopping_cart/batch'
+    )
+    def shopping_cart_batch(self, request):
+        """Пакетно добавляет рецепты в список покупок."""
+        return self.add_recipes_in_bulk(ShoppingCart, request)
+
+    @action(
+        methods=['POST'],
+        detail=False,
+        permission_classes=[IsAuthenticated, ],
+        url_path='favorite/batch'
+    )
+    def favorite_batch(self, request):
+        """Пакетно добавляет рецепты в избранное."""
+        return self.add_recipes_in_bulk(FavoriteRecipes, request)
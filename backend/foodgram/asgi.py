@@ -8,5 +8,6 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+os.environ.setdefault('FOODGRAM_ASGI', 'True')
 
 application = get_asgi_application()
@@ -0,0 +1,149 @@
+"""
+Сжатие ответов gzip или brotli.
+
+В отличие от GZipMiddleware Django сжимаются только текстовые ответы
+(JSON, HTML, текст) не короче COMPRESSION_MIN_SIZE байт, а brotli
+выбирается, если его принимает клиент и установлен пакет brotli.
+Потоковые ответы (например, выгрузка списка покупок) сжимаются по мере
+отдачи, не собираясь целиком в памяти.
+"""
+import asyncio
+import re
+import zlib
+
+from django.utils.cache import patch_vary_headers
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.text import compress_sequence, compress_string
+
+from .constants import BROTLI_QUALITY, COMPRESSION_MIN_SIZE
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE_TYPES = re.compile(
+    r'^(text/|application/(json|javascript|xml))', re.IGNORECASE
+)
+
+
+def accepted_encodings(header):
+    """Кодировки из Accept-Encoding, не запрещенные через q=0."""
+    encodings = set()
+    for item in header.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = re.search(r'q=([0-9.]+)', params)
+        try:
+            if quality and float(quality.group(1)) == 0:
+                continue
+        except ValueError:
+            continue
+        encodings.add(name.strip().lower())
+    return encodings
+
+
+def choose_encoding(header):
+    encodings = accepted_encodings(header)
+    if brotli is not None and encodings & {'br', '*'}:
+        return 'br'
+    if encodings & {'gzip', '*'}:
+        return 'gzip'
+    return None
+
+
+def brotli_sequence(sequence):
+    compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+    for item in sequence:
+        data = compressor.process(item)
+        if data:
+            yield data
+    yield compressor.finish()
+
+
+def compress(content, encoding):
+    if encoding == 'br':
+        return brotli.compress(content, quality=BROTLI_QUALITY)
+    return compress_string(content)
+
+
+def compress_stream(sequence, encoding):
+    if encoding == 'br':
+        return brotli_sequence(sequence)
+    return compress_sequence(sequence)
+
+
+async def compress_async_stream(sequence, encoding):
+    """Сжатие асинхронного потока, порции сбрасываются по мере отдачи."""
+    if encoding == 'br':
+        compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+        process, finish = compressor.process, compressor.finish
+    else:
+        compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16)
+
+        def process(item):
+            return compressor.compress(item) + compressor.flush(
+                zlib.Z_SYNC_FLUSH
+            )
+        finish = compressor.flush
+    async for item in sequence:
+        data = process(item)
+        if data:
+            yield data
+    yield finish()
+
+
+def compress_response(request, response):
+    """Сжимает текстовый ответ выбранной по Accept-Encoding кодировкой."""
+    if (
+        response.has_header('Content-Encoding')
+        or not COMPRESSIBLE_TYPES.match(response.get('Content-Type', ''))
+        or (
+            not response.streaming
+            and len(response.content) < COMPRESSION_MIN_SIZE
+        )
+    ):
+        return response
+
+    patch_vary_headers(response, ('Accept-Encoding',))
+    encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+    if encoding is None:
+        return response
+
+    if response.streaming:
+        # Асинхронные потоки поддерживает StreamingHttpResponse Django 4.2+
+        if getattr(response, 'is_async', False):
+            response.streaming_content = compress_async_stream(
+                response.streaming_content, encoding
+            )
+        else:
+            response.streaming_content = compress_stream(
+                response.streaming_content, encoding
+            )
+        del response['Content-Length']
+    else:
+        compressed = compress(response.content, encoding)
+        if len(compressed) >= len(response.content):
+            return response
+        response.content = compressed
+        response['Content-Length'] = str(len(compressed))
+
+    etag = response.get('ETag')
+    if etag and etag.startswith('"'):
+        response['ETag'] = 'W/' + etag
+    response['Content-Encoding'] = encoding
+    return response
+
+
+@sync_and_async_middleware
+def compression_middleware(get_response):
+    """
+    Сжимает ответы; в цепочке ASGI работает асинхронно и не переводит
+    запрос в общий поток.
+    """
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            return compress_response(request, await get_response(request))
+    else:
+        def middleware(request):
+            return compress_response(request, get_response(request))
+    return middleware
@@ -6,3 +6,86 @@ TEXT_MAX_LENGTH = 200
 
 # Ограничения пагинации
 DEFAULT_PAGES_LIMIT = 6
+
+# Максимальное количество объектов в одном пакетном запросе
+BATCH_MAX_SIZE = 100
+
+# Кэширование аутентификации по токену, секунды и количество записей
+TOKEN_CACHE_TIMEOUT = 300
+TOKEN_LOCAL_CACHE_TIMEOUT = 5
+TOKEN_LOCAL_CACHE_SIZE = 1024
+
+# Время жизни заранее собранного документа рецепта в кэше, секунды
+RECIPE_DOCUMENT_TIMEOUT = 24 * 60 * 60
+
+# Сжатие ответов: минимальный размер в байтах и качество brotli
+COMPRESSION_MIN_SIZE = 1024
+BROTLI_QUALITY = 5
+
+# Время кэширования перенаправлений коротких ссылок, секунды
+SHORT_LINK_MAX_AGE = 365 * 24 * 60 * 60
+
+# Импорт и выгрузка данных: размер пакета записи и порции чтения,
+# наибольшее число строк выгрузки ответом админки (больше — в фоне)
+IMPORT_BATCH_SIZE = 1000
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_RESPONSE_MAX_ROWS = 10000
+
+# Фоновые задачи: попытки по умолчанию, задержка перед повтором и
+# время аренды задачи воркером в секундах, пауза опроса очереди, время
+# хранения завершенных задач с файлами результатов и пауза между
+# их удалениями
+JOB_MAX_ATTEMPTS = 3
+JOB_RETRY_DELAY = 30
+JOB_LEASE_TIMEOUT = 10 * 60
+JOB_POLL_INTERVAL = 1
+JOB_RESULT_TTL = 24 * 60 * 60
+JOB_CLEANUP_INTERVAL = 60 * 60
+JOB_NAME_MAX_LENGTH = 100
+
+# Реплики БД: допустимое отставание, время закрепления пользователя за
+# основной базой после записи (больше допустимого отставания) и
+# интервал проверки отставания, секунды
+REPLICA_MAX_LAG = 5
+REPLICA_STICKY_SECONDS = 15
+REPLICA_LAG_CHECK_INTERVAL = 5
+
+# Корзины пользователей, не входивших дольше этого срока, переносятся в
+# архив, дни
+SHOPPING_CART_ARCHIVE_DAYS = 180
+
+# Как часто запросы с токеном обновляют время последней активности
+# пользователя, секунды
+LAST_SEEN_INTERVAL = 24 * 60 * 60
+
+# Как часто воркер проверяет, не подменен ли файл индекса ингредиентов,
+# секунды
+INGREDIENT_INDEX_CHECK_INTERVAL = 1
+
+# Одновременных вычислений дорогих запросов на процесс по областям и
+# пауза перед повтором после отказа, секунды
+CONCURRENCY_LIMITS = {
+    'download_shopping_cart': 4,
+    'subscriptions': 8,
+    'ingredients': 8,
+}
+CONCURRENCY_RETRY_AFTER = 1
+
+# Объединение одинаковых запросов: сколько ждать чужое вычисление,
+# сколько хранить его результат и как часто опрашивать кэш, секунды
+FLIGHT_LOCK_TIMEOUT = 30
+FLIGHT_RESULT_TIMEOUT = 5
+FLIGHT_POLL_INTERVAL = 0.05
+
+# Максимальный размер страницы подписок: каждый автор отдается вместе с
+# превью рецептов
+SUBSCRIPTIONS_MAX_PAGE_SIZE = 20
+
+# Запись трафика для нагрузочных сценариев: записываются только
+# читающие запросы к API, параметры, в названии которых есть одна из
+# этих частей (access_token, api_key, client_secret), отбрасываются
+TRAFFIC_RECORD_METHODS = ('GET', 'HEAD')
+TRAFFIC_RECORD_PREFIX = '/api/'
+TRAFFIC_SENSITIVE_PARAMS = frozenset(
+    {'token', 'password', 'secret', 'key', 'email', 'session', 'csrf'}
+)
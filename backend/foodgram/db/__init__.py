@@ -0,0 +1 @@
+"""Бэкенды баз данных проекта Foodgram."""
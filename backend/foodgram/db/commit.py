@@ -0,0 +1,45 @@
+"""
+Объединение действий, отложенных до фиксации транзакции.
+
+Django не позволяет узнать, какие функции уже отложены on_commit, без
+чтения его внутренних структур. Поэтому значения для одного действия
+собираются в пакет, который хранится на соединении: каждый вызов
+дополняет пакет и откладывает его обработку, первая обработка после
+фиксации забирает весь пакет, остальные ничего не делают.
+
+Значения из откаченной транзакции или точки сохранения остаются в
+пакете и обрабатываются со следующей фиксацией. Действия собирают данные
+заново по состоянию БД, поэтому лишний вызов для них безопасен.
+"""
+from django.db import transaction
+
+
+class PendingBatch:
+    """Значения, ожидающие фиксации транзакции, и действие над ними."""
+
+    def __init__(self, action):
+        self.action = action
+        self.values = set()
+        self.done = False
+
+    def __call__(self):
+        if not self.done:
+            self.done = True
+            self.action(self.values)
+
+
+def on_commit_once(action, values=()):
+    """
+    Вызывает action(значения) один раз после фиксации текущей транзакции.
+
+    Значения всех вызовов с тем же action в транзакции объединяются.
+    """
+    connection = transaction.get_connection()
+    batches = getattr(connection, 'pending_batches', None)
+    if batches is None:
+        batches = connection.pending_batches = {}
+    batch = batches.get(action)
+    if batch is None or batch.done:
+        batch = batches[action] = PendingBatch(action)
+    batch.values.update(values)
+    transaction.on_commit(batch)
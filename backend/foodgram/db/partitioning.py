@@ -0,0 +1,109 @@
+"""
+Хеш-секционирование таблиц связей пользователей в PostgreSQL.
+
+Таблица заменяется секционированной по user_id с тем же именем,
+столбцами, последовательностью id, ограничениями и индексами, поэтому
+модели Django продолжают работать с ней без изменений. Первичный ключ
+становится составным (id, user_id): PostgreSQL требует, чтобы ключ
+секционирования входил в каждое уникальное ограничение. Уникальные
+ограничения связей уже содержат user_id и переносятся как есть.
+
+Переделка таблицы блокирует ее на время копирования строк, поэтому ее
+следует выполнять при остановленном приложении. На других СУБД функции
+ничего не делают.
+"""
+PARTITION_KEY = 'user_id'
+
+# Типы ограничений из pg_constraint, которые переносятся на новую
+# таблицу: первичный ключ, уникальные, внешние ключи и CHECK
+CONSTRAINT_TYPES = ('p', 'u', 'f', 'c')
+
+
+def is_partitioned(connection, table):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT EXISTS (SELECT 1 FROM pg_partitioned_table '
+            'WHERE partrelid = to_regclass(%s))',
+            [table]
+        )
+        return cursor.fetchone()[0]
+
+
+def rebuild_table(connection, table, partitions):
+    """
+    Пересоздает таблицу: секционированной на partitions секций или
+    обычной при partitions=0. Строки, ограничения и индексы переносятся.
+    """
+    quote = connection.ops.quote_name
+    old = quote(f'{table}_old')
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT conname, contype, pg_get_constraintdef(oid) '
+            'FROM pg_constraint WHERE conrelid = %s::regclass '
+            'AND contype IN %s',
+            [table, CONSTRAINT_TYPES]
+        )
+        constraints = cursor.fetchall()
+        # Индексы, не созданные ограничениями, например индексы внешних
+        # ключей; определение ссылается на таблицу по имени
+        cursor.execute(
+            'SELECT indexname, indexdef FROM pg_indexes '
+            'WHERE schemaname = current_schema() AND tablename = %s '
+            'AND indexname NOT IN (SELECT conname FROM pg_constraint '
+            'WHERE conrelid = %s::regclass)',
+            [table, table]
+        )
+        indexes = cursor.fetchall()
+        cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", [table])
+        sequence = cursor.fetchone()[0]
+
+        cursor.execute(f'ALTER TABLE {quote(table)} RENAME TO {old}')
+        if partitions:
+            cursor.execute(
+                f'CREATE TABLE {quote(table)} (LIKE {old} INCLUDING DEFAULTS)'
+                f' PARTITION BY HASH ({quote(PARTITION_KEY)})'
+            )
+            for remainder in range(partitions):
+                cursor.execute(
+                    f'CREATE TABLE {quote(f"{table}_p{remainder}")} '
+                    f'PARTITION OF {quote(table)} FOR VALUES WITH '
+                    f'(MODULUS {partitions}, REMAINDER {remainder})'
+                )
+            primary_key = f'PRIMARY KEY (id, {quote(PARTITION_KEY)})'
+        else:
+            cursor.execute(
+                f'CREATE TABLE {quote(table)} (LIKE {old} INCLUDING DEFAULTS)'
+            )
+            primary_key = 'PRIMARY KEY (id)'
+        cursor.execute(f'INSERT INTO {quote(table)} SELECT * FROM {old}')
+        if sequence:
+            # Иначе последовательность удалится вместе со старой таблицей
+            cursor.execute(
+                f'ALTER SEQUENCE {sequence} OWNED BY {quote(table)}.id'
+            )
+        cursor.execute(f'DROP TABLE {old}')
+        for name, kind, definition in constraints:
+            cursor.execute(
+                f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} '
+                f'{primary_key if kind == "p" else definition}'
+            )
+        for _, definition in indexes:
+            cursor.execute(definition)
+
+
+def partition_tables(connection, tables, partitions):
+    """Секционирует еще не секционированные таблицы."""
+    if connection.vendor != 'postgresql' or not partitions:
+        return
+    for table in tables:
+        if not is_partitioned(connection, table):
+            rebuild_table(connection, table, partitions)
+
+
+def merge_tables(connection, tables):
+    """Возвращает секционированные таблицы к обычным."""
+    if connection.vendor != 'postgresql':
+        return
+    for table in tables:
+        if is_partitioned(connection, table):
+            rebuild_table(connection, table, 0)
@@ -0,0 +1,143 @@
+"""
+Бэкенд PostgreSQL с проверкой постоянных соединений и пулом.
+
+Надстройка над стандартным бэкендом Django, управляемая ключами
+настроек базы данных:
+
+- CONN_HEALTH_CHECKS — постоянное соединение проверяется перед первым
+  использованием в каждом запросе и пересоздается, если сервер его
+  закрыл (поведение одноименной настройки Django 4.1+);
+- POOL_MAX_SIZE — соединения берутся из пула внутри процесса и
+  возвращаются в него вместо закрытия. Подходит для потоковых и
+  асинхронных воркеров; 0 отключает пул;
+- POOL_TIMEOUT — сколько секунд поток ждет свободного соединения,
+  когда все POOL_MAX_SIZE заняты, прежде чем получить ошибку.
+"""
+import os
+import threading
+
+import psycopg2.extras
+from django.db.backends.postgresql import base
+from psycopg2 import pool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class BlockingConnectionPool(pool.ThreadedConnectionPool):
+    """
+    Пул, в котором getconn() ждет освобождения соединения.
+
+    ThreadedConnectionPool сразу бросает PoolError, если заняты все
+    maxconn соединений, и всплеск запросов к потокам воркера
+    превращается в ошибки 500. Здесь семафор на maxconn соединений
+    заставляет поток ждать до timeout секунд.
+    """
+
+    def __init__(self, minconn, maxconn, *args, timeout=None, **kwargs):
+        super().__init__(minconn, maxconn, *args, **kwargs)
+        # psycopg2 закрывает возвращенные соединения сверх minconn; здесь
+        # minconn соединений открываются сразу, а свободными хранятся
+        # все до maxconn
+        self.minconn = self.maxconn
+        self.timeout = timeout
+        self._semaphore = threading.BoundedSemaphore(maxconn)
+
+    def getconn(self, key=None):
+        if not self._semaphore.acquire(timeout=self.timeout):
+            raise pool.PoolError(
+                f'no free connection in pool after {self.timeout} seconds'
+            )
+        try:
+            return super().getconn(key)
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        super().putconn(conn, key, close)
+        self._semaphore.release()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """Обертка соединения с поддержкой health check и пула."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.health_check_done = False
+
+    @property
+    def health_check_enabled(self):
+        return self.settings_dict.get('CONN_HEALTH_CHECKS', False)
+
+    @property
+    def pool_max_size(self):
+        return self.settings_dict.get('POOL_MAX_SIZE', 0)
+
+    @property
+    def pool_timeout(self):
+        return self.settings_dict.get('POOL_TIMEOUT', 10)
+
+    def get_pool(self, conn_params=None):
+        """
+        Возвращает пул соединений текущего процесса.
+
+        Ключ включает pid: пул, созданный до fork, не должен
+        использоваться дочерними процессами. Без conn_params новый пул
+        не создается.
+        """
+        key = (os.getpid(), self.alias)
+        with _pools_lock:
+            connection_pool = _pools.get(key)
+            if connection_pool is None and conn_params is not None:
+                connection_pool = BlockingConnectionPool(
+                    0, self.pool_max_size, timeout=self.pool_timeout,
+                    **conn_params
+                )
+                _pools[key] = connection_pool
+        return connection_pool
+
+    def get_new_connection(self, conn_params):
+        if not self.pool_max_size:
+            return super().get_new_connection(conn_params)
+        connection = self.get_pool(conn_params).getconn()
+        options = self.settings_dict['OPTIONS']
+        self.isolation_level = options.get(
+            'isolation_level', connection.isolation_level
+        )
+        if self.isolation_level != connection.isolation_level:
+            connection.set_session(isolation_level=self.isolation_level)
+        psycopg2.extras.register_default_jsonb(
+            conn_or_curs=connection, loads=lambda x: x
+        )
+        return connection
+
+    def _close(self):
+        connection_pool = self.pool_max_size and self.get_pool()
+        if self.connection is None or not connection_pool:
+            return super()._close()
+        with self.wrap_database_errors:
+            # Незавершенная транзакция откатывается внутри putconn()
+            connection_pool.putconn(self.connection)
+
+    def connect(self):
+        super().connect()
+        self.health_check_done = True
+
+    def ensure_connection(self):
+        if (
+            self.connection is not None
+            and self.health_check_enabled
+            and not self.health_check_done
+            and not self.in_atomic_block
+        ):
+            self.health_check_done = True
+            if not self.is_usable():
+                self.close()
+        super().ensure_connection()
+
+    def close_if_unusable_or_obsolete(self):
+        super().close_if_unusable_or_obsolete()
+        # Вызывается в начале и конце каждого запроса: следующее
+        # использование соединения снова будет проверено
+        self.health_check_done = False
@@ -0,0 +1,204 @@
+"""
+Чтение с реплик БД с привязкой к основной базе после записи.
+
+Представления, которым разрешено читать с реплики, вызывают
+use_replica(): до конца запроса ReplicaRouter направляет чтения на одну
+выбранную реплику. Все записи и чтения остальных запросов идут в
+default.
+
+Чтобы пользователь сразу видел свои изменения, успешный запрос на
+запись закрепляет его за основной базой на REPLICA_STICKY_SECONDS:
+срок записывается в cookie и в кэш по идентификатору пользователя (для
+клиентов с токеном, не хранящих cookie). Реплика с отставанием больше
+REPLICA_MAX_LAG секунд или недоступная временно не используется;
+отставание проверяется не чаще раза в REPLICA_LAG_CHECK_INTERVAL
+секунд. Срок закрепления больше допустимого отставания, поэтому после
+него запись уже есть на любой используемой реплике.
+"""
+import asyncio
+import contextvars
+import logging
+import random
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DatabaseError, connections
+from django.utils.decorators import sync_and_async_middleware
+
+from foodgram.constants import (REPLICA_LAG_CHECK_INTERVAL, REPLICA_MAX_LAG,
+                                REPLICA_STICKY_SECONDS)
+
+logger = logging.getLogger(__name__)
+
+# Псевдоним реплики для чтений текущего запроса или None
+read_database = contextvars.ContextVar('read_database', default=None)
+
+PIN_COOKIE = 'db_primary_until'
+
+# Отставание PostgreSQL-реплики в секундах; 0, если все WAL применены
+POSTGRESQL_LAG_SQL = (
+    'SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() '
+    'THEN 0 ELSE EXTRACT(EPOCH FROM now() - '
+    'pg_last_xact_replay_timestamp()) END'
+)
+
+# Псевдоним реплики: (время проверки, пригодна ли реплика)
+_health = {}
+
+
+def replica_lag(alias):
+    """Отставание реплики в секундах."""
+    connection = connections[alias]
+    if connection.vendor != 'postgresql':
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(POSTGRESQL_LAG_SQL)
+        lag = cursor.fetchone()[0]
+    return float(lag or 0)
+
+
+def is_healthy(alias):
+    """Доступна ли реплика и не отстает ли она больше допустимого."""
+    now = time.monotonic()
+    checked = _health.get(alias)
+    if checked is not None and now - checked[0] < REPLICA_LAG_CHECK_INTERVAL:
+        return checked[1]
+    try:
+        healthy = replica_lag(alias) <= REPLICA_MAX_LAG
+    except DatabaseError:
+        logger.warning('Replica %s is unavailable', alias, exc_info=True)
+        healthy = False
+    _health[alias] = (now, healthy)
+    return healthy
+
+
+def choose_replica():
+    """Случайная пригодная реплика или None."""
+    replicas = [
+        alias for alias in settings.REPLICA_DATABASES if is_healthy(alias)
+    ]
+    return random.choice(replicas) if replicas else None
+
+
+def pinned_until_key(user_id):
+    return f'db-primary-until:{user_id}'
+
+
+def is_pinned(request):
+    """Закреплен ли автор запроса за основной базой."""
+    now = time.time()
+    try:
+        if float(request.COOKIES.get(PIN_COOKIE, 0)) > now:
+            return True
+    except ValueError:
+        pass
+    user = getattr(request, 'user', None)
+    return bool(
+        user is not None and user.is_authenticated
+        and cache.get(pinned_until_key(user.id), 0) > now
+    )
+
+
+def use_replica(request):
+    """
+    Направляет чтения до конца запроса на реплику, если автор запроса
+    не закреплен за основной базой и есть пригодная реплика.
+    """
+    if settings.REPLICA_DATABASES and not is_pinned(request):
+        read_database.set(choose_replica())
+
+
+def reading_replica():
+    return read_database.get() is not None
+
+
+@contextmanager
+def primary():
+    """Чтения внутри блока идут в основную базу."""
+    token = read_database.set(None)
+    try:
+        yield
+    finally:
+        read_database.reset(token)
+
+
+class ReplicaRouter:
+    """Чтения — на реплику, выбранную для запроса; записи — в default."""
+
+    def db_for_read(self, model, **hints):
+        return read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        # Схема реплик повторяет основную базу через репликацию
+        return db == 'default'
+
+
+def pin_user(user_id):
+    """Закрепляет пользователя за основной базой; возвращает срок."""
+    until = time.time() + REPLICA_STICKY_SECONDS
+    cache.set(pinned_until_key(user_id), until, REPLICA_STICKY_SECONDS)
+    return until
+
+
+def pin(request, response):
+    """Закрепляет автора запроса за основной базой."""
+    # DRF записывает пользователя токена в исходный HttpRequest
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        until = pin_user(user.id)
+    else:
+        until = time.time() + REPLICA_STICKY_SECONDS
+    response.set_cookie(
+        PIN_COOKIE, f'{until:.0f}', max_age=REPLICA_STICKY_SECONDS,
+        httponly=True, samesite='Lax'
+    )
+
+
+def should_pin(request, response):
+    return request.method not in ('GET', 'HEAD', 'OPTIONS') and (
+        response.status_code < 400
+    )
+
+
+@sync_and_async_middleware
+def replica_stickiness_middleware(get_response):
+    """
+    Закрепляет автора успешного запроса на запись за основной базой и
+    сбрасывает выбор реплики в конце каждого запроса.
+    """
+    if not settings.REPLICA_DATABASES:
+        raise MiddlewareNotUsed
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = read_database.set(None)
+            try:
+                response = await get_response(request)
+            finally:
+                read_database.reset(token)
+            if should_pin(request, response):
+                # Ленивый пользователь сессии загружается из БД
+                await sync_to_async(pin, thread_sensitive=False)(
+                    request, response
+                )
+            return response
+    else:
+        def middleware(request):
+            token = read_database.set(None)
+            try:
+                response = get_response(request)
+            finally:
+                read_database.reset(token)
+            if should_pin(request, response):
+                pin(request, response)
+            return response
+    return middleware
@@ -0,0 +1,117 @@
+"""
+Минимальный асинхронный HTTP/1.1-клиент для нагрузочных замеров.
+
+Работает поверх asyncio без внешних зависимостей и умеет имитировать
+медленных клиентов, отправляющих запрос по частям.
+"""
+import asyncio
+import time
+from urllib.parse import urlsplit
+
+# Размер порции данных медленного клиента, байт
+TRICKLE_CHUNK = 16
+
+
+async def fetch(url, method='GET', headers=None, body=b'', trickle=0.0):
+    """
+    Выполняет один запрос в отдельном соединении.
+
+    trickle — пауза в секундах между порциями при отправке запроса.
+    Возвращает (код ответа, длительность в секундах);
+    код 0 означает сетевую ошибку.
+    """
+    parts = urlsplit(url)
+    path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+    lines = [
+        f'{method} {path} HTTP/1.1',
+        f'Host: {parts.netloc}',
+        'Connection: close',
+        *(f'{name}: {value}' for name, value in (headers or {}).items()),
+    ]
+    if body:
+        lines.append(f'Content-Length: {len(body)}')
+    payload = ('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body
+
+    start = time.perf_counter()
+    try:
+        reader, writer = await asyncio.open_connection(
+            parts.hostname, parts.port or 80
+        )
+    except OSError:
+        return 0, time.perf_counter() - start
+    try:
+        step = TRICKLE_CHUNK if trickle else len(payload)
+        for offset in range(0, len(payload), step):
+            writer.write(payload[offset:offset + step])
+            await writer.drain()
+            if trickle:
+                await asyncio.sleep(trickle)
+        status_line = await reader.readline()
+        while await reader.read(65536):
+            pass
+    except OSError:
+        return 0, time.perf_counter() - start
+    finally:
+        writer.close()
+    status_parts = status_line.split()
+    status = int(status_parts[1]) if len(status_parts) > 1 else 0
+    return status, time.perf_counter() - start
+
+
+async def run_load(requests, concurrency):
+    """
+    Выполняет фабрики запросов с заданной параллельностью.
+
+    requests — итерируемое корутинных фабрик без аргументов.
+    Возвращает список (код ответа, длительность) и общее время.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited(make_request):
+        async with semaphore:
+            return await make_request()
+
+    start = time.perf_counter()
+    results = await asyncio.gather(*(limited(item) for item in requests))
+    return results, time.perf_counter() - start
+
+
+def percentile(values, fraction):
+    """Перцентиль по отсортированному списку значений."""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def summarize(results, elapsed):
+    """
+    Сводка: количество, ошибки (сетевые и 5xx), отказы по лимиту (429),
+    пропускная способность и задержки.
+    """
+    latencies = sorted(duration for _, duration in results)
+    errors = sum(1 for status, _ in results if not status or status >= 500)
+    return {
+        'requests': len(results),
+        'errors': errors,
+        'error_rate': errors / len(results) * 100 if results else 0.0,
+        'throttled': sum(1 for status, _ in results if status == 429),
+        'rps': len(results) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 0.5) * 1000,
+        'p95': percentile(latencies, 0.95) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def summarize_routes(routes, results, elapsed):
+    """
+    Сводки по маршрутам: routes[i] — маршрут запроса с результатом
+    results[i]. Пропускная способность маршрута считается за общее время.
+    """
+    grouped = {}
+    for route, result in zip(routes, results):
+        grouped.setdefault(route, []).append(result)
+    return {
+        route: summarize(route_results, elapsed)
+        for route, route_results in grouped.items()
+    }
@@ -20,6 +20,7 @@ INSTALLED_APPS = [
     'api.apps.ApiConfig',
     'recipes.apps.RecipesConfig',
     'users.apps.UsersConfig',
+    'jobs.apps.JobsConfig',
     'rest_framework',
     'rest_framework.authtoken',
     'djoser',
@@ -29,12 +30,16 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'foodgram.traffic.traffic_recorder_middleware',
+    'api.shortlinks.short_link_middleware',
+    'foodgram.compression.compression_middleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'foodgram.db.replicas.replica_stickiness_middleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -57,19 +62,72 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'foodgram.wsgi.application'
 
+# Включается в foodgram/asgi.py: подключает асинхронные представления
+ASGI_MODE = os.getenv('FOODGRAM_ASGI') == 'True'
+
 # Database
 # https://docs.djangoproject.com/en/3.2/ref/settings/#databases
 
+# Постоянные соединения живут DB_CONN_MAX_AGE секунд и проверяются перед
+# использованием. При включенном пуле (DB_POOL_MAX_SIZE > 0) соединение
+# возвращается в пул в конце каждого запроса; когда заняты все
+# соединения, поток ждет свободного до DB_POOL_TIMEOUT секунд. Пул стоит
+# делать не меньше числа потоков воркера (GUNICORN_THREADS), иначе
+# потоки ждут друг друга. Режим DB_PGBOUNCER
+# совместим с PgBouncer в режиме transaction pooling.
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', 0))
+
 DATABASES = {
     'default': {
-        # Меняем настройку Django: теперь для работы будет использоваться
-        # бэкенд postgresql
-        'ENGINE': 'django.db.backends.postgresql',
+        # Стандартный бэкенд postgresql с проверкой соединений и пулом
+        'ENGINE': 'foodgram.db.postgresql',
         'NAME': os.getenv('DB_NAME', 'foodgram'),
         'USER': os.getenv('POSTGRES_USER', 'foodgram_user'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', 'foodgram_password'),
         'HOST': os.getenv('DB_HOST', 'db'),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': (
+            0 if DB_POOL_MAX_SIZE
+            else int(os.getenv('DB_CONN_MAX_AGE', 60))
+        ),
+        'CONN_HEALTH_CHECKS': os.getenv('DB_CONN_HEALTH_CHECKS', 'True') == 'True',
+        'POOL_MAX_SIZE': DB_POOL_MAX_SIZE,
+        'POOL_TIMEOUT': float(os.getenv('DB_POOL_TIMEOUT', 10)),
+        'DISABLE_SERVER_SIDE_CURSORS': os.getenv('DB_PGBOUNCER') == 'True',
+    }
+}
+
+# Реплики для чтения: хосты через запятую в DB_REPLICA_HOSTS, остальные
+# параметры как у основной базы. Без реплик все запросы идут в default.
+REPLICA_DATABASES = []
+for number, host in enumerate(
+    filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1
+):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        'HOST': host.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    REPLICA_DATABASES.append(alias)
+
+DATABASE_ROUTERS = ['foodgram.db.replicas.ReplicaRouter']
+
+# Число хеш-секций по user_id для корзин, избранного и подписок в
+# PostgreSQL; применяется миграциями или командой partition_tables,
+# 0 оставляет обычные таблицы
+DB_PARTITIONS = int(os.getenv('DB_PARTITIONS', 0))
+
+# Общий кэш процессов: по умолчанию в памяти процесса, для нескольких
+# воркеров задается CACHE_BACKEND/CACHE_LOCATION (например, memcached).
+# CONDITIONAL_GET и RECIPE_DOCUMENTS без общего кэша не запускаются
+# (проверка api.E001 в api/checks.py)
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'
+        ),
+        'LOCATION': os.getenv('CACHE_LOCATION', ''),
     }
 }
 
@@ -122,13 +180,65 @@ STATIC_ROOT = '/app/static'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Справочник ингредиентов, загружаемый при запуске контейнера
+INGREDIENTS_DATA_PATH = os.getenv(
+    'INGREDIENTS_DATA_PATH',
+    os.path.join(BASE_DIR, 'data', 'ingredients.json')
+)
+
+# Map-файл коротких ссылок для nginx (команда export_short_links)
+SHORT_LINKS_MAP_PATH = os.getenv(
+    'SHORT_LINKS_MAP_PATH',
+    os.path.join(BASE_DIR, 'short_links', 'short_links.map')
+)
+
+# Справочник ингредиентов отдается из общего для воркеров файла индекса
+# (api/ingredient_index.py)
+INGREDIENT_INDEX = os.getenv('INGREDIENT_INDEX') == 'True'
+INGREDIENT_INDEX_PATH = os.getenv(
+    'INGREDIENT_INDEX_PATH',
+    os.path.join(BASE_DIR, 'ingredient_index', 'ingredients.idx')
+)
+
+# Списки и карточки рецептов сериализуются напрямую из values(),
+# минуя поля DRF (api/fast_serializers.py)
+FAST_SERIALIZERS = os.getenv('FAST_SERIALIZERS') == 'True'
+
+# Карточка рецепта отдается из заранее собранного документа в кэше
+# (api/documents.py). Требует общего для воркеров кэша.
+RECIPE_DOCUMENTS = os.getenv('RECIPE_DOCUMENTS') == 'True'
+
+# ETag по версиям данных и ответы 304 (api/conditional.py). Версии
+# хранятся в кэше, поэтому режим требует общего для воркеров кэша.
+CONDITIONAL_GET = os.getenv('CONDITIONAL_GET') == 'True'
+
+# Ограничения размера ответов (api/limits.py): страница и превью
+# рецептов автора больше максимума урезаются, параметр больше порога
+# отклоняется с ответом 400
+API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 100))
+API_MAX_RECIPES_LIMIT = int(os.getenv('API_MAX_RECIPES_LIMIT', 20))
+API_LIMIT_REJECT_ABOVE = int(os.getenv('API_LIMIT_REJECT_ABOVE', 1000))
+
+# Запись читающих запросов к API для команды replay_traffic
+# (foodgram/traffic.py): доля записываемых запросов и файл JSONL
+TRAFFIC_RECORD = os.getenv('TRAFFIC_RECORD') == 'True'
+TRAFFIC_SAMPLE_RATE = float(os.getenv('TRAFFIC_SAMPLE_RATE', 1))
+TRAFFIC_LOG_PATH = os.getenv(
+    'TRAFFIC_LOG_PATH', os.path.join(BASE_DIR, 'traffic', 'traffic.jsonl')
+)
+
 REST_FRAMEWORK = {
     "DEFAULT_PERMISSION_CLASSES": [
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
 
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
+    ],
+
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.FastJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
     ],
 
     'DEFAULT_PAGINATION_CLASS': (
@@ -139,6 +249,19 @@ REST_FRAMEWORK = {
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend",
     ],
+
+    # Лимиты дорогих действий (throttle_scopes вьюсетов); история
+    # запросов хранится в кэше, для общего лимита нужен общий кэш
+    "DEFAULT_THROTTLE_CLASSES": [
+        "api.throttling.ActionScopedRateThrottle",
+    ],
+    "DEFAULT_THROTTLE_RATES": {
+        "download_shopping_cart": os.getenv(
+            'THROTTLE_DOWNLOAD_SHOPPING_CART', '30/min'
+        ),
+        "subscriptions": os.getenv('THROTTLE_SUBSCRIPTIONS', '120/min'),
+        "ingredients": os.getenv('THROTTLE_INGREDIENTS', '300/min'),
+    },
 }
 
 DJOSER = {
@@ -0,0 +1,212 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from unittest import mock
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.db import OperationalError
+from django.http import HttpResponse
+from django.test import (RequestFactory, SimpleTestCase, TestCase,
+                         override_settings)
+from psycopg2 import extensions, pool
+from rest_framework.authtoken.models import Token
+
+from users.models import User
+from .constants import REPLICA_STICKY_SECONDS
+from .db import replicas
+from .db.postgresql.base import BlockingConnectionPool
+from .traffic import pseudonym, read_traffic, sanitize_query
+
+
+def fake_connect(*args, **kwargs):
+    return mock.Mock(
+        closed=0,
+        info=mock.Mock(transaction_status=extensions.TRANSACTION_STATUS_IDLE)
+    )
+
+
+@mock.patch('psycopg2.connect', fake_connect)
+class BlockingConnectionPoolTest(SimpleTestCase):
+    """Пул ждет свободного соединения вместо немедленной ошибки."""
+
+    def test_waits_for_released_connection(self):
+        connection_pool = BlockingConnectionPool(0, 1, timeout=5)
+        first = connection_pool.getconn()
+        taken = []
+        thread = threading.Thread(
+            target=lambda: taken.append(connection_pool.getconn())
+        )
+        thread.start()
+        thread.join(0.1)
+        # Второй поток ждет, а не получает PoolError
+        self.assertTrue(thread.is_alive())
+        connection_pool.putconn(first)
+        thread.join(5)
+        self.assertEqual(taken, [first])
+
+    def test_timeout(self):
+        connection_pool = BlockingConnectionPool(0, 2, timeout=0.05)
+        connections = [connection_pool.getconn() for _ in range(2)]
+        with self.assertRaises(pool.PoolError):
+            connection_pool.getconn()
+        connection_pool.putconn(connections[0], close=True)
+        self.assertIsNotNone(connection_pool.getconn())
+
+    def test_failed_connect_frees_slot(self):
+        connection_pool = BlockingConnectionPool(0, 1, timeout=0.05)
+        with mock.patch('psycopg2.connect', side_effect=OSError):
+            with self.assertRaises(OSError):
+                connection_pool.getconn()
+        self.assertIsNotNone(connection_pool.getconn())
+
+
+@override_settings(REPLICA_DATABASES=['replica_1'])
+class ReplicaRouterTest(SimpleTestCase):
+    """Чтения с реплики и закрепление за основной базой после записи."""
+
+    def setUp(self):
+        cache.clear()
+        replicas._health.clear()
+        self.factory = RequestFactory()
+        self.router = replicas.ReplicaRouter()
+        token = replicas.read_database.set(None)
+        self.addCleanup(replicas.read_database.reset, token)
+
+    def request(self, method='get', user=None, **extra):
+        request = getattr(self.factory, method)('/api/recipes/', **extra)
+        request.user = user or AnonymousUser()
+        return request
+
+    def user(self):
+        # Пользователь без сохранения: закрепление хранится по id
+        return User(id=1)
+
+    def test_routing(self):
+        self.assertIsNone(self.router.db_for_read(User))
+        with mock.patch.object(replicas, 'is_healthy', return_value=True):
+            replicas.use_replica(self.request())
+        self.assertEqual(self.router.db_for_read(User), 'replica_1')
+        self.assertEqual(self.router.db_for_write(User), 'default')
+        with replicas.primary():
+            self.assertIsNone(self.router.db_for_read(User))
+        self.assertEqual(self.router.db_for_read(User), 'replica_1')
+        self.assertTrue(self.router.allow_migrate('default', 'recipes'))
+        self.assertFalse(self.router.allow_migrate('replica_1', 'recipes'))
+
+    def test_unhealthy_replica(self):
+        with mock.patch.object(replicas, 'replica_lag', return_value=10):
+            replicas.use_replica(self.request())
+        self.assertIsNone(replicas.read_database.get())
+        replicas._health.clear()
+        with mock.patch.object(
+            replicas, 'replica_lag', side_effect=OperationalError
+        ), self.assertLogs('foodgram.db.replicas', 'WARNING'):
+            self.assertFalse(replicas.is_healthy('replica_1'))
+        # Результат проверки кэшируется на REPLICA_LAG_CHECK_INTERVAL
+        with mock.patch.object(replicas, 'replica_lag', return_value=0):
+            self.assertFalse(replicas.is_healthy('replica_1'))
+
+    def test_pinned_request_reads_primary(self):
+        until = f'{time.time() + REPLICA_STICKY_SECONDS:.0f}'
+        user = self.user()
+        replicas.pin_user(user.id)
+        with mock.patch.object(replicas, 'is_healthy', return_value=True):
+            for request in (
+                self.request(HTTP_COOKIE=f'{replicas.PIN_COOKIE}={until}'),
+                self.request(user=user),
+            ):
+                replicas.use_replica(request)
+                self.assertIsNone(replicas.read_database.get())
+            # Истекший или испорченный cookie не закрепляет
+            for value in ('1', 'x'):
+                replicas.use_replica(self.request(
+                    HTTP_COOKIE=f'{replicas.PIN_COOKIE}={value}'
+                ))
+                self.assertEqual(replicas.read_database.get(), 'replica_1')
+
+    def test_write_pins_author(self):
+        def view(request):
+            replicas.read_database.set('replica_1')
+            return HttpResponse(status=request.GET.get('status', 200))
+
+        middleware = replicas.replica_stickiness_middleware(view)
+        user = self.user()
+        for method, path, pinned in (
+            ('get', '/', False),
+            ('post', '/?status=400', False),
+            ('post', '/', True),
+        ):
+            request = getattr(self.factory, method)(path)
+            request.user = user
+            response = middleware(request)
+            # Выбор реплики не переживает запрос
+            self.assertIsNone(replicas.read_database.get())
+            self.assertEqual(replicas.PIN_COOKIE in response.cookies, pinned)
+            self.assertEqual(replicas.is_pinned(self.request(user=user)),
+                             pinned)
+
+
+class TrafficRecorderTest(TestCase):
+    """Записи трафика не содержат секретов и идентификаторов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.com', username='user', password='x',
+            first_name='Имя', last_name='Фамилия'
+        )
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'traffic.jsonl')
+        settings_override = override_settings(
+            TRAFFIC_RECORD=True, TRAFFIC_SAMPLE_RATE=1,
+            TRAFFIC_LOG_PATH=self.path
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def test_sanitize_query(self):
+        self.assertEqual(
+            sanitize_query(
+                'name=соль&token=1&Access_Token=2&api_key=3&password=4'
+                '&client_secret=5&email=a@b.c&sessionid=6&limit=&page=2'
+            ),
+            'name=%D1%81%D0%BE%D0%BB%D1%8C&limit=&page=2'
+        )
+
+    def test_recorded_line(self):
+        self.client.cookies['sessionid'] = 'cookie-secret'
+        self.client.get(
+            f'/api/recipes/?limit=2&auth_token={self.token.key}'
+            '&password=hunter2',
+            HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+        self.client.post(
+            '/api/recipes/', HTTP_AUTHORIZATION=f'Token {self.token.key}'
+        )
+        self.client.get('/admin/login/')
+        with open(self.path, encoding='utf-8') as file:
+            text = file.read()
+        for secret in (
+            self.token.key, 'hunter2', 'cookie-secret', self.user.email
+        ):
+            self.assertNotIn(secret, text)
+        [line] = read_traffic(self.path)
+        self.assertEqual(line['method'], 'GET')
+        self.assertEqual(line['path'], '/api/recipes/?limit=2')
+        self.assertEqual(line['route'], 'api:recipes-list')
+        self.assertEqual(line['status'], 200)
+        self.assertEqual(set(json.loads(text)), {
+            'time', 'method', 'path', 'route', 'user', 'status', 'duration'
+        })
+        # Псевдоним постоянный, но не совпадает с id
+        self.assertEqual(line['user'], pseudonym(self.user.id))
+        self.assertNotEqual(line['user'], str(self.user.id))
+        with override_settings(SECRET_KEY='other'):
+            self.assertNotEqual(line['user'], pseudonym(self.user.id))
@@ -0,0 +1,146 @@
+"""
+Запись реального трафика API для нагрузочных сценариев.
+
+traffic_recorder_middleware дописывает в JSONL-файл по строке на
+читающий запрос к API: метод, путь с параметрами, маршрут (имя
+представления), псевдоним пользователя, код и длительность ответа.
+Строки очищены: заголовки, cookies и тела не записываются, параметры,
+в названии которых есть часть из TRAFFIC_SENSITIVE_PARAMS, удаляются, а
+вместо id пользователя пишется HMAC от него на SECRET_KEY. Запись
+воспроизводит команда replay_traffic.
+
+Файл открывается на дозапись, и каждая строка пишется одним вызовом,
+поэтому воркеры могут писать в один файл.
+"""
+import asyncio
+import hashlib
+import hmac
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.decorators import sync_and_async_middleware
+
+from foodgram.constants import (TRAFFIC_RECORD_METHODS, TRAFFIC_RECORD_PREFIX,
+                                TRAFFIC_SENSITIVE_PARAMS)
+
+
+def pseudonym(user_id):
+    """Постоянный для пользователя псевдоним, не раскрывающий его id."""
+    return hmac.new(
+        settings.SECRET_KEY.encode(), str(user_id).encode(), hashlib.sha256
+    ).hexdigest()[:12]
+
+
+def is_sensitive(name):
+    name = name.lower()
+    return any(part in name for part in TRAFFIC_SENSITIVE_PARAMS)
+
+
+def sanitize_query(query_string):
+    """Параметры запроса без чувствительных значений."""
+    return urlencode([
+        (name, value)
+        for name, value in parse_qsl(query_string, keep_blank_values=True)
+        if not is_sensitive(name)
+    ])
+
+
+def traffic_line(request, response, duration):
+    """Очищенная запись запроса."""
+    query = sanitize_query(request.META.get('QUERY_STRING', ''))
+    match = request.resolver_match
+    # DRF записывает пользователя токена в исходный HttpRequest
+    user = getattr(request, 'user', None)
+    return {
+        'time': round(time.time(), 3),
+        'method': request.method,
+        'path': request.path + (f'?{query}' if query else ''),
+        'route': match.view_name if match else None,
+        'user': (
+            pseudonym(user.id)
+            if user is not None and user.is_authenticated else None
+        ),
+        'status': response.status_code,
+        'duration': round(duration * 1000, 1),
+    }
+
+
+class TrafficWriter:
+    """Дописывает строки трафика в файл."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lock = threading.Lock()
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+    def write(self, line):
+        data = (json.dumps(line, ensure_ascii=False) + '\n').encode()
+        with self.lock:
+            descriptor = os.open(
+                self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o640
+            )
+            try:
+                os.write(descriptor, data)
+            finally:
+                os.close(descriptor)
+
+    def record(self, request, response, duration):
+        self.write(traffic_line(request, response, duration))
+
+
+def should_record(request):
+    return (
+        request.method in TRAFFIC_RECORD_METHODS
+        and request.path.startswith(TRAFFIC_RECORD_PREFIX)
+        and random.random() < settings.TRAFFIC_SAMPLE_RATE
+    )
+
+
+@sync_and_async_middleware
+def traffic_recorder_middleware(get_response):
+    """Записывает долю TRAFFIC_SAMPLE_RATE читающих запросов к API."""
+    if not settings.TRAFFIC_RECORD:
+        raise MiddlewareNotUsed
+    writer = TrafficWriter(settings.TRAFFIC_LOG_PATH)
+    if asyncio.iscoroutinefunction(get_response):
+        async def middleware(request):
+            start = time.perf_counter()
+            response = await get_response(request)
+            if should_record(request):
+                # Ленивый пользователь сессии загружается из БД, а запись
+                # в файл блокирует, поэтому выполняется в потоке
+                await sync_to_async(writer.record, thread_sensitive=False)(
+                    request, response, time.perf_counter() - start
+                )
+            return response
+    else:
+        def middleware(request):
+            start = time.perf_counter()
+            response = get_response(request)
+            if should_record(request):
+                writer.record(request, response, time.perf_counter() - start)
+            return response
+    return middleware
+
+
+def read_traffic(path, limit=None):
+    """Записи трафика из файла; поврежденные строки пропускаются."""
+    lines = []
+    with open(path, encoding='utf-8') as file:
+        for text in file:
+            if limit is not None and len(lines) >= limit:
+                break
+            try:
+                line = json.loads(text)
+            except ValueError:
+                continue
+            if isinstance(line, dict) and line.get('path'):
+                lines.append(line)
+    return lines
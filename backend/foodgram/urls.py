@@ -9,5 +9,7 @@ from api.views import ShortLinkRedirectView
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
-    path('s/<int:pk>/', ShortLinkRedirectView.as_view(), name='short-link'),
+    path(
+        's/<str:code>/', ShortLinkRedirectView.as_view(), name='short-link'
+    ),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -0,0 +1,49 @@
+"""Прогрев процесса-воркера до обработки первых запросов."""
+import logging
+
+from django.conf import settings
+from django.db import connection
+from django.urls import get_resolver
+
+from api.ingredient_index import get_index
+
+logger = logging.getLogger(__name__)
+
+
+def load_urls():
+    """Импортирует маршруты, а с ними представления и сериализаторы."""
+    get_resolver().url_patterns
+
+
+def open_db_connection():
+    """
+    Кладет в пул процесса готовое соединение с БД.
+
+    Соединения Django привязаны к потоку, а запросы gthread- и
+    uvicorn-воркеров выполняются в других потоках, поэтому соединение,
+    открытое здесь, пригодится им только через пул (DB_POOL_MAX_SIZE).
+    Без пула шаг ничего не делает.
+    """
+    if not connection.settings_dict.get('POOL_MAX_SIZE'):
+        return
+    connection.ensure_connection()
+    # При включенном пуле закрытие возвращает соединение в пул
+    connection.close()
+
+
+def open_ingredient_index():
+    """Отображает в память индекс ингредиентов, собирая его при отсутствии."""
+    if settings.INGREDIENT_INDEX:
+        get_index()
+
+
+WARMERS = (load_urls, open_db_connection, open_ingredient_index)
+
+
+def warm_up():
+    """Выполняет шаги прогрева; ошибка одного шага не мешает остальным."""
+    for warmer in WARMERS:
+        try:
+            warmer()
+        except Exception:
+            logger.exception('Warm-up step %s failed', warmer.__name__)
@@ -0,0 +1,84 @@
+"""
+Конфигурация gunicorn для проекта Foodgram.
+
+Класс воркеров, их количество и число потоков вычисляются из доступных
+ядер и переменных окружения:
+
+- SERVER_MODE — wsgi (по умолчанию) или asgi;
+- GUNICORN_WORKER_CLASS — sync, gthread или uvicorn;
+- GUNICORN_WORKERS, GUNICORN_THREADS — явное количество воркеров/потоков;
+- GUNICORN_MAX_REQUESTS, GUNICORN_MAX_REQUESTS_JITTER — перезапуск
+  воркера после заданного числа запросов;
+- GUNICORN_PRELOAD — загрузка приложения в мастер-процессе до fork;
+- GUNICORN_BIND, GUNICORN_TIMEOUT, GUNICORN_KEEPALIVE.
+"""
+import os
+
+WORKER_CLASSES = {
+    'sync': 'sync',
+    'gthread': 'gthread',
+    'uvicorn': 'uvicorn.workers.UvicornWorker',
+}
+
+
+def env_int(name, default):
+    """Целочисленная переменная окружения или значение по умолчанию."""
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+# Учитываем ограничение CPU контейнера (cpuset), а не все ядра хоста
+cores = len(os.sched_getaffinity(0))
+
+worker_type = os.getenv(
+    'GUNICORN_WORKER_CLASS',
+    'uvicorn' if os.getenv('SERVER_MODE') == 'asgi' else 'gthread'
+)
+worker_class = WORKER_CLASSES[worker_type]
+wsgi_app = (
+    'foodgram.asgi:application' if worker_type == 'uvicorn'
+    else 'foodgram.wsgi:application'
+)
+
+# Синхронные воркеры блокируются на вводе-выводе — их больше ядер;
+# потоковые и асинхронные воркеры ждут ввод-вывод без простоя процесса
+workers = env_int('GUNICORN_WORKERS', {
+    'sync': 2 * cores + 1,
+    'gthread': cores + 1,
+    'uvicorn': cores,
+}[worker_type])
+threads = env_int('GUNICORN_THREADS', 4 if worker_type == 'gthread' else 1)
+
+# Плановый перезапуск ограничивает рост памяти, разброс не дает
+# всем воркерам перезапуститься одновременно
+max_requests = env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = env_int(
+    'GUNICORN_MAX_REQUESTS_JITTER', max_requests // 10
+)
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+timeout = env_int('GUNICORN_TIMEOUT', 30)
+keepalive = env_int('GUNICORN_KEEPALIVE', 5)
+
+
+def on_starting(server):
+    server.log.info(
+        'Foodgram: %s worker(s) of class %s, %s thread(s), cores: %s',
+        workers, worker_class, threads, cores
+    )
+
+
+def pre_fork(server, worker):
+    """Закрывает соединения мастера с БД, чтобы воркеры их не унаследовали."""
+    if server.cfg.preload_app:
+        from django.db import connections
+
+        connections.close_all()
+
+
+def post_worker_init(worker):
+    """Прогревает воркер после загрузки приложения."""
+    from foodgram.warmup import warm_up
+
+    warm_up()
@@ -0,0 +1,36 @@
+from django.contrib import admin
+
+from .models import Job
+
+
+class JobAdmin(admin.ModelAdmin):
+    """Админ-модель для просмотра фоновых задач."""
+
+    list_display = (
+        'id', 'name', 'state', 'priority', 'attempts', 'progress',
+        'user', 'created_at', 'finished_at'
+    )
+    list_filter = ('state', 'name')
+    list_select_related = ('user',)
+    search_fields = ('name',)
+    readonly_fields = [field.name for field in Job._meta.fields]
+    actions = ('retry',)
+
+    @admin.display(description='Прогресс')
+    def progress(self, obj):
+        if obj.total:
+            return f'{obj.done or 0} из {obj.total}'
+        return obj.done
+
+    @admin.action(description='Повторить выбранные задачи')
+    def retry(self, request, queryset):
+        updated = queryset.exclude(state=Job.RUNNING).update(
+            state=Job.QUEUED, attempts=0, error='', finished_at=None
+        )
+        self.message_user(request, f'Поставлено в очередь: {updated}')
+
+    def has_add_permission(self, request):
+        return False
+
+
+admin.site.register(Job, JobAdmin)
@@ -0,0 +1,36 @@
+"""Воркер фоновых задач."""
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from jobs.worker import start_workers
+
+
+class Command(BaseCommand):
+    help = (
+        'Выполняет фоновые задачи из очереди в БД; несколько процессов '
+        'с этой командой разбирают очередь совместно'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=1,
+            help='Количество потоков-воркеров в процессе'
+        )
+        parser.add_argument(
+            '--drain', action='store_true',
+            help='Завершиться, когда очередь опустеет'
+        )
+
+    def handle(self, *args, **options):
+        stop = threading.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: stop.set())
+        threads = start_workers(options['threads'], stop, options['drain'])
+        self.stdout.write(f'Запущено воркеров: {len(threads)}')
+        # Ожидание с таймаутом, чтобы главный поток получал сигналы
+        while any(thread.is_alive() for thread in threads):
+            for thread in threads:
+                thread.join(timeout=1)
+        self.stdout.write('Воркеры остановлены')
@@ -0,0 +1,117 @@
+from django.conf import settings
+from django.db import models
+from django.utils import timezone
+
+from foodgram.constants import JOB_NAME_MAX_LENGTH
+
+
+class Job(models.Model):
+    """Модель фоновой задачи в очереди."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField(
+        max_length=JOB_NAME_MAX_LENGTH,
+        verbose_name='Обработчик'
+    )
+    kwargs = models.JSONField(
+        default=dict,
+        verbose_name='Аргументы'
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='jobs',
+        verbose_name='Пользователь'
+    )
+    state = models.CharField(
+        max_length=10,
+        choices=STATES,
+        default=QUEUED,
+        verbose_name='Состояние'
+    )
+    priority = models.SmallIntegerField(
+        default=0,
+        verbose_name='Приоритет',
+        help_text='Задачи с большим приоритетом выполняются раньше'
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0,
+        verbose_name='Попытки'
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name='Максимум попыток'
+    )
+    run_after = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Выполнить после'
+    )
+    locked_until = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Занята воркером до'
+    )
+    done = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Выполнено'
+    )
+    total = models.PositiveIntegerField(
+        null=True,
+        blank=True,
+        verbose_name='Всего'
+    )
+    result = models.JSONField(
+        null=True,
+        blank=True,
+        verbose_name='Результат'
+    )
+    error = models.TextField(
+        blank=True,
+        verbose_name='Ошибка'
+    )
+    created_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Создана'
+    )
+    finished_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name='Завершена'
+    )
+
+    class Meta:
+        """Метаданные модели."""
+        ordering = ('-created_at',)
+        verbose_name = 'Фоновая задача'
+        verbose_name_plural = 'Фоновые задачи'
+        indexes = [
+            models.Index(
+                fields=['state', '-priority', 'run_after'],
+                name='job_queue_idx'
+            ),
+        ]
+
+    def __str__(self):
+        """Строковое представление модели."""
+        return f'{self.name} #{self.id}'
+
+    def progress(self, done, total=None):
+        """Сохраняет прогресс и продлевает аренду задачи воркером."""
+        from .worker import lease_deadline
+
+        self.done, self.total = done, total
+        Job.objects.filter(id=self.id).update(
+            done=done, total=total, locked_until=lease_deadline()
+        )
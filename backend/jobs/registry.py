@@ -0,0 +1,47 @@
+"""
+Реестр обработчиков фоновых задач и постановка задач в очередь.
+
+Обработчик — функция handler(job, **kwargs), зарегистрированная
+декоратором job_handler в модуле jobs.py приложения. Аргументы задачи
+хранятся в БД в JSON, поэтому передаются идентификаторы и строки, а
+не объекты. Прогресс сообщается через job.progress(done, total),
+возвращенное значение (тоже JSON) сохраняется в job.result. Файл
+результата в MEDIA_ROOT указывается в ключе 'file' результата: он
+удаляется вместе с задачей через JOB_RESULT_TTL.
+"""
+from collections import namedtuple
+from datetime import timedelta
+
+from django.utils import timezone
+
+from foodgram.constants import JOB_MAX_ATTEMPTS
+from .models import Job
+
+Handler = namedtuple('Handler', ('func', 'max_attempts', 'priority'))
+
+HANDLERS = {}
+
+
+def job_handler(name, max_attempts=JOB_MAX_ATTEMPTS, priority=0):
+    """Регистрирует функцию как обработчик задач с именем name."""
+    def decorator(func):
+        HANDLERS[name] = Handler(func, max_attempts, priority)
+        return func
+    return decorator
+
+
+def enqueue(name, user=None, priority=None, delay=None, **kwargs):
+    """
+    Ставит задачу в очередь и возвращает ее.
+
+    Задача видна воркерам после фиксации текущей транзакции.
+    """
+    handler = HANDLERS[name]
+    return Job.objects.create(
+        name=name,
+        kwargs=kwargs,
+        user=user,
+        priority=handler.priority if priority is None else priority,
+        max_attempts=handler.max_attempts,
+        run_after=timezone.now() + (delay or timedelta())
+    )
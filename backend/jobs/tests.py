@@ -0,0 +1,318 @@
+import base64
+import io
+import os
+import tempfile
+from datetime import timedelta
+
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from foodgram.constants import JOB_LEASE_TIMEOUT, JOB_RETRY_DELAY
+from recipes.models import Ingredient, Recipe, RecipeIngredient, ShoppingCart
+from users.models import User
+from .models import Job
+from .registry import enqueue, job_handler
+from .worker import (claim_job, fail_abandoned_jobs, purge_finished_jobs,
+                     run_next)
+
+# Однопиксельный PNG
+PNG = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAA'
+    'DUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+)
+calls = []
+
+
+@job_handler('tests.record')
+def record(job, value):
+    calls.append(value)
+    return {'value': value}
+
+
+@job_handler('tests.fail', max_attempts=3)
+def fail(job):
+    raise RuntimeError('boom')
+
+
+class WorkerTest(TestCase):
+    """Захват задач, аренда, повторы и удаление завершенных задач."""
+
+    def setUp(self):
+        calls.clear()
+
+    def expire_lease(self, job):
+        Job.objects.filter(id=job.id).update(
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+
+    def test_claim(self):
+        low = enqueue('tests.record', value=1)
+        high = enqueue('tests.record', priority=5, value=2)
+        enqueue('tests.record', delay=timedelta(hours=1), value=3)
+        job = claim_job()
+        self.assertEqual(job.id, high.id)
+        self.assertEqual((job.state, job.attempts), (Job.RUNNING, 1))
+        self.assertGreater(job.locked_until, timezone.now())
+        self.assertEqual(claim_job().id, low.id)
+        # Отложенная задача и захваченные не выдаются
+        self.assertIsNone(claim_job())
+
+    def test_run(self):
+        job = enqueue('tests.record', value=7)
+        self.assertTrue(run_next())
+        self.assertFalse(run_next())
+        job.refresh_from_db()
+        self.assertEqual(job.state, Job.DONE)
+        self.assertEqual(job.result, {'value': 7})
+        self.assertIsNone(job.locked_until)
+        self.assertEqual(calls, [7])
+
+    def test_lease_expiry(self):
+        job = enqueue('tests.record', value=1)
+        claim_job()
+        self.assertIsNone(claim_job())
+        self.expire_lease(job)
+        job = claim_job()
+        self.assertEqual(job.attempts, 2)
+
+    def test_exhausted_lease_is_not_reclaimed(self):
+        job = enqueue('tests.fail')
+        for _ in range(job.max_attempts):
+            claim_job()
+            self.expire_lease(job)
+        # Задача с исчерпанными попытками, роняющая воркер, не берется
+        # снова, а завершается ошибкой
+        self.assertIsNone(claim_job())
+        job.refresh_from_db()
+        self.assertEqual(job.state, Job.FAILED)
+        self.assertEqual(job.attempts, job.max_attempts)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_fail_abandoned_jobs(self):
+        job = enqueue('tests.fail')
+        Job.objects.filter(id=job.id).update(
+            state=Job.RUNNING, attempts=1,
+            locked_until=timezone.now() - timedelta(seconds=1)
+        )
+        fail_abandoned_jobs(timezone.now())
+        job.refresh_from_db()
+        self.assertEqual(job.state, Job.RUNNING)
+        Job.objects.filter(id=job.id).update(attempts=job.max_attempts)
+        fail_abandoned_jobs(timezone.now())
+        job.refresh_from_db()
+        self.assertEqual(job.state, Job.FAILED)
+
+    def test_retry_with_backoff(self):
+        job = enqueue('tests.fail')
+        for attempt in range(1, job.max_attempts):
+            started = timezone.now()
+            with self.assertLogs('jobs.worker', 'ERROR'):
+                self.assertTrue(run_next())
+            job.refresh_from_db()
+            self.assertEqual((job.state, job.attempts), (Job.QUEUED, attempt))
+            self.assertEqual(job.error, 'RuntimeError: boom')
+            delay = JOB_RETRY_DELAY * 2 ** (attempt - 1)
+            self.assertGreaterEqual(
+                job.run_after, started + timedelta(seconds=delay)
+            )
+            self.assertLess(
+                job.run_after,
+                started + timedelta(seconds=delay, minutes=1)
+            )
+            # До паузы задача не выдается
+            self.assertFalse(run_next())
+            Job.objects.filter(id=job.id).update(run_after=timezone.now())
+        with self.assertLogs('jobs.worker', 'ERROR'):
+            self.assertTrue(run_next())
+        job.refresh_from_db()
+        self.assertEqual(job.state, Job.FAILED)
+        self.assertIsNotNone(job.finished_at)
+        self.assertFalse(run_next())
+
+    def test_progress_extends_lease(self):
+        job = enqueue('tests.record', value=1)
+        job = claim_job()
+        self.expire_lease(job)
+        job.progress(5, 10)
+        job.refresh_from_db()
+        self.assertEqual((job.done, job.total), (5, 10))
+        self.assertGreater(
+            job.locked_until,
+            timezone.now() + timedelta(seconds=JOB_LEASE_TIMEOUT - 60)
+        )
+
+    def test_purge_finished_jobs(self):
+        with tempfile.TemporaryDirectory() as media, override_settings(
+            MEDIA_ROOT=media
+        ):
+            os.makedirs(os.path.join(media, 'exports'))
+            paths = []
+            for number in range(2):
+                path = f'exports/{number}.csv'
+                open(os.path.join(media, path), 'w').close()
+                paths.append(path)
+            old, fresh = [
+                enqueue('tests.record', value=number) for number in range(2)
+            ]
+            queued = enqueue('tests.record', value=2)
+            now = timezone.now()
+            for job, path, finished_at in (
+                (old, paths[0], now - timedelta(days=2)),
+                (fresh, paths[1], now),
+            ):
+                Job.objects.filter(id=job.id).update(
+                    state=Job.DONE, finished_at=finished_at,
+                    result={'url': f'/media/{path}', 'file': path}
+                )
+            self.assertEqual(purge_finished_jobs(now), 1)
+            self.assertEqual(
+                set(Job.objects.values_list('id', flat=True)),
+                {fresh.id, queued.id}
+            )
+            self.assertFalse(os.path.exists(os.path.join(media, paths[0])))
+            self.assertTrue(os.path.exists(os.path.join(media, paths[1])))
+
+
+class RunWorkerCommandTest(TransactionTestCase):
+    """Команда run_worker выполняет задачи в своих потоках."""
+
+    def test_drain(self):
+        calls.clear()
+        jobs = [enqueue('tests.record', value=number) for number in range(3)]
+        call_command(
+            'run_worker', '--threads', '2', '--drain', stdout=io.StringIO()
+        )
+        self.assertEqual(sorted(calls), [0, 1, 2])
+        self.assertEqual(
+            set(Job.objects.filter(
+                id__in=[job.id for job in jobs]
+            ).values_list('state', flat=True)),
+            {Job.DONE}
+        )
+
+
+class AcceptedResponseTest(TestCase):
+    """Ответы 202 с Prefer: respond-async и состояние задачи."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.com', username='user', password='x',
+            first_name='Имя', last_name='Фамилия'
+        )
+        cls.other = User.objects.create_user(
+            email='other@example.com', username='other', password='x',
+            first_name='Имя', last_name='Фамилия'
+        )
+        cls.salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+        cls.recipe = Recipe.objects.create(
+            author=cls.user, name='Суп', text='Варить', cooking_time=30
+        )
+        RecipeIngredient.objects.create(
+            recipe=cls.recipe, ingredient=cls.salt, amount=5
+        )
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.recipe)
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        settings_override = override_settings(MEDIA_ROOT=self.media.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(self.media.cleanup)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user)}',
+            HTTP_PREFER='respond-async'
+        )
+        return client
+
+    def test_shopping_list(self):
+        client = self.client_for(self.user)
+        response = client.get('/api/recipes/download_shopping_cart/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response['Preference-Applied'], 'respond-async')
+        status_url = response['Location']
+        self.assertEqual(client.get(status_url).json()['state'], Job.QUEUED)
+        self.assertTrue(run_next())
+        data = client.get(status_url).json()
+        self.assertEqual(data['state'], Job.DONE)
+        path = os.path.join(self.media.name, data['result']['file'])
+        with open(path, encoding='utf-8') as file:
+            self.assertIn('соль', file.read())
+        # Чужие задачи не видны
+        self.assertEqual(
+            self.client_for(self.other).get(status_url).status_code, 404
+        )
+
+    def recipe_data(self, **fields):
+        return {
+            'ingredients': [{'id': self.salt.id, 'amount': 10}],
+            'image': PNG, 'name': 'Каша', 'text': 'Варить',
+            'cooking_time': 15, **fields
+        }
+
+    def test_create_recipe_validated_before_queue(self):
+        response = self.client_for(self.user).post(
+            '/api/recipes/', self.recipe_data(cooking_time=0), format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('cooking_time', response.json())
+        self.assertFalse(Job.objects.exists())
+
+    def test_create_recipe(self):
+        response = self.client_for(self.user).post(
+            '/api/recipes/', self.recipe_data(), format='json'
+        )
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get()
+        # В задаче путь сохраненного изображения, а не base64
+        self.assertNotIn('image', job.kwargs['data'])
+        self.assertTrue(os.path.exists(
+            os.path.join(self.media.name, job.kwargs['image'])
+        ))
+        self.assertTrue(run_next())
+        job.refresh_from_db()
+        self.assertEqual(job.state, Job.DONE, job.error)
+        recipe = Recipe.objects.get(id=job.result['id'])
+        self.assertEqual(recipe.image.name, job.kwargs['image'])
+        self.assertEqual(
+            list(recipe.recipeingredients.values_list('amount', flat=True)),
+            [10]
+        )
+
+    def test_update_recipe(self):
+        response = self.client_for(self.other).patch(
+            f'/api/recipes/{self.recipe.id}/', self.recipe_data(),
+            format='json'
+        )
+        self.assertEqual(response.status_code, 403)
+        data = self.recipe_data(name='Борщ')
+        del data['image']
+        response = self.client_for(self.user).patch(
+            f'/api/recipes/{self.recipe.id}/', data, format='json'
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertIsNone(Job.objects.get().kwargs['image'])
+        self.assertTrue(run_next())
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.name, 'Борщ')
+
+    def test_avatar(self):
+        response = self.client_for(self.user).put(
+            '/api/users/me/avatar/', {'avatar': PNG}, format='json'
+        )
+        self.assertEqual(response.status_code, 202)
+        job = Job.objects.get()
+        self.assertEqual(list(job.kwargs), ['path'])
+        self.assertTrue(run_next())
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.avatar.name, job.kwargs['path'])
+        self.assertEqual(
+            base64.b64encode(self.user.avatar.read()).decode(),
+            PNG.split(',')[1]
+        )
@@ -0,0 +1,166 @@
+"""
+Выполнение фоновых задач из таблицы очереди.
+
+Свободная задача захватывается запросом SELECT ... FOR UPDATE SKIP
+LOCKED, поэтому несколько воркеров (процессов или потоков) разбирают
+очередь без внешнего брокера и не берут одну задачу дважды. Захваченная
+задача арендуется на JOB_LEASE_TIMEOUT секунд; если воркер упал, после
+окончания аренды задачу подберет другой воркер, если у нее остались
+попытки.
+
+Завершенные задачи удаляются через JOB_RESULT_TTL вместе с файлами
+результатов: выгрузки и списки покупок лежат в MEDIA_ROOT и доступны
+по ссылке.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from foodgram.constants import (JOB_CLEANUP_INTERVAL, JOB_LEASE_TIMEOUT,
+                                JOB_POLL_INTERVAL, JOB_RESULT_TTL,
+                                JOB_RETRY_DELAY)
+from .models import Job
+from .registry import HANDLERS
+
+logger = logging.getLogger(__name__)
+
+
+def lease_deadline():
+    return timezone.now() + timedelta(seconds=JOB_LEASE_TIMEOUT)
+
+
+def fail_abandoned_jobs(now):
+    """
+    Завершает ошибкой задачи с истекшей арендой, у которых не осталось
+    попыток: такая задача, роняющая воркер, иначе повторялась бы вечно.
+    """
+    Job.objects.filter(
+        state=Job.RUNNING, locked_until__lt=now,
+        attempts__gte=F('max_attempts')
+    ).update(
+        state=Job.FAILED,
+        error='Воркер не завершил задачу за время аренды',
+        locked_until=None,
+        finished_at=now
+    )
+
+
+def purge_finished_jobs(now):
+    """
+    Удаляет задачи, завершенные раньше чем JOB_RESULT_TTL назад, и их
+    файлы результатов; возвращает число удаленных задач.
+    """
+    jobs = Job.objects.filter(
+        state__in=(Job.DONE, Job.FAILED),
+        finished_at__lt=now - timedelta(seconds=JOB_RESULT_TTL)
+    )
+    ids = []
+    for job_id, result in jobs.values_list('id', 'result').iterator():
+        if isinstance(result, dict) and result.get('file'):
+            default_storage.delete(result['file'])
+        ids.append(job_id)
+    Job.objects.filter(id__in=ids).delete()
+    return len(ids)
+
+
+def claim_job():
+    """Захватывает следующую задачу очереди или возвращает None."""
+    now = timezone.now()
+    fail_abandoned_jobs(now)
+    with transaction.atomic():
+        job = Job.objects.select_for_update(skip_locked=True).filter(
+            Q(state=Job.QUEUED, run_after__lte=now)
+            | Q(
+                state=Job.RUNNING, locked_until__lt=now,
+                attempts__lt=F('max_attempts')
+            ),
+            name__in=HANDLERS
+        ).order_by('-priority', 'run_after', 'id').first()
+        if job is None:
+            return None
+        job.state = Job.RUNNING
+        job.attempts += 1
+        job.locked_until = lease_deadline()
+        job.save(update_fields=('state', 'attempts', 'locked_until'))
+    return job
+
+
+def run_job(job):
+    """Выполняет задачу; при ошибке планирует повтор с нарастающей паузой."""
+    try:
+        result = HANDLERS[job.name].func(job, **job.kwargs)
+    except Exception as error:
+        logger.exception('Job %s failed', job)
+        job.error = f'{type(error).__name__}: {error}'
+        if job.attempts < job.max_attempts:
+            job.state = Job.QUEUED
+            job.run_after = timezone.now() + timedelta(
+                seconds=JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            )
+        else:
+            job.state = Job.FAILED
+            job.finished_at = timezone.now()
+    else:
+        job.state = Job.DONE
+        job.result = result
+        job.error = ''
+        job.finished_at = timezone.now()
+    job.locked_until = None
+    job.save(update_fields=(
+        'state', 'result', 'error', 'run_after', 'locked_until',
+        'finished_at'
+    ))
+
+
+def run_next():
+    """Выполняет одну задачу; возвращает False, если очередь пуста."""
+    job = claim_job()
+    if job is None:
+        return False
+    run_job(job)
+    return True
+
+
+def work(stop, drain=False):
+    """
+    Цикл воркера до установки события stop.
+
+    При drain воркер завершается, как только очередь опустела. Не чаще
+    раза в JOB_CLEANUP_INTERVAL удаляет устаревшие задачи.
+    """
+    cleaned_at = None
+    try:
+        while not stop.is_set():
+            close_old_connections()
+            if (
+                cleaned_at is None
+                or time.monotonic() - cleaned_at > JOB_CLEANUP_INTERVAL
+            ):
+                purge_finished_jobs(timezone.now())
+                cleaned_at = time.monotonic()
+            if run_next():
+                continue
+            if drain:
+                break
+            stop.wait(JOB_POLL_INTERVAL)
+    finally:
+        connections.close_all()
+
+
+def start_workers(count, stop, drain=False):
+    """Запускает count потоков-воркеров и возвращает их."""
+    threads = [
+        threading.Thread(
+            target=work, args=(stop, drain), name=f'job-worker-{number}'
+        )
+        for number in range(count)
+    ]
+    for thread in threads:
+        thread.start()
+    return threads
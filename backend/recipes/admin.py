@@ -1,11 +1,25 @@
 from django.contrib import admin
+from django.contrib.admin import helpers
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Count, Exists, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from django.http import HttpRequest, QueryDict, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html
 from django.utils.safestring import mark_safe
-from import_export.admin import ImportExportActionModelAdmin
+from import_export.admin import ImportMixin
 
+from foodgram.constants import EXPORT_RESPONSE_MAX_ROWS
+from jobs.registry import enqueue
 from users.models import Subscribers, User
+from .exports import FORMATS, export_lines
 from .models import (Ingredient, Recipe, RecipeIngredient,
                      FavoriteRecipes, ShoppingCart)
+from .resources import (RESOURCES, IngredientResource,
+                        RecipeIngredientResource, RecipeResource)
 
 
 # Настройка заголовков админ-сайта
@@ -14,6 +28,148 @@ admin.site.site_title = "Foodgram"
 admin.site.index_title = "Управление сайтом"
 
 
+class EstimatedCountPaginator(Paginator):
+    """
+    Пагинатор с оценкой количества строк для больших таблиц.
+
+    Для списка без фильтров и поиска на PostgreSQL берется оценка
+    планировщика из pg_class вместо COUNT(*) по всей таблице. Точное
+    количество считается для небольших таблиц и отфильтрованных списков.
+    """
+
+    # Ниже этого порога оценка заменяется точным подсчетом
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None or query.where:
+            return super().count
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return super().count
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                [self.object_list.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        if row is None or row[0] < self.exact_count_limit:
+            return super().count
+        return int(row[0])
+
+
+class PerformanceModelAdmin(admin.ModelAdmin):
+    """Общие настройки списков для таблиц с миллионами строк."""
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class StreamingExportMixin:
+    """
+    Выгрузка из списка админки без сборки всей таблицы в памяти.
+
+    Действия отдают выбранные строки потоком в CSV или JSON Lines либо
+    ставят выгрузку в файл в очередь фоновых задач; состояние задачи
+    доступно по ссылке из сообщения админки. Больше
+    EXPORT_RESPONSE_MAX_ROWS строк выгружается только в фоне.
+    """
+
+    actions = ('export_csv', 'export_jsonl', 'export_in_background')
+
+    def get_export_resource(self):
+        return self.resource_classes[0]()
+
+    def stream_export(self, request, queryset, export_format):
+        if queryset.count() > EXPORT_RESPONSE_MAX_ROWS:
+            return self.enqueue_export(request, export_format)
+        _, content_type, extension = FORMATS[export_format]
+        response = StreamingHttpResponse(
+            export_lines(self.get_export_resource(), queryset, export_format),
+            content_type=f'{content_type}; charset=utf-8'
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{self.opts.model_name}.{extension}"'
+        )
+        return response
+
+    @admin.action(description='Выгрузить в CSV')
+    def export_csv(self, request, queryset):
+        return self.stream_export(request, queryset, 'csv')
+
+    @admin.action(description='Выгрузить в JSON Lines')
+    def export_jsonl(self, request, queryset):
+        return self.stream_export(request, queryset, 'jsonl')
+
+    @admin.action(description='Выгрузить в CSV в фоне')
+    def export_in_background(self, request, queryset):
+        self.enqueue_export(request, 'csv')
+
+    def enqueue_export(self, request, export_format):
+        # В задачу попадают параметры списка, а не идентификаторы строк:
+        # при выборе всех строк их могут быть миллионы. Отмеченные
+        # вручную строки умещаются на одной странице списка.
+        selected = None
+        if request.POST.get('select_across') != '1':
+            selected = request.POST.getlist(helpers.ACTION_CHECKBOX_NAME)
+        job = enqueue(
+            'recipes.export',
+            user=request.user,
+            resource=next(
+                name for name, resource_class in RESOURCES.items()
+                if resource_class is self.resource_classes[0]
+            ),
+            model_admin=f'{type(self).__module__}.{type(self).__qualname__}',
+            params=dict(request.GET.lists()),
+            ids=selected,
+            export_format=export_format
+        )
+        url = reverse('admin:jobs_job_change', args=[job.id])
+        self.message_user(request, format_html(
+            'Выгрузка поставлена в очередь: <a href="{}">{}</a>', url, job
+        ))
+
+
+def changelist_queryset(model_admin, user, params):
+    """
+    Строки списка админки с параметрами фильтров, поиска и сортировки
+    params, как их видит пользователь user.
+    """
+    request = HttpRequest()
+    request.method = 'GET'
+    request.user = user
+    request.GET = QueryDict(mutable=True)
+    for name, values in params.items():
+        request.GET.setlist(name, values)
+    return model_admin.get_changelist_instance(request).get_queryset(request)
+
+
+class BulkImportMixin(ImportMixin):
+    """
+    Импорт пакетами через ресурсы из resources.py.
+
+    Запись в журнал админки по каждой строке отключена: для больших
+    файлов она стоила бы отдельного INSERT на строку.
+    """
+
+    skip_admin_log = True
+
+
+def count_subquery(model, field):
+    """Количество строк model, ссылающихся полем field на объект списка."""
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                count=Count('*')
+            ).values('count')
+        ),
+        0
+    )
+
+
 class SubscribersInline(admin.TabularInline):
     """Инлайн для подписчиков пользователя."""
 
@@ -23,67 +179,143 @@ class SubscribersInline(admin.TabularInline):
 
 
 class BaseHasRelationFilter(admin.SimpleListFilter):
-    """Базовый класс для фильтров по наличию связей."""
+    """
+    Базовый класс для фильтров по наличию связей.
+
+    Фильтрует подзапросом EXISTS, без JOIN и DISTINCT по всей таблице.
+    """
 
     LOOKUP_CHOICES = (('1', 'Есть'), ('0', 'Нет'),)
-    # Должен быть определен в дочерних классах
+    # Должны быть определены в дочерних классах: связанная модель и ее
+    # поле, ссылающееся на фильтруемый объект
+    relation_model = None
     relation_field = None
 
     def lookups(self, request, model_admin):
         return self.LOOKUP_CHOICES
 
     def queryset(self, request, queryset):
+        exists = Exists(self.relation_model.objects.filter(
+            **{self.relation_field: OuterRef('pk')}
+        ))
         if self.value() == '1':
-            return queryset.filter(**{
-                f'{self.relation_field}__isnull': False
-            }).distinct()
+            return queryset.filter(exists)
         if self.value() == '0':
-            return queryset.filter(**{
-                f'{self.relation_field}__isnull': True
-            })
+            return queryset.filter(~exists)
 
 
 class HasRecipesFilter(BaseHasRelationFilter):
     title = 'Есть рецепты'
     parameter_name = 'has_recipes'
-    relation_field = 'recipes'
+    relation_model = Recipe
+    relation_field = 'author'
 
 
 class HasSubscriptionsFilter(BaseHasRelationFilter):
     title = 'Есть подписки'
     parameter_name = 'has_subscriptions'
-    relation_field = 'subscribers'
+    relation_model = Subscribers
+    relation_field = 'user'
 
 
 class HasFollowersFilter(BaseHasRelationFilter):
     title = 'Есть подписчики'
     parameter_name = 'has_followers'
-    relation_field = 'authors'
+    relation_model = Subscribers
+    relation_field = 'author'
 
 
 class HasRecipesIngredientFilter(BaseHasRelationFilter):
     title = 'Есть в рецептах'
     parameter_name = 'has_recipes'
-    relation_field = 'recipes'
+    relation_model = RecipeIngredient
+    relation_field = 'ingredient'
+
+
+class InputFilter(admin.SimpleListFilter):
+    """
+    Фильтр с полем ввода значения вместо списка вариантов: список
+    вариантов по связанной модели загружал бы всю ее таблицу.
+    """
+
+    template = 'admin/recipes/input_filter.html'
+
+    def lookups(self, request, model_admin):
+        # Без вариантов Django не показывает фильтр
+        return (('', ''),)
 
+    def choices(self, changelist):
+        yield {
+            'query_parts': [
+                (name, value) for name, value in changelist.params.items()
+                if name != self.parameter_name
+            ],
+        }
 
-class UserAdmin(BaseUserAdmin):
+
+class AuthorIdFilter(InputFilter):
+    title = 'ID автора'
+    parameter_name = 'author_id'
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value and value.isdigit():
+            return queryset.filter(author_id=value)
+        return queryset
+
+
+class CookingTimeFilter(admin.SimpleListFilter):
+    """Время приготовления по диапазонам, без DISTINCT по таблице."""
+
+    title = 'Время приготовления'
+    parameter_name = 'cooking_time'
+    # Параметр, название и границы диапазона в минутах
+    RANGES = (
+        ('fast', 'До 15 минут', 0, 15),
+        ('medium', '15–60 минут', 16, 60),
+        ('long', 'Больше часа', 61, None),
+    )
+
+    def lookups(self, request, model_admin):
+        return [(value, title) for value, title, _, _ in self.RANGES]
+
+    def queryset(self, request, queryset):
+        for value, _, low, high in self.RANGES:
+            if self.value() == value:
+                queryset = queryset.filter(cooking_time__gte=low)
+                if high is not None:
+                    queryset = queryset.filter(cooking_time__lte=high)
+                return queryset
+        return queryset
+
+
+class UserAdmin(BaseUserAdmin, PerformanceModelAdmin):
     """Админ-модель для управления пользователями."""
 
-    @admin.display(description='Количество рецептов')
+    def get_queryset(self, request):
+        """Добавляет счетчики подзапросами вместо запросов на строку."""
+        return super().get_queryset(request).annotate(
+            recipes_total=count_subquery(Recipe, 'author'),
+            followers_total=count_subquery(Subscribers, 'author'),
+            subscriptions_total=count_subquery(Subscribers, 'user'),
+        )
+
+    @admin.display(
+        description='Количество рецептов', ordering='recipes_total'
+    )
     def recipes_count(self, obj):
         """Возвращает количество рецептов пользователя."""
-        return obj.recipes.count()
+        return obj.recipes_total
 
-    @admin.display(description='Подписчиков')
+    @admin.display(description='Подписчиков', ordering='followers_total')
     def followers_count(self, obj):
         """Возвращает количество подписчиков пользователя."""
-        return obj.authors.count()
+        return obj.followers_total
 
-    @admin.display(description='Подписок')
+    @admin.display(description='Подписок', ordering='subscriptions_total')
     def subscriptions_count(self, obj):
         """Возвращает количество подписок пользователя."""
-        return obj.subscribers.count()
+        return obj.subscriptions_total
 
     @mark_safe
     @admin.display(description='Аватар')
@@ -147,13 +379,23 @@ class UserAdmin(BaseUserAdmin):
     )
 
 
-class IngredientAdmin(ImportExportActionModelAdmin, admin.ModelAdmin):
+class IngredientAdmin(StreamingExportMixin, BulkImportMixin,
+                      PerformanceModelAdmin):
     """Админ-модель для управления ингредиентами."""
 
-    @admin.display(description='Количество рецептов')
+    resource_classes = (IngredientResource,)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            recipes_total=count_subquery(RecipeIngredient, 'ingredient')
+        )
+
+    @admin.display(
+        description='Количество рецептов', ordering='recipes_total'
+    )
     def recipes_count(self, obj):
         """Возвращает количество рецептов с этим ингредиентом."""
-        return obj.recipes.count()
+        return obj.recipes_total
 
     list_display = (
         'id',
@@ -174,9 +416,25 @@ class RecipeIngredientInline(admin.TabularInline):
     extra = 0
 
 
-class RecipeAdmin(admin.ModelAdmin):
+class RecipeAdmin(StreamingExportMixin, BulkImportMixin,
+                  PerformanceModelAdmin):
     """Админ-модель для управления рецептами."""
 
+    resource_classes = (RecipeResource,)
+
+    def get_queryset(self, request):
+        """Загружает ингредиенты одним запросом, счетчик — подзапросом."""
+        return super().get_queryset(request).prefetch_related(
+            Prefetch(
+                'recipeingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient'
+                )
+            )
+        ).annotate(
+            favorite_total=count_subquery(FavoriteRecipes, 'recipe')
+        )
+
     @mark_safe
     @admin.display(description='Ингредиенты')
     def get_ingredients(self, obj):
@@ -190,10 +448,10 @@ class RecipeAdmin(admin.ModelAdmin):
             ]
         )
 
-    @admin.display(description='В избранном')
+    @admin.display(description='В избранном', ordering='favorite_total')
     def favorite_count(self, obj):
         """Отображает кол-во пользователей, добавивших рецепт в избранное."""
-        return obj.favoriterecipes.count()
+        return obj.favorite_total
 
     @mark_safe
     @admin.display(description='Изображение')
@@ -247,8 +505,9 @@ class RecipeAdmin(admin.ModelAdmin):
         'get_ingredients',
         'favorite_count',
     )
+    list_select_related = ('author',)
     search_fields = ('name', 'author__username')
-    list_filter = ('author', 'cooking_time')
+    list_filter = (AuthorIdFilter, CookingTimeFilter)
     readonly_fields = ('image_preview',)
     empty_value_display = 'Не задано'
 
@@ -265,19 +524,23 @@ class RecipeAdmin(admin.ModelAdmin):
     save_on_top = True
 
 
-class RecipeIngredientAdmin(admin.ModelAdmin):
+class RecipeIngredientAdmin(StreamingExportMixin, BulkImportMixin,
+                            PerformanceModelAdmin):
     """Админ-модель для управления ингредиентами в рецептах."""
 
+    resource_classes = (RecipeIngredientResource,)
+
     list_display = (
         'id',
         'recipe',
         'ingredient',
         'amount',
     )
+    list_select_related = ('recipe', 'ingredient')
     search_fields = ('recipe__name', 'ingredient__name')
 
 
-class FavoriteRecipesAdmin(admin.ModelAdmin):
+class FavoriteRecipesAdmin(PerformanceModelAdmin):
     """Админ-модель для управления избранными рецептами."""
 
     list_display = (
@@ -285,10 +548,11 @@ class FavoriteRecipesAdmin(admin.ModelAdmin):
         'user',
         'recipe',
     )
+    list_select_related = ('user', 'recipe')
     search_fields = ('user__username', 'recipe__name')
 
 
-class ShoppingCartAdmin(admin.ModelAdmin):
+class ShoppingCartAdmin(PerformanceModelAdmin):
     """Админ-модель для управления списком покупок."""
 
     list_display = (
@@ -296,10 +560,11 @@ class ShoppingCartAdmin(admin.ModelAdmin):
         'user',
         'recipe',
     )
+    list_select_related = ('user', 'recipe')
     search_fields = ('user__username', 'recipe__name')
 
 
-class SubscribersAdmin(admin.ModelAdmin):
+class SubscribersAdmin(PerformanceModelAdmin):
     """Админ-модель для управления подписками."""
 
     list_display = (
@@ -307,6 +572,7 @@ class SubscribersAdmin(admin.ModelAdmin):
         'author',
         'user',
     )
+    list_select_related = ('author', 'user')
     search_fields = ('id', 'author__username', 'user__username')
     ordering = ('author',)
 
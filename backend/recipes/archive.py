@@ -0,0 +1,98 @@
+"""
+Архивирование корзин давно не активных пользователей.
+
+Корзины неактивных пользователей занимают основную часть таблицы, но
+почти не читаются. Архивирование переносит их строки в
+ArchivedShoppingCart, удаляет сводные списки покупок и помечает
+пользователя флагом cart_archived. Активность определяется по
+last_seen, который обновляют запросы с токеном, и по last_login:
+пользователь одного долгоживущего токена не считается ушедшим. Токены
+не отзываются; корзина возвращается из архива при первом запросе
+пользователя с токеном, а список покупок собирается заново.
+
+После фиксации отправляется сигнал carts_archive_changed: по нему
+сбрасываются кэш пользователей токенов и версии ответов пользователей.
+"""
+from datetime import timedelta
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from foodgram.db.replicas import primary
+from users.models import User
+from .models import ArchivedShoppingCart, ShoppingCart, ShoppingListItem
+from .shopping_list import rebuild
+from .signals import carts_archive_changed
+
+
+def send_archive_changed(user_ids):
+    """Отправляет carts_archive_changed после фиксации транзакции."""
+    user_ids = list(user_ids)
+    transaction.on_commit(lambda: carts_archive_changed.send(
+        sender=ShoppingCart, user_ids=user_ids
+    ))
+
+
+def stale_user_ids(days):
+    """Пользователи с корзиной, не активные больше days дней."""
+    cutoff = timezone.now() - timedelta(days=days)
+    return list(
+        User.objects.filter(
+            Q(last_seen__lt=cutoff) | Q(last_seen__isnull=True),
+            Q(last_login__lt=cutoff) | Q(last_login__isnull=True),
+            date_joined__lt=cutoff,
+            shoppingcarts__isnull=False
+        ).distinct().values_list('id', flat=True)
+    )
+
+
+def archive_carts(user_ids):
+    """Переносит корзины пользователей в архив; возвращает число строк."""
+    if not user_ids:
+        return 0
+    with transaction.atomic():
+        rows = list(
+            ShoppingCart.objects.filter(
+                user_id__in=user_ids
+            ).values_list('user_id', 'recipe_id')
+        )
+        ArchivedShoppingCart.objects.bulk_create(
+            (
+                ArchivedShoppingCart(user_id=user_id, recipe_id=recipe_id)
+                for user_id, recipe_id in rows
+            ),
+            ignore_conflicts=True
+        )
+        ShoppingListItem.objects.filter(user_id__in=user_ids).delete()
+        # Одним запросом и без сигналов post_delete для каждой строки:
+        # списки покупок этих пользователей уже удалены целиком
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {ShoppingCart._meta.db_table} '
+                f'WHERE user_id IN ({", ".join(["%s"] * len(user_ids))})',
+                list(user_ids)
+            )
+        User.objects.filter(id__in=user_ids).update(cart_archived=True)
+        send_archive_changed(user_ids)
+    return len(rows)
+
+
+def restore_carts(user_ids):
+    """Возвращает корзины пользователей из архива; возвращает число строк."""
+    with primary(), transaction.atomic():
+        archived = ArchivedShoppingCart.objects.filter(user_id__in=user_ids)
+        rows = list(archived.values_list('user_id', 'recipe_id'))
+        if rows:
+            ShoppingCart.objects.bulk_create(
+                (
+                    ShoppingCart(user_id=user_id, recipe_id=recipe_id)
+                    for user_id, recipe_id in rows
+                ),
+                ignore_conflicts=True
+            )
+            archived.delete()
+            rebuild(user_ids)
+        User.objects.filter(id__in=user_ids).update(cart_archived=False)
+        send_archive_changed(user_ids)
+    return len(rows)
@@ -0,0 +1,121 @@
+"""
+Потоковая выгрузка таблиц в CSV и JSON Lines.
+
+Строки читаются итератором queryset (на PostgreSQL — серверным
+курсором) порциями по EXPORT_CHUNK_SIZE и сразу превращаются в текст,
+поэтому память не зависит от размера таблицы. Набор и порядок
+столбцов берутся из ресурса django-import-export, так что выгрузку
+можно загрузить обратно импортом.
+
+Ответ админки читает строки до того, как начнет отдаваться: под ASGI
+потоковое содержимое перебирается в цикле событий, где запросы к БД
+запрещены. Поэтому ответом отдаются выгрузки не больше
+EXPORT_RESPONSE_MAX_ROWS строк, остальные пишутся в файл в фоне.
+"""
+import csv
+import json
+import os
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from foodgram.constants import EXPORT_CHUNK_SIZE
+
+# Каталог фоновых выгрузок внутри MEDIA_ROOT
+EXPORTS_DIR = 'exports'
+
+
+class Echo:
+    """Объект с методом write для csv.writer, возвращающий строку."""
+
+    def write(self, value):
+        return value
+
+
+def export_columns(resource):
+    """Заголовки и атрибуты моделей для полей выгрузки ресурса."""
+    export_fields = resource.get_export_fields()
+    return (
+        [field.column_name for field in export_fields],
+        [field.attribute for field in export_fields],
+    )
+
+
+def export_rows(resource, queryset):
+    """Кортежи значений полей ресурса для строк queryset."""
+    _, attributes = export_columns(resource)
+    return queryset.prefetch_related(None).order_by('pk').values_list(
+        *attributes
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def csv_lines(headers, rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def jsonl_lines(headers, rows):
+    for row in rows:
+        yield json.dumps(
+            dict(zip(headers, row)), ensure_ascii=False, cls=DjangoJSONEncoder
+        ) + '\n'
+
+
+# Формат: (функция строк, MIME-тип, расширение файла)
+FORMATS = {
+    'csv': (csv_lines, 'text/csv', 'csv'),
+    'jsonl': (jsonl_lines, 'application/x-ndjson', 'jsonl'),
+}
+
+
+def export_lines(resource, queryset, export_format):
+    """
+    Строки выгрузки queryset в формате export_format.
+
+    Строки queryset читаются из БД сразу, текст строится при переборе.
+    """
+    lines, _, _ = FORMATS[export_format]
+    headers, _ = export_columns(resource)
+    return lines(headers, list(export_rows(resource, queryset)))
+
+
+def write_export(file, resource, queryset, export_format, progress=None):
+    """
+    Записывает выгрузку в файл, сообщая о прогрессе.
+
+    progress(done, total) вызывается после каждой порции строк.
+    Возвращает количество выгруженных строк.
+    """
+    total = queryset.count()
+    headers, _ = export_columns(resource)
+    lines, _, _ = FORMATS[export_format]
+    done = 0
+
+    def counted(rows):
+        nonlocal done
+        for row in rows:
+            yield row
+            done += 1
+            if progress and done % EXPORT_CHUNK_SIZE == 0:
+                progress(done, total)
+
+    for line in lines(headers, counted(export_rows(resource, queryset))):
+        file.write(line)
+    if progress:
+        progress(done, total)
+    return done
+
+
+def export_to_media(progress, resource, queryset, export_format, name):
+    """
+    Выгрузка в файл exports/<name> в MEDIA_ROOT для фоновой задачи.
+
+    Возвращает путь файла относительно MEDIA_ROOT.
+    """
+    directory = os.path.join(settings.MEDIA_ROOT, EXPORTS_DIR)
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, name), 'w', encoding='utf-8') as file:
+        write_export(file, resource, queryset, export_format, progress)
+    return f'{EXPORTS_DIR}/{name}'
@@ -0,0 +1,45 @@
+"""Фоновые задачи приложения рецептов."""
+import uuid
+
+from django.conf import settings
+from django.contrib import admin
+from django.utils.module_loading import import_string
+
+from jobs.registry import job_handler
+from users.models import User
+from .exports import FORMATS, export_to_media
+from .resources import RESOURCES
+
+
+@job_handler('recipes.export')
+def export(job, resource, export_format, model_admin, params, ids=None):
+    """
+    Выгружает в файл строки списка админки и возвращает URL и путь
+    файла.
+
+    Список восстанавливается по параметрам params классом model_admin;
+    ids — строки, отмеченные на странице вручную, None — все строки
+    списка.
+    """
+    # Модуль админки импортируется при вызове: задачи регистрируются
+    # раньше, чем админка обходит модули приложений
+    from .admin import changelist_queryset
+
+    resource = RESOURCES[resource]()
+    model = resource._meta.model
+    rows = changelist_queryset(
+        import_string(model_admin)(model, admin.site),
+        User.objects.get(id=job.user_id),
+        params
+    )
+    if ids is not None:
+        rows = rows.filter(pk__in=ids)
+    _, _, extension = FORMATS[export_format]
+    path = export_to_media(
+        job.progress,
+        resource,
+        resource.get_queryset().filter(pk__in=rows.values('pk')),
+        export_format,
+        f'{model._meta.model_name}-{uuid.uuid4().hex}.{extension}'
+    )
+    return {'url': f'{settings.MEDIA_URL}{path}', 'file': path}
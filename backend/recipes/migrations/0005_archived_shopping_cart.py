@@ -0,0 +1,34 @@
+# Generated by Django 3.2.25 on 2026-10-19 05:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('recipes', '0004_shopping_list_items'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedShoppingCart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archived_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата переноса в архив')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_shoppingcarts', to='recipes.recipe', verbose_name='Рецепт')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_shoppingcarts', to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+            ],
+            options={
+                'verbose_name': 'Архивная корзина',
+                'verbose_name_plural': 'Архивные корзины',
+                'ordering': ('-archived_at',),
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='archivedshoppingcart',
+            constraint=models.UniqueConstraint(fields=('recipe', 'user'), name='unique_archived_shoppingcart'),
+        ),
+    ]
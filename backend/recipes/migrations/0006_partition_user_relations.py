@@ -0,0 +1,28 @@
+# Generated by Django 3.2.25 on 2026-10-19 09:10
+
+from django.conf import settings
+from django.db import migrations
+
+from foodgram.db.partitioning import merge_tables, partition_tables
+
+TABLES = ('recipes_shoppingcart', 'recipes_favoriterecipes')
+
+
+def partition(apps, schema_editor):
+    """Секционирует корзины и избранное при DB_PARTITIONS > 0."""
+    partition_tables(schema_editor.connection, TABLES, settings.DB_PARTITIONS)
+
+
+def merge(apps, schema_editor):
+    merge_tables(schema_editor.connection, TABLES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0005_archived_shopping_cart'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, merge),
+    ]
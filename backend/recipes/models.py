@@ -199,3 +199,87 @@ class FavoriteRecipes(models.Model):
     def __str__(self):
         """Строковое представление модели."""
         return f"{self.recipe} - {self.user}"
+
+
+class ArchivedShoppingCart(models.Model):
+    """
+    Модель рецепта из корзины давно не активного пользователя.
+
+    Корзина переносится в архив командой archive_carts и возвращается
+    при первом запросе пользователя (см. recipes/archive.py).
+    """
+
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='archived_shoppingcarts',
+        verbose_name='Рецепт'
+    )
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='archived_shoppingcarts',
+        verbose_name='Пользователь'
+    )
+    archived_at = models.DateTimeField(
+        auto_now_add=True,
+        verbose_name='Дата переноса в архив'
+    )
+
+    class Meta:
+        """Метаданные модели."""
+        ordering = ('-archived_at',)
+        verbose_name = 'Архивная корзина'
+        verbose_name_plural = 'Архивные корзины'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['recipe', 'user'],
+                name='unique_archived_shoppingcart'
+            )
+        ]
+
+    def __str__(self):
+        """Строковое представление модели."""
+        return f'{self.recipe} - {self.user}'
+
+
+class ShoppingListItem(models.Model):
+    """
+    Модель строки сводного списка покупок пользователя.
+
+    Хранит суммарное количество ингредиента во всех рецептах корзины
+    пользователя и обновляется при изменении корзины и рецептов
+    (см. recipes/shopping_list.py).
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Пользователь'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент'
+    )
+    amount = models.PositiveIntegerField(
+        verbose_name='Количество'
+    )
+
+    class Meta:
+        """Метаданные модели."""
+        ordering = ('ingredient__name',)
+        verbose_name = 'Строка списка покупок'
+        verbose_name_plural = 'Сводные списки покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_shopping_list_item'
+            )
+        ]
+
+    def __str__(self):
+        """Строковое представление модели."""
+        return f'{self.user}: {self.ingredient} - {self.amount}'
@@ -0,0 +1,167 @@
+"""
+Ресурсы django-import-export для ингредиентов и рецептов.
+
+Импорт пишет строки пакетами bulk_create/bulk_update и находит
+существующие объекты одним запросом на набор данных. Внешние ключи
+импортируются и выгружаются как идентификаторы без запроса на строку:
+их целостность проверяет БД.
+"""
+from import_export import fields, resources, widgets
+from import_export.instance_loaders import (CachedInstanceLoader,
+                                            ModelInstanceLoader)
+from import_export.results import RowResult
+
+from foodgram.constants import IMPORT_BATCH_SIZE
+from .models import Ingredient, Recipe, RecipeIngredient
+from .signals import bulk_changed
+
+
+class CachedNaturalKeyLoader(ModelInstanceLoader):
+    """
+    Загружает существующие объекты набора данных одним запросом.
+
+    В отличие от CachedInstanceLoader работает с ключом из нескольких
+    полей (например, название и единица измерения ингредиента).
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.key_fields = [
+            self.resource.fields[name]
+            for name in self.resource.get_import_id_fields()
+        ]
+        self.instances = {}
+        rows = self.dataset.dict
+        if rows and all(
+            field.column_name in rows[0] for field in self.key_fields
+        ):
+            first = self.key_fields[0]
+            queryset = self.get_queryset().filter(**{
+                f'{first.attribute}__in': {first.clean(row) for row in rows}
+            })
+            self.instances = {
+                self.instance_key(instance): instance
+                for instance in queryset
+            }
+
+    def instance_key(self, instance):
+        return tuple(field.get_value(instance) for field in self.key_fields)
+
+    def get_instance(self, row):
+        return self.instances.get(
+            tuple(field.clean(row) for field in self.key_fields)
+        )
+
+
+class BulkRowResult(RowResult):
+    """
+    Результат строки без строкового представления объекта.
+
+    __str__ ингредиента рецепта обращается к связанным объектам, что
+    стоило бы двух запросов на каждую импортируемую строку.
+    """
+
+    def add_instance_info(self, instance):
+        if instance is not None:
+            self.object_id = instance.pk
+
+
+def id_field(attribute, column_name):
+    """Поле внешнего ключа, импортируемое как идентификатор."""
+    return fields.Field(
+        attribute=attribute,
+        column_name=column_name,
+        widget=widgets.IntegerWidget()
+    )
+
+
+class BulkModelResource(resources.ModelResource):
+    """Пакетный импорт без хранения различий строк в памяти."""
+
+    # Столбец набора данных с идентификаторами рецептов, которых
+    # касается импорт
+    recipe_id_column = None
+
+    class Meta:
+        use_bulk = True
+        batch_size = IMPORT_BATCH_SIZE
+        chunk_size = IMPORT_BATCH_SIZE
+        skip_diff = True
+        report_skipped = False
+
+    @classmethod
+    def get_row_result_class(cls):
+        return BulkRowResult
+
+    def get_bulk_update_fields(self):
+        """Изменяемые поля без первичного ключа и полей только для чтения."""
+        pk = self._meta.model._meta.pk.attname
+        return [
+            field.attribute for name, field in self.fields.items()
+            if not field.readonly and field.attribute != pk
+            and name not in self._meta.import_id_fields
+        ]
+
+    def bulk_update(self, *args, **kwargs):
+        # Если все поля входят в ключ, найденным объектам нечего обновлять
+        if not self.get_bulk_update_fields():
+            self.update_instances.clear()
+            return
+        super().bulk_update(*args, **kwargs)
+
+    def after_import(self, dataset, result, **kwargs):
+        super().after_import(dataset, result, **kwargs)
+        if kwargs.get('dry_run'):
+            return
+        ids = []
+        if self.recipe_id_column in dataset.headers:
+            ids = [
+                int(value) for value in dataset[self.recipe_id_column]
+                if value not in (None, '')
+            ]
+        bulk_changed.send(sender=self._meta.model, ids=ids)
+
+
+class IngredientResource(BulkModelResource):
+    """Ингредиенты; существующие находятся по названию и единице."""
+
+    id = fields.Field(attribute='id', column_name='id', readonly=True)
+
+    class Meta(BulkModelResource.Meta):
+        model = Ingredient
+        fields = ('id', 'name', 'measurement_unit')
+        import_id_fields = ('name', 'measurement_unit')
+        instance_loader_class = CachedNaturalKeyLoader
+
+
+class RecipeResource(BulkModelResource):
+    """Рецепты; изображение передается именем файла в хранилище."""
+
+    author = id_field('author_id', 'author')
+    recipe_id_column = 'id'
+
+    class Meta(BulkModelResource.Meta):
+        model = Recipe
+        fields = ('id', 'author', 'name', 'image', 'text', 'cooking_time')
+        instance_loader_class = CachedInstanceLoader
+
+
+class RecipeIngredientResource(BulkModelResource):
+    """Ингредиенты рецептов с количествами."""
+
+    recipe = id_field('recipe_id', 'recipe')
+    ingredient = id_field('ingredient_id', 'ingredient')
+    recipe_id_column = 'recipe'
+
+    class Meta(BulkModelResource.Meta):
+        model = RecipeIngredient
+        fields = ('id', 'recipe', 'ingredient', 'amount')
+        instance_loader_class = CachedInstanceLoader
+
+
+# Ресурсы по именам для команд import_data и export_data
+RESOURCES = {
+    'ingredients': IngredientResource,
+    'recipes': RecipeResource,
+    'recipe_ingredients': RecipeIngredientResource,
+}
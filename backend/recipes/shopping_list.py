@@ -0,0 +1,168 @@
+"""
+Поддержка сводных списков покупок (ShoppingListItem).
+
+Таблица не пересчитывается из корзины при каждом чтении, а меняется
+приращениями: добавление рецепта в корзину прибавляет количества его
+ингредиентов, удаление — вычитает, изменение состава рецепта переносит
+разницу сразу во все корзины с этим рецептом несколькими запросами
+независимо от числа пользователей. Когда прежние количества неизвестны
+(например, после импорта), списки затронутых пользователей собираются
+заново после фиксации транзакции.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Sum, Value, When
+from django.db.models.functions import Greatest
+
+from foodgram.constants import IMPORT_BATCH_SIZE
+from foodgram.db.commit import on_commit_once
+from .models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+
+def recipe_amounts(recipe_ids):
+    """Количества ингредиентов рецептов: {рецепт: {ингредиент: кол-во}}."""
+    amounts = defaultdict(dict)
+    for recipe_id, ingredient_id, amount in RecipeIngredient.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('recipe_id', 'ingredient_id', 'amount'):
+        amounts[recipe_id][ingredient_id] = amount
+    return amounts
+
+
+def add_amounts(items, deltas):
+    """
+    Прибавляет к строкам items приращения deltas одним UPDATE.
+
+    deltas — список пар (условие Q, приращение). Количество не
+    опускается ниже нуля, обнулившиеся строки удаляются.
+    """
+    items.update(amount=Greatest(
+        F('amount') + Case(
+            *[
+                When(condition, then=Value(delta))
+                for condition, delta in deltas
+            ],
+            default=Value(0),
+            output_field=IntegerField()
+        ),
+        Value(0)
+    ))
+    if any(delta < 0 for _, delta in deltas):
+        items.filter(amount=0).delete()
+
+
+def apply_deltas(deltas):
+    """Применяет приращения {(пользователь, ингредиент): кол-во}."""
+    deltas = [(key, delta) for key, delta in deltas.items() if delta]
+    for start in range(0, len(deltas), IMPORT_BATCH_SIZE):
+        batch = deltas[start:start + IMPORT_BATCH_SIZE]
+        ShoppingListItem.objects.bulk_create(
+            (
+                ShoppingListItem(
+                    user_id=user_id, ingredient_id=ingredient_id, amount=0
+                )
+                for (user_id, ingredient_id), delta in batch if delta > 0
+            ),
+            ignore_conflicts=True
+        )
+        add_amounts(
+            ShoppingListItem.objects.filter(
+                user_id__in={user_id for (user_id, _), _ in batch},
+                ingredient_id__in={
+                    ingredient_id for (_, ingredient_id), _ in batch
+                }
+            ),
+            [
+                (Q(user_id=user_id, ingredient_id=ingredient_id), delta)
+                for (user_id, ingredient_id), delta in batch
+            ]
+        )
+
+
+def change_carts(pairs, sign=1):
+    """
+    Учитывает добавление (sign=1) или удаление (sign=-1) рецептов из
+    корзин; pairs — пары (пользователь, рецепт).
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return
+    amounts = recipe_amounts({recipe_id for _, recipe_id in pairs})
+    deltas = defaultdict(int)
+    for user_id, recipe_id in pairs:
+        for ingredient_id, amount in amounts[recipe_id].items():
+            deltas[user_id, ingredient_id] += sign * amount
+    apply_deltas(deltas)
+
+
+def propagate_recipe_changes(recipe_id, changes):
+    """
+    Переносит изменение состава рецепта во все корзины с ним.
+
+    changes — {ингредиент: изменение количества}. Существующие строки
+    меняются одним UPDATE по подзапросу пользователей корзин.
+    """
+    changes = {
+        ingredient_id: delta
+        for ingredient_id, delta in changes.items() if delta
+    }
+    if not changes:
+        return
+    users = ShoppingCart.objects.filter(recipe_id=recipe_id).values('user_id')
+    added = [ingredient_id for ingredient_id, delta in changes.items()
+             if delta > 0]
+    if added:
+        ShoppingListItem.objects.bulk_create(
+            (
+                ShoppingListItem(
+                    user_id=user_id, ingredient_id=ingredient_id, amount=0
+                )
+                for user_id in users.values_list('user_id', flat=True)
+                for ingredient_id in added
+            ),
+            batch_size=IMPORT_BATCH_SIZE,
+            ignore_conflicts=True
+        )
+    add_amounts(
+        ShoppingListItem.objects.filter(
+            user_id__in=users, ingredient_id__in=list(changes)
+        ),
+        [
+            (Q(ingredient_id=ingredient_id), delta)
+            for ingredient_id, delta in changes.items()
+        ]
+    )
+
+
+def rebuild(user_ids):
+    """Собирает списки пользователей заново из их корзин."""
+    user_ids = list(user_ids)
+    with transaction.atomic():
+        ShoppingListItem.objects.filter(user_id__in=user_ids).delete()
+        ShoppingListItem.objects.bulk_create(
+            (
+                ShoppingListItem(
+                    user_id=row['recipe__shoppingcarts__user_id'],
+                    ingredient_id=row['ingredient_id'],
+                    amount=row['total']
+                )
+                for row in RecipeIngredient.objects.filter(
+                    recipe__shoppingcarts__user_id__in=user_ids
+                ).values(
+                    'recipe__shoppingcarts__user_id', 'ingredient_id'
+                ).annotate(total=Sum('amount')).order_by()
+            ),
+            batch_size=IMPORT_BATCH_SIZE
+        )
+
+
+def schedule_rebuild_for_recipes(recipe_ids):
+    """
+    Собирает заново списки пользователей, у которых в корзине есть
+    рецепты recipe_ids, после фиксации текущей транзакции.
+    """
+    user_ids = ShoppingCart.objects.filter(
+        recipe_id__in=recipe_ids
+    ).values_list('user_id', flat=True)
+    on_commit_once(rebuild, user_ids)
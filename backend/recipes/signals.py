@@ -0,0 +1,11 @@
+"""Сигналы приложения рецептов."""
+from django.dispatch import Signal
+
+# Отправляется после пакетной записи, минующей save() и сигналы моделей
+# (например, импорта из админки). Аргументы: ids — идентификаторы
+# измененных объектов модели sender, если они известны.
+bulk_changed = Signal()
+
+# Отправляется после фиксации переноса корзин в архив или возврата из
+# него. Аргументы: user_ids — идентификаторы владельцев корзин.
+carts_archive_changed = Signal()
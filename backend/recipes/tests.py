@@ -0,0 +1,469 @@
+import json
+import os
+import tempfile
+from unittest import mock
+
+import tablib
+from django.contrib.admin import helpers
+from django.contrib.auth.models import AnonymousUser
+from django.db import connection, transaction
+from django.http import StreamingHttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.fast_serializers import RECIPE_FIELDS, serialize_recipes
+from api.renderers import FastJSONRenderer
+from api.serializers import GetRecipeSerializer
+from api.views import RecipesViewSet, add_relations_in_bulk
+from jobs.models import Job
+from jobs.worker import run_next
+from users.models import Subscribers, User
+from .exports import export_lines
+from .models import (FavoriteRecipes, Ingredient, Recipe, RecipeIngredient,
+                     ShoppingCart, ShoppingListItem)
+from .resources import (CachedNaturalKeyLoader, IngredientResource,
+                        RecipeIngredientResource)
+from .shopping_list import rebuild, schedule_rebuild_for_recipes
+from .units import format_amount, sum_by_units
+
+
+class FastSerializersTest(TestCase):
+    """Быстрая сериализация совпадает с GetRecipeSerializer."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            email='author@example.com', username='author', password='x',
+            first_name='Автор', last_name='Авторов',
+            avatar='avatar/images/author.png'
+        )
+        cls.viewer = User.objects.create_user(
+            email='viewer@example.com', username='viewer', password='x',
+            first_name='Читатель', last_name='Читателев'
+        )
+        salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+        milk = Ingredient.objects.create(name='молоко', measurement_unit='мл')
+        cls.recipes = [
+            Recipe.objects.create(
+                author=author, name=name, text='Текст', cooking_time=10,
+                image=image
+            )
+            for author, name, image in (
+                (cls.author, 'Суп', 'recipes_images/soup.png'),
+                (cls.author, 'Каша', ''),
+                (cls.viewer, 'Омлет', 'recipes_images/omelette.png'),
+            )
+        ]
+        for recipe in cls.recipes[:2]:
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=salt, amount=5
+            )
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=milk, amount=200
+            )
+        Subscribers.objects.create(user=cls.viewer, author=cls.author)
+        FavoriteRecipes.objects.create(
+            user=cls.viewer, recipe=cls.recipes[0]
+        )
+        ShoppingCart.objects.create(user=cls.viewer, recipe=cls.recipes[1])
+
+    def make_request(self, user):
+        request = RequestFactory().get('/api/recipes/')
+        request.user = user
+        return request
+
+    def assertSameData(self, user):
+        queryset = RecipesViewSet(
+            request=self.make_request(user)
+        ).get_queryset().order_by('id')
+        expected = GetRecipeSerializer(
+            queryset, many=True,
+            context={'request': self.make_request(user)}
+        ).data
+        fast = serialize_recipes(
+            Recipe.objects.order_by('id').values(*RECIPE_FIELDS),
+            self.make_request(user)
+        )
+        self.assertEqual(fast, expected)
+        self.assertEqual(
+            FastJSONRenderer().render(fast),
+            FastJSONRenderer().render(expected)
+        )
+        return fast
+
+    def test_anonymous_viewer(self):
+        data = self.assertSameData(AnonymousUser())
+        self.assertFalse(any(recipe['is_favorited'] for recipe in data))
+
+    def test_viewer_flags(self):
+        data = self.assertSameData(self.viewer)
+        self.assertTrue(data[0]['is_favorited'])
+        self.assertTrue(data[0]['author']['is_subscribed'])
+        self.assertTrue(data[1]['is_in_shopping_cart'])
+
+    def test_author(self):
+        self.assertSameData(self.author)
+
+
+class ScheduleRebuildTest(TestCase):
+    """Отложенная сборка списков покупок выполняется один раз."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                email=f'user{number}@example.com', username=f'user{number}',
+                password='x', first_name='Имя', last_name='Фамилия'
+            )
+            for number in range(2)
+        ]
+        cls.salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+        cls.recipes = []
+        for user in cls.users:
+            recipe = Recipe.objects.create(
+                author=user, name='Суп', text='Текст', cooking_time=10
+            )
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=cls.salt, amount=5
+            )
+            ShoppingCart.objects.create(user=user, recipe=recipe)
+            cls.recipes.append(recipe)
+
+    def test_rebuilds_once(self):
+        with mock.patch('recipes.shopping_list.rebuild') as rebuild:
+            with self.captureOnCommitCallbacks(execute=True):
+                schedule_rebuild_for_recipes([self.recipes[0].id])
+                schedule_rebuild_for_recipes([self.recipes[1].id])
+        rebuild.assert_called_once_with(
+            {user.id for user in self.users}
+        )
+
+    def test_rolled_back_savepoint(self):
+        ShoppingListItem.objects.all().delete()
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule_rebuild_for_recipes([self.recipes[0].id])
+            try:
+                with transaction.atomic():
+                    schedule_rebuild_for_recipes([self.recipes[1].id])
+                    raise ValueError
+            except ValueError:
+                pass
+        # Пользователь из откаченной точки сохранения собирается заново
+        # вместе с остальными, а не теряется
+        self.assertEqual(
+            set(ShoppingListItem.objects.values_list('user_id', 'amount')),
+            {(user.id, 5) for user in self.users}
+        )
+
+
+class ShoppingListTotalsTest(TestCase):
+    """Приращения сводного списка покупок совпадают с полной сборкой."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                email=f'user{number}@example.com', username=f'user{number}',
+                password='x', first_name='Имя', last_name='Фамилия'
+            )
+            for number in range(2)
+        ]
+        cls.ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit=unit)
+            for name, unit in (('соль', 'г'), ('вода', 'мл'), ('яйца', 'шт'))
+        ]
+        cls.recipes = []
+        for number, amounts in enumerate(((5, 200), (10, 300), (1, 0))):
+            recipe = Recipe.objects.create(
+                author=cls.users[0], name=f'Рецепт {number}', text='Текст',
+                cooking_time=10
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=amount
+                )
+                for ingredient, amount in zip(cls.ingredients, amounts)
+                if amount
+            )
+            cls.recipes.append(recipe)
+
+    def totals(self):
+        return set(ShoppingListItem.objects.values_list(
+            'user_id', 'ingredient_id', 'amount'
+        ))
+
+    def assertMatchesRebuild(self):
+        totals = self.totals()
+        rebuild([user.id for user in self.users])
+        self.assertEqual(totals, self.totals())
+        return totals
+
+    def test_add_and_remove(self):
+        user = self.users[0]
+        for recipe in self.recipes[:2]:
+            ShoppingCart.objects.create(user=user, recipe=recipe)
+        salt, water = self.ingredients[:2]
+        self.assertEqual(self.assertMatchesRebuild(), {
+            (user.id, salt.id, 15), (user.id, water.id, 500)
+        })
+        ShoppingCart.objects.get(user=user, recipe=self.recipes[0]).delete()
+        self.assertEqual(self.assertMatchesRebuild(), {
+            (user.id, salt.id, 10), (user.id, water.id, 300)
+        })
+        ShoppingCart.objects.filter(user=user).delete()
+        self.assertEqual(self.assertMatchesRebuild(), set())
+
+    def test_batch_add(self):
+        for user in self.users:
+            add_relations_in_bulk(
+                ShoppingCart, user, 'recipe',
+                [recipe.id for recipe in self.recipes],
+                Recipe.objects.all()
+            )
+        self.assertEqual(len(self.assertMatchesRebuild()), 4)
+
+    def test_ingredient_diff_update(self):
+        for user in self.users:
+            ShoppingCart.objects.create(user=user, recipe=self.recipes[0])
+        ShoppingCart.objects.create(user=self.users[1], recipe=self.recipes[1])
+        salt, water, eggs = self.ingredients
+        client = APIClient()
+        client.force_authenticate(self.users[0])
+        # Соль меняется, вода удаляется, яйца добавляются
+        response = client.patch(
+            f'/api/recipes/{self.recipes[0].id}/',
+            {
+                'ingredients': [
+                    {'id': salt.id, 'amount': 7},
+                    {'id': eggs.id, 'amount': 2},
+                ],
+                'name': 'Рецепт', 'text': 'Текст', 'cooking_time': 10,
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200, response.content)
+        first, second = self.users
+        self.assertEqual(self.assertMatchesRebuild(), {
+            (first.id, salt.id, 7), (first.id, eggs.id, 2),
+            (second.id, salt.id, 17), (second.id, eggs.id, 2),
+            (second.id, water.id, 300),
+        })
+
+    def test_recipe_ingredient_changes(self):
+        ShoppingCart.objects.create(user=self.users[0], recipe=self.recipes[0])
+        item = RecipeIngredient.objects.get(
+            recipe=self.recipes[0], ingredient=self.ingredients[0]
+        )
+        item.amount = 50
+        item.save()
+        self.assertMatchesRebuild()
+        item.delete()
+        self.assertMatchesRebuild()
+
+    def test_recipe_deletion(self):
+        for user in self.users:
+            for recipe in self.recipes:
+                ShoppingCart.objects.create(user=user, recipe=recipe)
+        self.recipes[1].delete()
+        totals = self.assertMatchesRebuild()
+        salt = self.ingredients[0]
+        self.assertIn((self.users[0].id, salt.id, 6), totals)
+
+
+class SumByUnitsTest(TestCase):
+    """Суммирование списка покупок с приведением единиц."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email='user@example.com', username='user', password='x',
+            first_name='Имя', last_name='Фамилия'
+        )
+
+    def sum_items(self, *items):
+        # Каждая строка — в своем рецепте, как в корзине из нескольких
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=Recipe.objects.create(
+                    author=self.user, name='Суп', text='Текст',
+                    cooking_time=10
+                ),
+                ingredient=Ingredient.objects.get_or_create(
+                    name=name, measurement_unit=unit
+                )[0],
+                amount=amount
+            )
+            for name, unit, amount in items
+        )
+        return [
+            (name, format_amount(amount), unit)
+            for name, amount, unit in sum_by_units(
+                RecipeIngredient.objects.all()
+            )
+        ]
+
+    def test_mass(self):
+        self.assertEqual(
+            self.sum_items(
+                ('мука', 'г', 500), ('мука', 'кг', 1), ('мука', 'гр', 250)
+            ),
+            [('мука', '1,75', 'кг')]
+        )
+
+    def test_small_amount_stays_in_base_unit(self):
+        self.assertEqual(
+            self.sum_items(('соль', 'г', 5), ('сахар', 'кг', 2)),
+            [('сахар', '2', 'кг'), ('соль', '5', 'г')]
+        )
+
+    def test_volume(self):
+        self.assertEqual(
+            self.sum_items(('молоко', 'мл', 250), ('молоко', 'л', 2)),
+            [('молоко', '2,25', 'л')]
+        )
+
+    def test_spoons_are_not_mixed(self):
+        # Ложки не переводятся ни друг в друга, ни в массу
+        self.assertEqual(
+            self.sum_items(
+                ('сахар', 'ст. л.', 2), ('сахар', 'ч. л.', 3),
+                ('сахар', 'г', 100), ('соль', 'ч. л.', 1),
+                ('соль', 'ч. л.', 1)
+            ),
+            [
+                ('сахар', '100', 'г'), ('сахар', '2', 'ст. л.'),
+                ('сахар', '3', 'ч. л.'), ('соль', '2', 'ч. л.'),
+            ]
+        )
+
+    def test_pieces(self):
+        self.assertEqual(
+            self.sum_items(('яйца', 'шт', 2), ('яйца', 'шт.', 3)),
+            [('яйца', '5', 'шт.')]
+        )
+
+
+class ImportExportTest(TestCase):
+    """Пакетный импорт и выгрузка в CSV и JSON Lines."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            email='admin@example.com', username='admin', password='x',
+            first_name='Админ', last_name='Админов'
+        )
+        cls.salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+        cls.milk = Ingredient.objects.create(
+            name='молоко', measurement_unit='мл'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.admin, name='Суп', text='Текст', cooking_time=10
+        )
+        cls.amount = RecipeIngredient.objects.create(
+            recipe=cls.recipe, ingredient=cls.salt, amount=5
+        )
+
+    def ingredients_dataset(self, rows):
+        dataset = tablib.Dataset(headers=['id', 'name', 'measurement_unit'])
+        for name, unit in rows:
+            dataset.append(['', name, unit])
+        return dataset
+
+    def test_natural_key_loader(self):
+        dataset = self.ingredients_dataset(
+            [('соль', 'г'), ('соль', 'кг'), ('сахар', 'г')]
+        )
+        resource = IngredientResource()
+        with self.assertNumQueries(1):
+            loader = CachedNaturalKeyLoader(resource, dataset)
+        with self.assertNumQueries(0):
+            found = [loader.get_instance(row) for row in dataset.dict]
+        self.assertEqual(found, [self.salt, None, None])
+
+    def test_import_ingredients(self):
+        dataset = self.ingredients_dataset(
+            [('соль', 'г'), ('сахар', 'г'), ('мука', 'кг')]
+        )
+        result = IngredientResource().import_data(dataset)
+        self.assertFalse(result.has_errors())
+        self.assertEqual(Ingredient.objects.count(), 4)
+        self.assertEqual(Ingredient.objects.filter(name='соль').count(), 1)
+        # Все поля ингредиента входят в ключ: обновлять нечего
+        self.assertEqual(IngredientResource().get_bulk_update_fields(), [])
+
+    def test_import_recipe_ingredients(self):
+        dataset = tablib.Dataset(
+            headers=['id', 'recipe', 'ingredient', 'amount']
+        )
+        dataset.append([self.amount.id, self.recipe.id, self.salt.id, 7])
+        dataset.append(['', self.recipe.id, self.milk.id, 200])
+        with CaptureQueriesContext(connection) as queries:
+            result = RecipeIngredientResource().import_data(dataset)
+        self.assertFalse(result.has_errors())
+        self.assertEqual(
+            set(self.recipe.recipeingredients.values_list(
+                'ingredient_id', 'amount'
+            )),
+            {(self.salt.id, 7), (self.milk.id, 200)}
+        )
+        # Запросы не зависят от числа строк: ни одного SELECT на строку
+        self.assertLess(len(queries), 20)
+
+    def test_export_formats(self):
+        resource = RecipeIngredientResource()
+        queryset = RecipeIngredient.objects.all()
+        self.assertEqual(
+            ''.join(export_lines(resource, queryset, 'csv')),
+            'id,recipe,ingredient,amount\r\n'
+            f'{self.amount.id},{self.recipe.id},{self.salt.id},5\r\n'
+        )
+        lines = list(export_lines(resource, queryset, 'jsonl'))
+        self.assertEqual([json.loads(line) for line in lines], [{
+            'id': self.amount.id, 'recipe': self.recipe.id,
+            'ingredient': self.salt.id, 'amount': 5,
+        }])
+
+    def test_export_reads_rows_before_response(self):
+        rows = export_lines(
+            IngredientResource(), Ingredient.objects.all(), 'csv'
+        )
+        # Под ASGI перебор ответа идет в цикле событий без доступа к БД
+        with self.assertNumQueries(0):
+            self.assertEqual(len(list(rows)), 3)
+
+    def admin_export(self, action):
+        self.client.force_login(self.admin)
+        return self.client.post('/admin/recipes/ingredient/', {
+            'action': action,
+            helpers.ACTION_CHECKBOX_NAME: [self.salt.id, self.milk.id],
+        })
+
+    def test_admin_export_response(self):
+        response = self.admin_export('export_jsonl')
+        self.assertIsInstance(response, StreamingHttpResponse)
+        self.assertEqual(
+            {
+                json.loads(line)['name']
+                for line in b''.join(response.streaming_content).splitlines()
+            },
+            {'соль', 'молоко'}
+        )
+
+    def test_large_admin_export_in_background(self):
+        with tempfile.TemporaryDirectory() as media, override_settings(
+            MEDIA_ROOT=media
+        ), mock.patch('recipes.admin.EXPORT_RESPONSE_MAX_ROWS', 1):
+            response = self.admin_export('export_jsonl')
+            self.assertEqual(response.status_code, 302)
+            job = Job.objects.get(name='recipes.export')
+            self.assertEqual(job.kwargs['export_format'], 'jsonl')
+            self.assertTrue(run_next())
+            job.refresh_from_db()
+            self.assertEqual(job.state, Job.DONE)
+            name = os.path.basename(job.result['url'])
+            with open(os.path.join(media, 'exports', name)) as file:
+                self.assertEqual(
+                    {json.loads(line)['name'] for line in file},
+                    {'соль', 'молоко'}
+                )
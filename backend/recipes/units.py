@@ -0,0 +1,107 @@
+"""
+Приведение единиц измерения и суммирование списка покупок.
+
+Таблица CONVERSIONS заранее задает для единиц из справочника
+(data/ingredients.csv) и их вариантов написания базовую единицу и
+множитель. Суммирование идет в БД одним запросом: количество каждой
+строки умножается на множитель выражением CASE и складывается по
+названию ингредиента и базовой единице. Поэтому «мука, 500 г» и
+«мука, 1 кг» дают одну строку «мука — 1,5 кг», а разные величины
+(граммы и штуки) никогда не складываются.
+
+Переводятся только единицы с точным соотношением. Ложки, стаканы,
+щепотки и штуки остаются сами собой: их пересчет в массу зависит от
+продукта.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import (Case, CharField, F, IntegerField, Sum, Value,
+                              When)
+
+# Единица: (базовая единица, множитель)
+CONVERSIONS = {
+    'г': ('г', 1),
+    'гр': ('г', 1),
+    'гр.': ('г', 1),
+    'кг': ('г', 1000),
+    'мл': ('мл', 1),
+    'л': ('мл', 1000),
+    'шт': ('шт.', 1),
+    'шт.': ('шт.', 1),
+}
+
+# Базовая единица: (крупная единица, сколько в ней базовых)
+COMPACT_UNITS = {
+    'г': ('кг', 1000),
+    'мл': ('л', 1000),
+}
+
+
+def grouped_units(index):
+    """Единицы CONVERSIONS, сгруппированные по элементу index значения."""
+    groups = defaultdict(list)
+    for unit, conversion in CONVERSIONS.items():
+        groups[conversion[index]].append(unit)
+    return groups
+
+
+# Условия CASE строятся один раз при импорте модуля
+BASE_UNITS = grouped_units(0)
+FACTORS = grouped_units(1)
+
+
+def base_unit(unit_field):
+    """Выражение базовой единицы; неизвестные единицы не меняются."""
+    return Case(
+        *[
+            When(**{f'{unit_field}__in': units}, then=Value(base))
+            for base, units in BASE_UNITS.items()
+        ],
+        default=F(unit_field),
+        output_field=CharField()
+    )
+
+
+def base_amount(amount_field, unit_field):
+    """Выражение количества в базовой единице."""
+    return F(amount_field) * Case(
+        *[
+            When(**{f'{unit_field}__in': units}, then=Value(factor))
+            for factor, units in FACTORS.items() if factor != 1
+        ],
+        default=Value(1),
+        output_field=IntegerField()
+    )
+
+
+def compact(amount, unit):
+    """Количество в наиболее удобной единице: 1500 г -> 1.5 кг."""
+    large_unit, size = COMPACT_UNITS.get(unit, (None, None))
+    if large_unit is None or amount < size:
+        return Decimal(amount), unit
+    return (Decimal(amount) / size).normalize(), large_unit
+
+
+def sum_by_units(queryset, amount_field='amount',
+                 unit_field='ingredient__measurement_unit',
+                 name_field='ingredient__name'):
+    """
+    Суммы строк queryset по названию и базовой единице одним запросом.
+
+    Возвращает отсортированный по названию список кортежей
+    (название, количество, единица) с количеством в удобной единице.
+    """
+    rows = queryset.values(
+        name=F(name_field), unit=base_unit(unit_field)
+    ).annotate(
+        total=Sum(base_amount(amount_field, unit_field))
+    ).order_by('name', 'unit')
+    return [
+        (row['name'], *compact(row['total'], row['unit'])) for row in rows
+    ]
+
+
+def format_amount(amount):
+    """Количество для текста: без лишних нулей, с десятичной запятой."""
+    return f'{amount:f}'.replace('.', ',')
@@ -0,0 +1,28 @@
+# Generated by Django 3.2.25 on 2026-10-19 09:10
+
+from django.conf import settings
+from django.db import migrations
+
+from foodgram.db.partitioning import merge_tables, partition_tables
+
+TABLES = ('users_subscribers',)
+
+
+def partition(apps, schema_editor):
+    """Секционирует подписки при DB_PARTITIONS > 0."""
+    partition_tables(schema_editor.connection, TABLES, settings.DB_PARTITIONS)
+
+
+def merge(apps, schema_editor):
+    merge_tables(schema_editor.connection, TABLES)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_sync_model_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition, merge),
+    ]
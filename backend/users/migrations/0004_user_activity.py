@@ -0,0 +1,23 @@
+# Generated by Django 3.2.25 on 2026-10-19 06:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_partition_subscribers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='cart_archived',
+            field=models.BooleanField(default=False, verbose_name='Корзина в архиве'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='last_seen',
+            field=models.DateTimeField(blank=True, help_text='Обновляется при запросах с токеном раз в сутки', null=True, verbose_name='Последняя активность'),
+        ),
+    ]
@@ -44,6 +44,16 @@ class User(AbstractUser):
         blank=True,
         null=True,
     )
+    last_seen = models.DateTimeField(
+        verbose_name='Последняя активность',
+        blank=True,
+        null=True,
+        help_text='Обновляется при запросах с токеном раз в сутки'
+    )
+    cart_archived = models.BooleanField(
+        default=False,
+        verbose_name='Корзина в архиве'
+    )
 
     class Meta:
         """Метаданные модели."""